@@ -130,10 +130,24 @@ const workflow_runs = new aws.dynamodb.Table(
         name: "range_key",
         type: "S",
       },
+      {
+        name: "created_at",
+        type: "S",
+      },
     ],
 
     hashKey: "project_id",
     rangeKey: "range_key",
+    // a local index can only be added when the table is created, so the latest
+    // run lookup uses a global index over the same keys
+    globalSecondaryIndexes: [
+      {
+        name: "created_at_index",
+        hashKey: "project_id",
+        rangeKey: "created_at",
+        projectionType: "ALL",
+      },
+    ],
     billingMode: "PAY_PER_REQUEST",
     tags: {
       ...globalTags,
@@ -142,6 +156,54 @@ const workflow_runs = new aws.dynamodb.Table(
   },
   { protect: protect }
 );
+const counters = new aws.dynamodb.Table(
+  "counters",
+  {
+    attributes: [
+      {
+        name: "id",
+        type: "S",
+      },
+    ],
+
+    hashKey: "id",
+    billingMode: "PAY_PER_REQUEST",
+    // per-run job counters are removed once they expire
+    ttl: {
+      attributeName: "expires_at",
+      enabled: true,
+    },
+    tags: {
+      ...globalTags,
+      RESOURCE_NAME: "counters",
+    },
+  },
+  { protect: protect }
+);
+const app_statuses = new aws.dynamodb.Table(
+  "app-statuses",
+  {
+    attributes: [
+      {
+        name: "project_id",
+        type: "S",
+      },
+      {
+        name: "app_id",
+        type: "S",
+      },
+    ],
+
+    hashKey: "project_id",
+    rangeKey: "app_id",
+    billingMode: "PAY_PER_REQUEST",
+    tags: {
+      ...globalTags,
+      RESOURCE_NAME: "app-statuses",
+    },
+  },
+  { protect: protect }
+);
 const alarm_reporter_ecr_repo = new aws.ecr.Repository(
   "alarm_reporter-ecr_repo",
   {
@@ -774,6 +836,19 @@ const stacksnap_service_stacksnap_shared_storage = new aws.efs.AccessPoint(
     },
   }
 );
+// Pulumi's plugins, shared by every task so providers are only downloaded once
+const stacksnap_pulumi_home = new aws.efs.AccessPoint("stacksnap-pulumi-home", {
+  fileSystemId: stacksnap_shared_storage.id,
+  posixUser: { gid: 1000, uid: 1000 },
+  rootDirectory: {
+    creationInfo: { ownerGid: 1000, ownerUid: 1000, permissions: "777" },
+    path: "/mnt/pulumi-home",
+  },
+  tags: {
+    ...globalTags,
+    RESOURCE_NAME: "stacksnap-pulumi-home",
+  },
+});
 const stacksnap_ecs_task_role = new aws.iam.Role("stacksnap-ecs-task-role", {
   assumeRolePolicy: pulumi.jsonStringify({
     Statement: [
@@ -890,6 +965,44 @@ const stacksnap_ecs_task_role = new aws.iam.Role("stacksnap-ecs-task-role", {
         Version: "2012-10-17",
       }),
     },
+    {
+      name: "counters-policy",
+      policy: pulumi.jsonStringify({
+        Statement: [
+          {
+            Action: ["dynamodb:*"],
+            Effect: "Allow",
+            Resource: [
+              counters.arn,
+              pulumi.interpolate`${counters.arn}/stream/*`,
+              pulumi.interpolate`${counters.arn}/backup/*`,
+              pulumi.interpolate`${counters.arn}/export/*`,
+              pulumi.interpolate`${counters.arn}/index/*`,
+            ],
+          },
+        ],
+        Version: "2012-10-17",
+      }),
+    },
+    {
+      name: "app-statuses-policy",
+      policy: pulumi.jsonStringify({
+        Statement: [
+          {
+            Action: ["dynamodb:*"],
+            Effect: "Allow",
+            Resource: [
+              app_statuses.arn,
+              pulumi.interpolate`${app_statuses.arn}/stream/*`,
+              pulumi.interpolate`${app_statuses.arn}/backup/*`,
+              pulumi.interpolate`${app_statuses.arn}/export/*`,
+              pulumi.interpolate`${app_statuses.arn}/index/*`,
+            ],
+          },
+        ],
+        Version: "2012-10-17",
+      }),
+    },
     {
       name: "stacksnap-shared-storage-policy",
       policy: pulumi.jsonStringify({
@@ -1055,6 +1168,17 @@ const stacksnap_cli_task = new aws.ecs.TaskDefinition("stacksnap-cli-task", {
         transitEncryption: "ENABLED",
       },
     },
+    {
+      name: "stacksnap-pulumi-home",
+      efsVolumeConfiguration: {
+        fileSystemId: stacksnap_shared_storage.id,
+        authorizationConfig: {
+          accessPointId: stacksnap_pulumi_home.id,
+          iam: "ENABLED",
+        },
+        transitEncryption: "ENABLED",
+      },
+    },
   ],
   containerDefinitions: pulumi.jsonStringify([
     {
@@ -1079,6 +1203,14 @@ const stacksnap_cli_task = new aws.ecs.TaskDefinition("stacksnap-cli-task", {
           name: "WORKFLOW_JOBS_TABLE_NAME",
           value: workflow_jobs.name,
         },
+        {
+          name: "COUNTERS_TABLE_NAME",
+          value: counters.name,
+        },
+        {
+          name: "APP_STATUSES_TABLE_NAME",
+          value: app_statuses.name,
+        },
         {
           name: "IAC_STORE_BUCKET_NAME",
           value: stacksnap_iac_store.bucket,
@@ -1107,6 +1239,10 @@ const stacksnap_cli_task = new aws.ecs.TaskDefinition("stacksnap-cli-task", {
           name: "DEPLOY_LOG_DIR",
           value: "/app/deployments",
         },
+        {
+          name: "PULUMI_HOME",
+          value: "/app/pulumi-home",
+        },
         {
           name: "PULUMI_STATE_BUCKET_NAME",
           value: stacksnap_pulumi_state_bucket.bucket,
@@ -1155,6 +1291,10 @@ const stacksnap_cli_task = new aws.ecs.TaskDefinition("stacksnap-cli-task", {
           containerPath: "/app/deployments",
           sourceVolume: "stacksnap-service-stacksnap-shared-storage",
         },
+        {
+          containerPath: "/app/pulumi-home",
+          sourceVolume: "stacksnap-pulumi-home",
+        },
       ],
       name: "stacksnap-cli",
       portMappings: [
@@ -1228,6 +1368,17 @@ const stacksnap_task = new aws.ecs.TaskDefinition("stacksnap-task", {
         transitEncryption: "ENABLED",
       },
     },
+    {
+      name: "stacksnap-pulumi-home",
+      efsVolumeConfiguration: {
+        fileSystemId: stacksnap_shared_storage.id,
+        authorizationConfig: {
+          accessPointId: stacksnap_pulumi_home.id,
+          iam: "ENABLED",
+        },
+        transitEncryption: "ENABLED",
+      },
+    },
   ],
   containerDefinitions: pulumi.jsonStringify([
     {
@@ -1253,6 +1404,14 @@ const stacksnap_task = new aws.ecs.TaskDefinition("stacksnap-task", {
           name: "WORKFLOW_JOBS_TABLE_NAME",
           value: workflow_jobs.name,
         },
+        {
+          name: "COUNTERS_TABLE_NAME",
+          value: counters.name,
+        },
+        {
+          name: "APP_STATUSES_TABLE_NAME",
+          value: app_statuses.name,
+        },
         {
           name: "IAC_STORE_BUCKET_NAME",
           value: stacksnap_iac_store.bucket,
@@ -1281,6 +1440,10 @@ const stacksnap_task = new aws.ecs.TaskDefinition("stacksnap-task", {
           name: "DEPLOY_LOG_DIR",
           value: "/app/deployments",
         },
+        {
+          name: "PULUMI_HOME",
+          value: "/app/pulumi-home",
+        },
         {
           name: "PULUMI_STATE_BUCKET_NAME",
           value: stacksnap_pulumi_state_bucket.bucket,
@@ -1344,6 +1507,10 @@ const stacksnap_task = new aws.ecs.TaskDefinition("stacksnap-task", {
           containerPath: "/app/deployments",
           sourceVolume: "stacksnap-service-stacksnap-shared-storage",
         },
+        {
+          containerPath: "/app/pulumi-home",
+          sourceVolume: "stacksnap-pulumi-home",
+        },
       ],
       name: "stacksnap-backend",
       portMappings: [
@@ -1,5 +1,5 @@
 import type {
-  WorkflowRunSummary,
+  WorkflowRunPage,
   WorkflowType,
 } from "../shared/models/Workflow.ts";
 import type { AxiosResponse } from "axios";
@@ -11,13 +11,17 @@ export interface GetWorkflowRunsRequest {
   idToken: string;
   workflowType?: WorkflowType;
   appId?: string;
+  limit?: number;
+  next?: string;
 }
 
 export async function getWorkflowRuns({
   idToken,
   workflowType,
   appId,
-}: GetWorkflowRunsRequest): Promise<WorkflowRunSummary[]> {
+  limit,
+  next,
+}: GetWorkflowRunsRequest): Promise<WorkflowRunPage> {
   const appRunsUrl = `/api/project/apps/${appId}/workflows/${workflowType}/runs`;
   const projectRunsUrl = `/api/project/workflows/${workflowType}/runs`;
   const url = appId ? appRunsUrl : projectRunsUrl;
@@ -26,6 +30,7 @@ export async function getWorkflowRuns({
   try {
     response = await axios.get(url, {
       headers: idToken && { Authorization: `Bearer ${idToken}` },
+      params: { limit, next },
     });
   } catch (error) {
     const apiError = new ApiError({
@@ -5,8 +5,19 @@ import type { WorkflowType } from "../shared/models/Workflow.ts";
 
 export type LogStreamListener = (message: EventSourceMessage) => void;
 
+/**
+ * Events sent by the logs endpoints. Every event's id is the byte offset in
+ * the log following its data, which the stream resumes from on reconnect.
+ *
+ * - log-line: one line, ending in "\n".
+ * - log-batch: sent instead of log-line when `batchMs` is set. One or more
+ *   lines concatenated, each ending in "\n", that arrived within `batchMs` of
+ *   the first (up to 64KiB).
+ * - done: the log is complete and the stream closes.
+ */
 export enum DeployLogEventType {
   LogLine = "log-line",
+  LogBatch = "log-batch",
   Done = "done",
 }
 
@@ -20,6 +31,7 @@ export interface LogSubscriptionRequest {
   targetedAppId?: string;
   runNumber: number;
   jobNumber: number;
+  batchMs?: number;
   onopen?: () => void;
   listener: LogStreamListener;
   controller?: AbortController;
@@ -30,6 +42,7 @@ export async function subscribeToLogStream({
   runNumber,
   targetedAppId,
   jobNumber,
+  batchMs,
   idToken,
   onopen,
   listener,
@@ -39,7 +52,9 @@ export async function subscribeToLogStream({
 
   const appLogsUrl = `/api/project/apps/${targetedAppId}/workflows/${workflowType}/runs/${runNumber}/jobs/${jobNumber}/logs`;
   const projectLogsUrl = `/api/project/workflows/${workflowType}/runs/${runNumber}/jobs/${jobNumber}/logs`;
-  const url = targetedAppId ? appLogsUrl : projectLogsUrl;
+  const url =
+    (targetedAppId ? appLogsUrl : projectLogsUrl) +
+    (batchMs ? `?batch_ms=${batchMs}` : "");
   await fetchEventSource(url, {
     headers: {
       ...(idToken && { Authorization: `Bearer ${idToken}` }),
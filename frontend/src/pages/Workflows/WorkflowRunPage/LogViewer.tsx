@@ -136,6 +136,9 @@ export const LogViewer: FC<{
       return;
     }
     const controller = new AbortController();
+    // reconnects resume after the last event received (Last-Event-ID), so
+    // the log is only reset when the stream is first opened
+    let opened = false;
     (async () => {
       try {
         await subscribeToLogStream({
@@ -143,9 +146,13 @@ export const LogViewer: FC<{
           workflowType: workflowType,
           jobNumber: jobNumber,
           runNumber: runNumber,
+          batchMs: 100,
           onopen: () => {
-            setLog([]);
-            setDone(false);
+            if (!opened) {
+              setLog([]);
+              setDone(false);
+              opened = true;
+            }
           },
           listener: (message: EventSourceMessage) => {
             const { event, data } = message;
@@ -153,6 +160,11 @@ export const LogViewer: FC<{
               setLog((log) => {
                 return [...log, data];
               });
+            } else if (event === DeployLogEventType.LogBatch) {
+              const lines = data.match(/[^\n]*\n|[^\n]+$/g) ?? [];
+              setLog((log) => {
+                return [...log, ...lines];
+              });
             } else if (event === DeployLogEventType.Done) {
               console.log("log stream done");
               controller.abort();
@@ -1,6 +1,6 @@
-import { Badge, Dropdown, Pagination, Table } from "flowbite-react";
+import { Badge, Button, Dropdown, Pagination, Table } from "flowbite-react";
 import type { FC } from "react";
-import React, { useCallback, useEffect, useState } from "react";
+import React, { useCallback, useEffect, useRef, useState } from "react";
 import type { WorkflowRunSummary } from "../../shared/models/Workflow.ts";
 import {
   toWorkflowRunStatusString,
@@ -24,6 +24,8 @@ import {
   getTimeText,
 } from "../../shared/time-util.ts";
 
+const RUNS_PAGE_SIZE = 50;
+
 export const WorkflowRunsPage = () => {
   let { workflowType, appId } = useParams();
 
@@ -32,24 +34,21 @@ export const WorkflowRunsPage = () => {
   }
 
   const [workflowRuns, setWorkflowRuns] = useState<WorkflowRunSummary[]>([]);
+  const [next, setNext] = useState<string | undefined>();
+  // once older pages are loaded, refreshes only update the first page
+  const loadedOlderRuns = useRef(false);
 
   const { getWorkflowRuns, addError, project } = useApplicationStore();
 
-  const refreshRuns = useCallback(() => {
-    (async () => {
+  const fetchRuns = useCallback(
+    async (pageToken?: string) => {
       try {
-        setWorkflowRuns(
-          (
-            await getWorkflowRuns({
-              workflowType: workflowType as WorkflowType,
-              appId: appId,
-            })
-          ).sort(
-            (a, b) =>
-              new Date(b.created_at).getTime() -
-              new Date(a.created_at).getTime(),
-          ),
-        );
+        return await getWorkflowRuns({
+          workflowType: workflowType as WorkflowType,
+          appId: appId,
+          limit: RUNS_PAGE_SIZE,
+          next: pageToken,
+        });
       } catch (e: any) {
         addError(
           new UIError({
@@ -59,10 +58,39 @@ export const WorkflowRunsPage = () => {
           }),
         );
       }
+    },
+    [addError, appId, getWorkflowRuns, workflowType],
+  );
+
+  const refreshRuns = useCallback(() => {
+    (async () => {
+      const page = await fetchRuns();
+      if (!page) {
+        return;
+      }
+      setWorkflowRuns((runs) => mergeRuns(page.runs, runs));
+      if (!loadedOlderRuns.current) {
+        setNext(page.next);
+      }
     })();
-  }, [addError, appId, getWorkflowRuns, workflowType]);
+  }, [fetchRuns]);
+
+  const loadOlderRuns = useCallback(() => {
+    (async () => {
+      const page = await fetchRuns(next);
+      if (!page) {
+        return;
+      }
+      loadedOlderRuns.current = true;
+      setWorkflowRuns((runs) => mergeRuns(runs, page.runs));
+      setNext(page.next);
+    })();
+  }, [fetchRuns, next]);
 
   useEffect(() => {
+    setWorkflowRuns([]);
+    setNext(undefined);
+    loadedOlderRuns.current = false;
     refreshRuns();
   }, [refreshRuns]);
 
@@ -87,6 +115,13 @@ export const WorkflowRunsPage = () => {
         workflowType={workflowType}
         targetAppId={appId}
       />
+      {next && (
+        <div className="flex justify-center">
+          <Button color="light" size="sm" onClick={loadOlderRuns}>
+            Load older runs
+          </Button>
+        </div>
+      )}
     </div>
   );
 };
@@ -335,3 +370,15 @@ function splitArray<T>(array: T[], size: number): T[][] {
   }
   return result;
 }
+
+// mergeRuns combines two lists of runs, newest first, preferring runs in the first
+function mergeRuns(
+  runs: WorkflowRunSummary[],
+  others: WorkflowRunSummary[],
+): WorkflowRunSummary[] {
+  const ids = new Set(runs.map((run) => run.id));
+  return [...runs, ...others.filter((run) => !ids.has(run.id))].sort(
+    (a, b) =>
+      new Date(b.created_at).getTime() - new Date(a.created_at).getTime(),
+  );
+}
@@ -10,6 +10,7 @@ import type { GetWorkflowRunRequest } from "../../api/GetWorkflowRun.ts";
 import { getWorkflowRun } from "../../api/GetWorkflowRun.ts";
 import type {
   WorkflowRun,
+  WorkflowRunPage,
   WorkflowRunSummary,
 } from "../../shared/models/Workflow.ts";
 import type { GetWorkflowRunsRequest } from "../../api/GetWorkflowRuns.ts";
@@ -30,7 +31,7 @@ export interface WorkflowStoreBase extends WorkflowStoreState {
   ) => Promise<WorkflowRun>;
   getWorkflowRuns: (
     request: Omit<GetWorkflowRunsRequest, "idToken">,
-  ) => Promise<WorkflowRunSummary[]>;
+  ) => Promise<WorkflowRunPage>;
   installApp: (appId: string) => Promise<WorkflowRunSummary>;
   installProject: () => Promise<WorkflowRunSummary>;
   uninstallApp: (appId: string) => Promise<WorkflowRunSummary>;
@@ -117,6 +118,7 @@ export const workflowStore: StateCreator<
     targetedAppId,
     runNumber,
     jobNumber,
+    batchMs,
     listener,
     controller,
   }: LogSubscriptionRequest) => {
@@ -127,6 +129,7 @@ export const workflowStore: StateCreator<
       idToken,
       runNumber,
       jobNumber,
+      batchMs,
       listener,
       controller,
     });
@@ -203,10 +206,27 @@ export const workflowStore: StateCreator<
     set({ workflowRun: run }, false, "getWorkflowRun");
     return run;
   },
-  getWorkflowRuns: async ({ workflowType, appId }: GetWorkflowRunsRequest) => {
+  getWorkflowRuns: async ({
+    workflowType,
+    appId,
+    limit,
+    next,
+  }: GetWorkflowRunsRequest) => {
     const idToken = await get().getIdToken();
-    const runs = await getWorkflowRuns({ idToken, workflowType, appId });
-    set({ workflowRuns: runs }, false, "getWorkflowRuns");
-    return runs;
+    const page = await getWorkflowRuns({
+      idToken,
+      workflowType,
+      appId,
+      limit,
+      next,
+    });
+    set(
+      {
+        workflowRuns: next ? [...get().workflowRuns, ...page.runs] : page.runs,
+      },
+      false,
+      "getWorkflowRuns",
+    );
+    return page;
   },
 });
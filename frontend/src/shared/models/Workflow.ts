@@ -72,6 +72,12 @@ export interface WorkflowRunSummary {
   app_id?: string;
 }
 
+export interface WorkflowRunPage {
+  runs: WorkflowRunSummary[];
+  // the token of the next page, passed back as GetWorkflowRunsRequest.next
+  next?: string;
+}
+
 export interface WorkflowJob {
   id: string;
   job_number: number;
@@ -0,0 +1,564 @@
+import multiprocessing
+import os
+import shutil
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+
+import asyncclick as click
+from pulumi import automation as auto
+
+from src.deployer.pulumi.builder import AppBuilder
+from src.deployer.pulumi.npm_cache import NodeModulesCache
+from src.util.aws.s3 import concurrent_map, put_object
+from src.util.compress import spooled_zip, zip_directory_recurse
+from src.util.tmp import TempDir
+
+
+@click.group()
+async def benchmark():
+    pass
+
+
+def generate_pulumi_program(out_dir: Path, resources: int, binary_mb: int):
+    """Writes a synthetic Pulumi program resembling the engine's output, plus a
+    random binary asset so the packager has to handle non-text files."""
+    lines = ['import * as aws from "@pulumi/aws"', ""]
+    for i in range(resources):
+        lines.append(
+            f'const bucket_{i} = new aws.s3.Bucket("bucket-{i}", {{\n'
+            f"    forceDestroy: true,\n"
+            f'    tags: {{ GLOBAL_KLOTHO_TAG: "benchmark", RESOURCE_NAME: "bucket-{i}" }},\n'
+            f"}})"
+        )
+    (out_dir / "index.ts").write_text("\n".join(lines))
+    (out_dir / "package.json").write_text('{"name": "benchmark"}')
+    (out_dir / "asset.bin").write_bytes(os.urandom(binary_mb * 1024 * 1024))
+
+
+def measure(fn) -> tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+@benchmark.command()
+@click.option("--resources", default=20000, help="Number of resources to generate.")
+@click.option("--binary-mb", default=64, help="Size of the binary asset in MiB.")
+@click.option("--compress-level", default=6, help="zlib compression level.")
+@click.option(
+    "--upload", is_flag=True, help="Also upload the bundle to the local iac store."
+)
+async def iac_packaging(resources: int, binary_mb: int, compress_level: int, upload):
+    """Compares peak memory of in-memory and spooled IaC packaging."""
+    with TempDir() as tmp_dir:
+        program_dir = tmp_dir / "program"
+        program_dir.mkdir()
+        generate_pulumi_program(program_dir, resources, binary_mb)
+        size = sum(f.stat().st_size for f in program_dir.rglob("*") if f.is_file())
+        click.echo(f"Program size: {size / 1024 / 1024:.1f} MiB")
+
+        elapsed, peak = measure(lambda: zip_directory_recurse(BytesIO(), program_dir))
+        click.echo(f"in-memory: {elapsed:.2f}s, peak {peak / 1024 / 1024:.1f} MiB")
+
+        def spooled():
+            with spooled_zip(program_dir, compresslevel=compress_level) as iac_zip:
+                if upload:
+                    from src.dependencies.injection import get_iac_storage
+
+                    get_iac_storage().write_iac("benchmark", "benchmark", 1, iac_zip)
+
+        elapsed, peak = measure(spooled)
+        click.echo(f"spooled:   {elapsed:.2f}s, peak {peak / 1024 / 1024:.1f} MiB")
+
+
+@benchmark.command()
+@click.option("--files", default=50, help="Number of objects to upload.")
+@click.option("--size-kb", default=64, help="Size of each object in KiB.")
+@click.option("--bucket", default="iac-store", help="The bucket to upload to.")
+async def s3_uploads(files: int, size_kb: int, bucket: str):
+    """Compares polled sequential PUTs with concurrent PUTs. Without
+    STACK_SNAP_BINARIES_BUCKET_NAME set, this runs against the local MinIO from
+    docker-compose."""
+    from src.dependencies.injection import s3_resource
+
+    s3_bucket = s3_resource.Bucket(bucket)
+    data = os.urandom(size_kb * 1024)
+    keys = [f"benchmark/s3-uploads/{i}" for i in range(files)]
+
+    def polled():
+        for key in keys:
+            obj = s3_bucket.Object(key)
+            obj.put(Body=data)
+            obj.wait_until_exists()
+
+    def concurrent():
+        concurrent_map(lambda key: put_object(s3_bucket.Object(key), data), keys)
+
+    for name, fn in [("sequential+wait", polled), ("concurrent", concurrent)]:
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        click.echo(f"{name}: {elapsed:.2f}s ({files / elapsed:.1f} objects/s)")
+
+    s3_bucket.delete_objects(Delete={"Objects": [{"Key": key} for key in keys]})
+
+
+@benchmark.command()
+@click.option(
+    "--package-json",
+    default="deploy/package.json",
+    help="The package.json of the Pulumi program to install.",
+)
+@click.option("--mode", default="symlink", help="How cached modules are placed.")
+async def npm_install(package_json: str, mode: str):
+    """Reports dependency install time without the node_modules cache, with a cold cache
+    and with a warm cache."""
+    with TempDir() as tmp_dir:
+        cache = NodeModulesCache(root=tmp_dir / "cache", mode=mode)
+        runs = [
+            ("no cache", lambda d: AppBuilder.npm_install(d)),
+            ("cold cache", lambda d: cache.install(d, AppBuilder.npm_install)),
+            ("warm cache", lambda d: cache.install(d, AppBuilder.npm_install)),
+        ]
+        for i, (name, install) in enumerate(runs):
+            work_dir = tmp_dir / f"run-{i}"
+            work_dir.mkdir()
+            shutil.copy(package_json, work_dir / "package.json")
+            start = time.perf_counter()
+            install(work_dir)
+            click.echo(f"{name}: {time.perf_counter() - start:.2f}s")
+
+
+@benchmark.command()
+@click.option("--keys", default=12, help="Number of secret config keys to set.")
+async def pulumi_config(keys: int):
+    """Compares setting stack config one key at a time with a single batched call,
+    using a throwaway stack on a local file backend."""
+    with TempDir() as tmp_dir:
+        (tmp_dir / "state").mkdir()
+        stack = auto.create_or_select_stack(
+            stack_name="benchmark",
+            work_dir=str(tmp_dir),
+            opts=auto.LocalWorkspaceOptions(
+                project_settings=auto.ProjectSettings(
+                    name="benchmark",
+                    runtime="nodejs",
+                    backend=auto.ProjectBackend(f"file://{tmp_dir / 'state'}"),
+                ),
+                env_vars={"PULUMI_CONFIG_PASSPHRASE": ""},
+            ),
+        )
+        config = {
+            f"benchmark:key{i}": auto.ConfigValue(f"value{i}", secret=True)
+            for i in range(keys)
+        }
+
+        start = time.perf_counter()
+        for k, v in config.items():
+            stack.set_config(k, v)
+        click.echo(f"set_config x{keys}: {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        stack.set_all_config(config, path=True)
+        click.echo(f"set_all_config: {time.perf_counter() - start:.2f}s")
+
+
+@benchmark.command()
+@click.option(
+    "--iac-dir",
+    required=True,
+    help="A generated Pulumi program, eg from 'cli.py iac generate-iac' for activepieces.",
+)
+@click.option(
+    "--parallel",
+    "-p",
+    multiple=True,
+    type=int,
+    default=[1, 8, 16, 32],
+    help="Parallelism settings to compare.",
+)
+@click.option(
+    "--shared-home/--fresh-home",
+    default=True,
+    help="Share one PULUMI_HOME (and its plugins) across runs or start each run empty.",
+)
+@click.option(
+    "--up", is_flag=True, help="Deploy and destroy instead of only previewing."
+)
+async def pulumi_parallel(iac_dir: str, parallel: list[int], shared_home, up):
+    """Compares Pulumi operation durations across parallelism settings, using a local
+    file backend. Runs with AWS credentials from the environment."""
+    with TempDir() as tmp_dir:
+        program_dir = tmp_dir / "program"
+        shutil.copytree(
+            iac_dir, program_dir, ignore=shutil.ignore_patterns("node_modules")
+        )
+        AppBuilder.npm_install(program_dir)
+        (tmp_dir / "state").mkdir()
+
+        for i, p in enumerate(parallel):
+            home = tmp_dir / ("home" if shared_home else f"home-{i}")
+            home.mkdir(exist_ok=True)
+            stack = auto.create_or_select_stack(
+                stack_name=f"benchmark-{i}",
+                work_dir=str(program_dir),
+                opts=auto.LocalWorkspaceOptions(
+                    pulumi_home=str(home),
+                    project_settings=auto.ProjectSettings(
+                        name="benchmark",
+                        runtime="nodejs",
+                        backend=auto.ProjectBackend(f"file://{tmp_dir / 'state'}"),
+                    ),
+                    env_vars={
+                        "PULUMI_CONFIG_PASSPHRASE": "",
+                        "PULUMI_SKIP_UPDATE_CHECK": "true",
+                    },
+                ),
+            )
+            stack.set_config(
+                "aws:region", auto.ConfigValue(os.getenv("AWS_REGION", "us-east-1"))
+            )
+
+            timings = []
+            start = time.perf_counter()
+            stack.preview(parallel=p)
+            timings.append(f"preview {time.perf_counter() - start:.2f}s")
+            if up:
+                for name, op in [("up", stack.up), ("destroy", stack.destroy)]:
+                    start = time.perf_counter()
+                    op(parallel=p)
+                    timings.append(f"{name} {time.perf_counter() - start:.2f}s")
+            stack.workspace.remove_stack(stack.name)
+            click.echo(f"parallel={p}: {', '.join(timings)}")
+
+
+@benchmark.command()
+@click.option("--resources", default=50, help="Number of stand-in resources.")
+@click.option("--latency-ms", default=0, help="Simulated latency per provider call.")
+@click.option(
+    "--strategy",
+    "-s",
+    multiple=True,
+    default=["safe", "fast"],
+    help="Deploy strategies to time, each followed by a no-op redeploy.",
+)
+async def standin_deploy(resources: int, latency_ms: int, strategy: list[str]):
+    """Times build, deploy and destroy of a generated resource graph with the stand-in
+    program on a local file backend. Needs the pulumi CLI and npm, but no cloud account.
+    """
+    from src.deployer.models.workflow_job import WorkflowJob
+    from src.deployer.pulumi import builder as builder_module
+    from src.deployer.pulumi.deploy_logs import DeploymentDir
+    from src.deployer.pulumi.deployer import AppDeployer, DeployStrategy
+
+    os.environ["STANDIN_LATENCY_MS"] = str(latency_ms)
+    with TempDir() as tmp_dir:
+        builder_module.PULUMI_STANDIN_PROGRAM = True
+        builder_module.PULUMI_BACKEND_URL = f"file://{tmp_dir / 'state'}"
+
+        lines = ["resources:"]
+        for i in range(resources):
+            lines.append(f"  aws:s3_bucket:bucket-{i}:\n    ForceDestroy: true")
+        lines.append("edges:")
+        for i in range(1, resources):
+            lines.append(
+                f"  aws:s3_bucket:bucket-{i} -> aws:s3_bucket:bucket-{i // 2}:"
+            )
+
+        for name in strategy:
+            program_dir = tmp_dir / name
+            program_dir.mkdir()
+            (program_dir / "resources.yaml").write_text("\n".join(lines))
+            job = WorkflowJob(
+                partition_key=f"benchmark#DEPLOY#{name}#00000001",
+                job_number=1,
+                modified_app=f"{name}#00000001",
+            )
+
+            start = time.perf_counter()
+            builder = AppBuilder(program_dir, None)
+            stack = builder.prepare_stack(job)
+            click.echo(f"{name}: prepare {time.perf_counter() - start:.2f}s")
+
+            deployer = AppDeployer(stack, DeploymentDir("benchmark", name))
+            for run in ["deploy", "redeploy"]:
+                status, message = deployer.deploy(DeployStrategy(name))
+                click.echo(f"{name}: {run} {status.value} {deployer.phase_timings}")
+            start = time.perf_counter()
+            deployer.destroy_and_remove_stack()
+            click.echo(f"{name}: destroy {time.perf_counter() - start:.2f}s")
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0
+
+
+@benchmark.command()
+@click.option("--clients", default=1000, help="Number of concurrent log readers.")
+@click.option("--lines", default=5000, help="Number of log lines to write.")
+@click.option("--rate", default=1000, help="Lines written per second (0: no limit).")
+@click.option(
+    "--batch-ms",
+    default=0,
+    help="Coalesce lines into log-batch events over this window (0: log-line events).",
+)
+@click.option(
+    "--url",
+    default=None,
+    help="A job's logs endpoint on a running API (eg with LOCAL_USER set) to connect "
+    "SSE clients to instead of tailing a log written in this process.",
+)
+@click.option(
+    "--writer-process",
+    is_flag=True,
+    help="Write the log from a separate process, like the deploy workflows do, so the "
+    "readers tail the file instead of the in-process channel.",
+)
+async def log_tail(
+    clients: int, lines: int, rate: int, batch_ms: int, url: str, writer_process: bool
+):
+    """Load tests deploy log streaming with many concurrent readers of one log. By
+    default a log is written in this process while the readers tail it and encode
+    SSE events, reporting delivery latency, CPU time, bytes of events and the
+    process' open files."""
+    if url:
+        await sse_clients(url + (f"?batch_ms={batch_ms}" if batch_ms else ""), clients)
+        return
+
+    import asyncio
+
+    from sse_starlette.sse import ServerSentEvent
+
+    from src.deployer.pulumi import deploy_logs
+
+    with TempDir() as tmp_dir:
+        deploy_logs.LOG_DIR = tmp_dir
+        deploy_dir = deploy_logs.DeploymentDir("benchmark", "log-tail")
+        latencies = []
+        sent = {"events": 0, "bytes": 0}
+
+        def send(event: str, data: str, offset: int):
+            sent["events"] += 1
+            sent["bytes"] += len(
+                ServerSentEvent(data, event=event, id=str(offset)).encode()
+            )
+
+        async def reader():
+            received = 0
+            log_tail = deploy_dir.get_log("stack").tail()
+            if batch_ms:
+                async for batch in log_tail.batches(batch_ms / 1000, 64 * 1024):
+                    send("log-batch", "".join(batch), log_tail.offset)
+                    now = time.perf_counter()
+                    latencies.extend(now - float(l.split(" ")[0]) for l in batch)
+                    received += len(batch)
+            else:
+                async for line in log_tail:
+                    send("log-line", line, log_tail.offset)
+                    latencies.append(time.perf_counter() - float(line.split(" ")[0]))
+                    received += 1
+            return received
+
+        def write():
+            if writer_process:
+                # spawned like the workflow pool's processes, so nothing is shared
+                process = multiprocessing.get_context("spawn").Process(
+                    target=write_log, args=(tmp_dir, lines, rate)
+                )
+                process.start()
+                process.join()
+            else:
+                write_log(tmp_dir, lines, rate)
+
+        # the log must exist before readers subscribe, or they poll for it
+        deploy_dir.get_log("stack").write(f"{time.perf_counter()} start\n")
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        tasks = [asyncio.create_task(reader()) for _ in range(clients)]
+        await asyncio.sleep(0)
+        open_files = len(os.listdir("/proc/self/fd")) if os.name == "posix" else 0
+        tailers = len(deploy_logs.LogTailer._tailers)
+        writer = asyncio.create_task(asyncio.to_thread(write))
+        received = await asyncio.gather(*tasks)
+        await writer
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+
+        click.echo(
+            f"{clients} readers, {lines} lines in {elapsed:.2f}s: "
+            f"{sum(received) / elapsed:.0f} lines/s delivered, "
+            f"{sum(r == lines + 1 for r in received)} readers complete"
+        )
+        click.echo(
+            f"latency p50 {percentile(latencies, 0.5) * 1000:.1f}ms, "
+            f"p99 {percentile(latencies, 0.99) * 1000:.1f}ms"
+        )
+        click.echo(
+            f"{sent['events']} events, {sent['bytes'] / 1024 / 1024:.1f} MiB, "
+            f"CPU {cpu:.2f}s"
+        )
+        click.echo(f"while tailing: {tailers} tailer(s), {open_files} open files")
+
+
+def write_log(log_dir: Path, lines: int, rate: int):
+    """Writes the log_tail benchmark's log, each line starting with the time it was written."""
+    from src.deployer.pulumi import deploy_logs
+
+    deploy_logs.LOG_DIR = log_dir
+    deploy_dir = deploy_logs.DeploymentDir("benchmark", "log-tail")
+    with deploy_dir.get_log("stack").on_output() as on_output:
+        for i in range(lines):
+            on_output(f"{time.perf_counter()} line {i} " + "." * 80)
+            if rate:
+                time.sleep(1 / rate)
+
+
+async def sse_clients(url: str, clients: int):
+    import asyncio
+
+    import aiohttp
+
+    async def client(session: aiohttp.ClientSession):
+        events = 0
+        async with session.get(url, headers={"Accept": "text/event-stream"}) as resp:
+            async for raw in resp.content:
+                line = raw.decode().strip()
+                if line.startswith("event: log-line"):
+                    events += 1
+                elif line.startswith("event: done"):
+                    break
+        return events
+
+    start = time.perf_counter()
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=None)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        results = await asyncio.gather(
+            *[client(session) for _ in range(clients)], return_exceptions=True
+        )
+    elapsed = time.perf_counter() - start
+    events = [r for r in results if isinstance(r, int)]
+    click.echo(
+        f"{len(events)}/{clients} clients completed in {elapsed:.2f}s, "
+        f"{sum(events) / elapsed:.0f} events/s"
+    )
+    for error in {repr(r) for r in results if isinstance(r, Exception)}:
+        click.echo(f"error: {error}")
+
+
+@benchmark.command()
+@click.option("--clients", default=16, help="Number of concurrent writers.")
+@click.option("--runs", default=20, help="Number of runs each writer creates.")
+@click.option(
+    "--mode",
+    "modes",
+    multiple=True,
+    default=["query", "counter"],
+    help="query: the latest run is queried before a conditional put (the previous "
+    "allocation); counter: Counter.next.",
+)
+@click.option(
+    "--endpoint",
+    default="http://localhost:8000",
+    help="The DynamoDB endpoint, eg dynamodb-local.",
+)
+@click.option("--mock", is_flag=True, help="Use an in-process moto DynamoDB instead.")
+async def run_numbers(
+    clients: int, runs: int, modes: list[str], endpoint: str, mock: bool
+):
+    """Creates runs for a single project from many concurrent writers, reporting the
+    DynamoDB requests and latency per run and any runs that failed to be numbered."""
+    import threading
+    import uuid
+    from concurrent.futures import ThreadPoolExecutor
+    from contextlib import nullcontext
+
+    from moto import mock_aws
+    from pynamodb.exceptions import PutError
+
+    from src.deployer.models.counter import Counter
+    from src.deployer.models.workflow_run import (
+        WorkflowRun,
+        WorkflowRunStatus,
+        WorkflowType,
+    )
+
+    lock = threading.Lock()
+    requests = {"count": 0}
+
+    def count_request(**kwargs):
+        with lock:
+            requests["count"] += 1
+
+    def query_create(project_id: str):
+        run = WorkflowRun(
+            project_id=project_id,
+            type=WorkflowType.DEPLOY.value,
+            status=WorkflowRunStatus.NEW.value,
+            initiated_by="benchmark",
+        )
+        for i in range(5):
+            previous = WorkflowRun.get_latest_run(project_id, WorkflowType.DEPLOY)
+            run.range_key = WorkflowRun.compose_range_key(
+                "DEPLOY", None, previous.run_number() + 1 if previous else 1
+            )
+            try:
+                run.save(condition=WorkflowRun.range_key.does_not_exist())
+                return run
+            except PutError:
+                if i == 4:
+                    raise
+
+    def counter_create(project_id: str):
+        return WorkflowRun.create(
+            project_id, WorkflowType.DEPLOY, initiated_by="benchmark"
+        )
+
+    with mock_aws() if mock else nullcontext():
+        for model in [Counter, WorkflowRun]:
+            model.Meta.host = None if mock else endpoint
+            model.Meta.region = model.Meta.region or "us-east-1"
+            model._connection = None
+            if not model.exists():
+                model.create_table(wait=True)
+            model._get_connection().connection.client.meta.events.register(
+                "before-call.dynamodb.*", count_request
+            )
+
+        for mode in modes:
+            create = counter_create if mode == "counter" else query_create
+            project_id = f"benchmark-{uuid.uuid4()}"
+            latencies, failures = [], []
+
+            def writer():
+                for _ in range(runs):
+                    start = time.perf_counter()
+                    try:
+                        create(project_id)
+                        latencies.append(time.perf_counter() - start)
+                    except PutError as e:
+                        failures.append(e)
+
+            requests["count"] = 0
+            start = time.perf_counter()
+            with ThreadPoolExecutor(clients) as pool:
+                for f in [pool.submit(writer) for _ in range(clients)]:
+                    f.result()
+            elapsed = time.perf_counter() - start
+            numbers = [r.run_number() for r in WorkflowRun.query(project_id)]
+
+            click.echo(
+                f"{mode}: {len(latencies)}/{clients * runs} runs in {elapsed:.2f}s, "
+                f"{requests['count'] / max(len(latencies), 1):.1f} requests/run, "
+                f"p50 {percentile(latencies, 0.5) * 1000:.1f}ms, "
+                f"p99 {percentile(latencies, 0.99) * 1000:.1f}ms, "
+                f"{len(failures)} failed, "
+                f"{len(numbers) - len(set(numbers))} duplicate numbers"
+            )
@@ -1,5 +1,6 @@
 import asyncclick as click
 
+from scripts.benchmarks import benchmark
 from scripts.docker_images import docker_images
 from scripts.dynamodb import dynamodb
 from scripts.iac_generator import iac
@@ -12,6 +13,7 @@ async def cli():
 
 
 if __name__ == "__main__":
+    cli.add_command(benchmark)
     cli.add_command(dynamodb)
     cli.add_command(iac)
     cli.add_command(docker_images)
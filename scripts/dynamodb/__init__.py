@@ -3,6 +3,10 @@ import boto3
 from boto3.dynamodb.conditions import Key
 from prettytable import PrettyTable
 
+from src.project.models.app_deployment import AppDeployment
+from src.project.models.app_status import AppStatus
+from src.project.models.project import Project
+
 
 @click.group()
 async def dynamodb():
@@ -247,3 +251,27 @@ async def transition_set_to_list(table_name, field_name):
         updated_item = convert_set_to_list(item)
         if updated_item:
             table.put_item(Item=updated_item)
+
+
+@dynamodb.command()
+@click.option(
+    "--project-id", default=None, help="Only repair this project's app statuses."
+)
+async def repair_app_statuses(project_id):
+    """Recomputes the materialized status of every app from its deployment history, eg
+    for apps whose status update failed after a job changed state."""
+    projects = [Project.get(project_id)] if project_id else Project.scan()
+
+    table = PrettyTable()
+    table.field_names = ["Project ID", "App ID", "Status", "Version"]
+    for project in projects:
+        app_ids = set(project.apps.keys())
+        # apps removed from the project keep their status until they're uninstalled
+        app_ids.update(s.app_id for s in AppStatus.query(project.id))
+        for app_id in sorted(app_ids):
+            app, status, _ = AppDeployment.refresh_status(project.id, app_id)
+            table.add_row(
+                [project.id, app_id, status.value, app.version() if app else None]
+            )
+
+    print(table)
@@ -1,10 +1,12 @@
 import json
 import os
+from datetime import timedelta
 from pathlib import Path
 
 import asyncclick as click
 from pydantic_yaml import parse_yaml_file_as
 
+from src.dependencies.injection import get_iac_storage
 from src.engine_service.engine_commands.export_iac import ExportIacRequest, export_iac
 from src.engine_service.engine_commands.run import (
     RunEngineRequest,
@@ -66,3 +68,20 @@ async def generate_iac(
         )
     )
     sp.copy_files(user_config, Path(output_dir), root=Path(file).parent)
+
+
+@iac.command()
+@click.option(
+    "--min-age-hours",
+    default=24,
+    help="Only delete blobs uploaded at least this many hours ago.",
+)
+@click.option("--dry-run", is_flag=True, help="List the blobs without deleting them.")
+async def collect_blobs(min_age_hours: int, dry_run: bool):
+    """Deletes IaC blobs that no version manifest or deployed record references."""
+    keys = get_iac_storage().collect_garbage(
+        min_age=timedelta(hours=min_age_hours), dry_run=dry_run
+    )
+    for key in keys:
+        print(key)
+    print(f"{'Would delete' if dry_run else 'Deleted'} {len(keys)} blobs")
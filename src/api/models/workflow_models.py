@@ -13,6 +13,7 @@ from src.deployer.models.workflow_run import (
     WorkflowRun,
     WorkflowType,
 )
+from src.deployer.pulumi.progress import DeployProgress
 
 
 class WorkflowRunSummary(BaseModel):
@@ -41,6 +42,12 @@ class WorkflowRunSummary(BaseModel):
         )
 
 
+class WorkflowRunPage(BaseModel):
+    runs: List[WorkflowRunSummary]
+    # the token of the next page, None on the last page
+    next: Optional[str]
+
+
 class WorkflowJobView(BaseModel):
     id: str
     job_number: int
@@ -69,6 +76,22 @@ class WorkflowJobView(BaseModel):
         )
 
 
+class WorkflowJobProgressView(BaseModel):
+    id: str
+    status: WorkflowJobStatus
+    progress: Optional[DeployProgress]
+
+    @classmethod
+    def from_workflow_job(cls, job: WorkflowJob):
+        return cls(
+            id=job.composite_key(),
+            status=job.status,
+            progress=(
+                DeployProgress.model_validate(job.progress) if job.progress else None
+            ),
+        )
+
+
 class WorkflowRunView(BaseModel):
     id: str
     run_number: int
@@ -0,0 +1,36 @@
+from typing import Optional
+
+from fastapi import HTTPException
+
+from src.api.models.workflow_models import WorkflowRunPage, WorkflowRunSummary
+from src.deployer.models.workflow_run import WorkflowRun, WorkflowType
+from src.util.pagination import InvalidPageToken
+
+DEFAULT_RUNS_PAGE_SIZE = 50
+MAX_RUNS_PAGE_SIZE = 100
+
+
+def list_workflow_runs(
+    project_id: str,
+    workflow_type: Optional[WorkflowType],
+    app_id: Optional[str],
+    limit: int,
+    page_token: Optional[str],
+) -> WorkflowRunPage:
+    """list_workflow_runs returns a page of runs, newest first. The page's next token is
+    passed back as the next query parameter to get the following page."""
+    if not 0 < limit <= MAX_RUNS_PAGE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"limit must be between 1 and {MAX_RUNS_PAGE_SIZE}",
+        )
+    try:
+        runs, next_token = WorkflowRun.list_runs(
+            project_id, workflow_type, app_id, limit, page_token
+        )
+    except InvalidPageToken:
+        raise HTTPException(status_code=400, detail="Invalid page token")
+    return WorkflowRunPage(
+        runs=[WorkflowRunSummary.from_workflow_run(run) for run in runs],
+        next=next_token,
+    )
@@ -4,9 +4,11 @@ from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
 from pynamodb.exceptions import DoesNotExist
 
+from src.api.models.workflow_models import WorkflowRunPage
+from src.api.pagination import DEFAULT_RUNS_PAGE_SIZE, list_workflow_runs
 from src.auth.token import get_user_id
 from src.dependencies.injection import get_binary_storage
-from src.deployer.models.workflow_run import WorkflowRun, WorkflowType
+from src.deployer.models.workflow_run import WorkflowType
 from src.engine_service.binaries.fetcher import Binary
 from src.project import ConfigValues, get_stack_packs
 from src.project.common_stack import CommonStack, Feature
@@ -184,24 +186,18 @@ async def my_stack(request: Request) -> ProjectView:
 @router.get("/api/project/workflows/runs")
 async def get_workflow_runs(
     request: Request,
-):
+    limit: int = DEFAULT_RUNS_PAGE_SIZE,
+    next: Optional[str] = None,
+) -> WorkflowRunPage:
     user_id = await get_user_id(request)
 
     workflow_type = request.query_params.get("type")
     if workflow_type:
-        try:
-            workflow_type = WorkflowType.from_str(workflow_type)
-        except ValueError:
+        workflow_type = WorkflowType.from_str(workflow_type)
+        if isinstance(workflow_type, ValueError):
             raise HTTPException(status_code=400, detail="Invalid workflow type")
 
-    return list(
-        WorkflowRun.query(
-            user_id,
-            filter_condition=(
-                WorkflowRun.type == workflow_type if workflow_type else None
-            ),
-        )
-    )
+    return list_workflow_runs(user_id, workflow_type or None, None, limit, next)
 
 
 class AppRequest(BaseModel):
@@ -1,4 +1,4 @@
-import uuid
+import asyncio
 from typing import Optional
 
 import jsons
@@ -6,14 +6,23 @@ from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
 from sse_starlette import EventSourceResponse
 from starlette.responses import Response, StreamingResponse
 
-from src.api.models.workflow_models import WorkflowRunSummary, WorkflowRunView
+from src.api.models.workflow_models import (
+    WorkflowJobProgressView,
+    WorkflowRunPage,
+    WorkflowRunSummary,
+    WorkflowRunView,
+)
+from src.api.pagination import DEFAULT_RUNS_PAGE_SIZE, list_workflow_runs
 from src.auth.token import get_email, get_user_id
+from src.dependencies.injection import get_log_storage
 from src.deployer.deploy import create_deploy_workflow_jobs
 from src.deployer.deployer import DeployerInput, get_deployer
 from src.deployer.destroy import create_destroy_workflow_jobs
 from src.deployer.models.workflow_job import WorkflowJob
 from src.deployer.models.workflow_run import WorkflowRun, WorkflowType
-from src.deployer.pulumi.deploy_logs import DeploymentDir
+from src.deployer.pulumi.builder import AppBuilder
+from src.deployer.pulumi.deploy_logs import ArchivedLogReader, DeployLog, DeploymentDir
+from src.deployer.pulumi.deployer import DeployStrategy
 from src.project.common_stack import CommonStack
 from src.project.models.app_deployment import AppDeployment
 from src.project.models.project import Project
@@ -21,11 +30,14 @@ from src.util.logging import logger
 
 router = APIRouter()
 
+DEFAULT_LOG_BATCH_BYTES = 64 * 1024
+
 
 @router.post("/api/project/workflows/install")
 async def install(
     request: Request,
     background_tasks: BackgroundTasks,
+    strategy: Optional[DeployStrategy] = None,
 ):
     user_id = await get_user_id(request)
     users_email = await get_email(request)
@@ -54,6 +66,7 @@ async def install(
     common_job, app_jobs = create_deploy_workflow_jobs(
         run,
         list(project.apps.keys()),
+        deploy_strategy=strategy,
     )
 
     get_deployer(background_tasks).install(DeployerInput(run, common_job, app_jobs))
@@ -70,6 +83,7 @@ async def install_app(
     request: Request,
     background_tasks: BackgroundTasks,
     app_id: str,
+    strategy: Optional[DeployStrategy] = None,
 ):
     user_id = await get_user_id(request)
     users_email = await get_email(request)
@@ -107,6 +121,7 @@ async def install_app(
     common_job, app_jobs = create_deploy_workflow_jobs(
         run,
         [app_id],
+        deploy_strategy=strategy,
     )
     get_deployer(background_tasks).install(DeployerInput(run, common_job, app_jobs))
     return Response(
@@ -187,6 +202,9 @@ async def stream_app_job_logs(
     workflow_type: str,
     run_number: str,
     job_number: int,
+    offset: int = 0,
+    batch_ms: int = 0,
+    batch_bytes: int = DEFAULT_LOG_BATCH_BYTES,
 ):
     return await stream_deployment_logs(
         request=request,
@@ -194,6 +212,9 @@ async def stream_app_job_logs(
         run_number=run_number,
         job_number=job_number,
         owning_app_id=app_id,
+        offset=offset,
+        batch_ms=batch_ms,
+        batch_bytes=batch_bytes,
     )
 
 
@@ -205,23 +226,27 @@ async def stream_project_job_logs(
     workflow_type: str,
     run_number: str,
     job_number: int,
+    offset: int = 0,
+    batch_ms: int = 0,
+    batch_bytes: int = DEFAULT_LOG_BATCH_BYTES,
 ):
     return await stream_deployment_logs(
         request=request,
         workflow_type=workflow_type,
         run_number=run_number,
         job_number=job_number,
+        offset=offset,
+        batch_ms=batch_ms,
+        batch_bytes=batch_bytes,
     )
 
 
-async def stream_deployment_logs(
-    request: Request,
+def get_run_composite_id(
+    user_id: str,
     workflow_type: str,
     run_number: str,
-    job_number: int,
     owning_app_id: Optional[str] = None,
-):
-    user_id = await get_user_id(request)
+) -> str:
     project_id = user_id
 
     workflow_type = (
@@ -231,9 +256,6 @@ async def stream_deployment_logs(
     if owning_app_id == "any":
         owning_app_id = ""
 
-    if not job_number:
-        raise HTTPException(status_code=400, detail="Job number is required")
-
     if run_number == "latest":
         if owning_app_id == "":
             latest_run = WorkflowRun.get_latest_run(
@@ -267,49 +289,161 @@ async def stream_deployment_logs(
             run_number=int(run_number),
         )
         run_composite_id = f"{project_id}#{run_range_key}"
+    return run_composite_id
+
+
+async def stream_deployment_logs(
+    request: Request,
+    workflow_type: str,
+    run_number: str,
+    job_number: int,
+    owning_app_id: Optional[str] = None,
+    offset: int = 0,
+    batch_ms: int = 0,
+    batch_bytes: int = DEFAULT_LOG_BATCH_BYTES,
+):
+    """stream_deployment_logs streams a job's log, starting at the byte offset. Each event's id is the
+    byte offset following its line, so a reconnecting EventSource resumes through the Last-Event-ID header.
+
+    Event streams send a log-line event per line, or with batch_ms set, a log-batch event per batch of the
+    lines that arrived within batch_ms of its first line (up to batch_bytes). A log-batch event's data is
+    its lines concatenated, each ending in a newline, and its id is the offset following its last line.
+    """
+    user_id = await get_user_id(request)
+
+    if not job_number:
+        raise HTTPException(status_code=400, detail="Job number is required")
+
+    run_composite_id = get_run_composite_id(
+        user_id, workflow_type, run_number, owning_app_id
+    )
 
     try:
         job = WorkflowJob.get(run_composite_id, job_number)
     except WorkflowJob.DoesNotExist:
         raise HTTPException(status_code=404, detail="Job not found")
 
+    if request.headers.get("accept") == "text/event-stream":
+        last_event_id = request.headers.get("last-event-id")
+        if last_event_id is not None and last_event_id.isdigit():
+            offset = int(last_event_id)
+
     deploy_dir = DeploymentDir(user_id, run_composite_id)
-    deployment_log = deploy_dir.get_log(job.modified_app_id())
+    deployment_log = deploy_dir.get_log(
+        AppBuilder.sanitize_stack_name(job.modified_app_id())
+    )
+    log_tail = await open_log(deployment_log, offset)
 
     if request.headers.get("accept") == "text/event-stream":
 
         async def tail():
             try:
-                async for line in deployment_log.tail():
-                    if await request.is_disconnected():
-                        logger.debug("Request disconnected")
-                        break
-                    yield {
-                        "event": "log-line",
-                        "data": line,
-                        "id": str(uuid.uuid4()),
-                    }
+                if batch_ms > 0:
+                    async for batch in log_tail.batches(batch_ms / 1000, batch_bytes):
+                        if await request.is_disconnected():
+                            logger.debug("Request disconnected")
+                            break
+                        yield {
+                            "event": "log-batch",
+                            "data": "".join(batch),
+                            "id": str(log_tail.offset),
+                        }
+                else:
+                    async for line in log_tail:
+                        if await request.is_disconnected():
+                            logger.debug("Request disconnected")
+                            break
+                        yield {
+                            "event": "log-line",
+                            "data": line,
+                            "id": str(log_tail.offset),
+                        }
                 logger.debug("sending done")
                 yield {
                     "event": "done",
                     "data": "done",
-                    "id": str(uuid.uuid4()),
+                    "id": str(log_tail.offset),
                 }
             except Exception as e:
                 logger.error("Error streaming logs", exc_info=e)
                 raise
             finally:
-                deployment_log.close()
+                log_tail.close()
 
         return EventSourceResponse(tail())
 
     return StreamingResponse(
-        deployment_log.tail(),
+        log_tail,
         media_type="text/plain",
         headers={"Cache-Control": "no-buffer"},
     )
 
 
+@router.get(
+    "/api/project/apps/{app_id}/workflows/{workflow_type}/runs/{run_number}/jobs/{job_number}/progress"
+)
+async def get_app_job_progress(
+    request: Request,
+    app_id: str,
+    workflow_type: str,
+    run_number: str,
+    job_number: int,
+):
+    return await get_job_progress(
+        request=request,
+        workflow_type=workflow_type,
+        run_number=run_number,
+        job_number=job_number,
+        owning_app_id=app_id,
+    )
+
+
+@router.get(
+    "/api/project/workflows/{workflow_type}/runs/{run_number}/jobs/{job_number}/progress"
+)
+async def get_project_job_progress(
+    request: Request,
+    workflow_type: str,
+    run_number: str,
+    job_number: int,
+):
+    return await get_job_progress(
+        request=request,
+        workflow_type=workflow_type,
+        run_number=run_number,
+        job_number=job_number,
+    )
+
+
+async def get_job_progress(
+    request: Request,
+    workflow_type: str,
+    run_number: str,
+    job_number: int,
+    owning_app_id: Optional[str] = None,
+) -> WorkflowJobProgressView:
+    """get_job_progress returns a job's status and resource counts, a cheap alternative to
+    streaming the job's log for clients that only show a progress bar."""
+    user_id = await get_user_id(request)
+
+    if not job_number:
+        raise HTTPException(status_code=400, detail="Job number is required")
+
+    run_composite_id = get_run_composite_id(
+        user_id, workflow_type, run_number, owning_app_id
+    )
+    try:
+        job = WorkflowJob.get(
+            run_composite_id,
+            job_number,
+            attributes_to_get=["partition_key", "job_number", "status", "progress"],
+        )
+    except WorkflowJob.DoesNotExist:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return WorkflowJobProgressView.from_workflow_job(job)
+
+
 @router.get("/api/project/workflows/{workflow_type}/runs/{run_number}")
 async def get_project_workflow_run(
     request: Request,
@@ -381,24 +515,18 @@ async def get_app_workflow_run(
 async def get_project_workflow_runs(
     request: Request,
     workflow_type: str,
-):
+    limit: int = DEFAULT_RUNS_PAGE_SIZE,
+    next: Optional[str] = None,
+) -> WorkflowRunPage:
     user_id = await get_user_id(request)
-    project_id = user_id
 
     workflow_type = (
         None if workflow_type.lower() == "any" else WorkflowType.from_str(workflow_type)
     )
+    if isinstance(workflow_type, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid workflow type")
 
-    runs = WorkflowRun.query(
-        project_id,
-        range_key_condition=(
-            WorkflowRun.range_key.startswith(f"{workflow_type.value}#")
-            if workflow_type
-            else None
-        ),
-    )
-
-    return [WorkflowRunSummary.from_workflow_run(run) for run in runs]
+    return list_workflow_runs(user_id, workflow_type, None, limit, next)
 
 
 @router.get("/api/project/apps/{app_id}/workflows/{workflow_type}/runs")
@@ -406,25 +534,35 @@ async def get_app_workflow_runs(
     request: Request,
     app_id: str,
     workflow_type: str,
-):
+    limit: int = DEFAULT_RUNS_PAGE_SIZE,
+    next: Optional[str] = None,
+) -> WorkflowRunPage:
     user_id = await get_user_id(request)
-    project_id = user_id
 
     workflow_type = (
         None if workflow_type.lower() == "any" else WorkflowType.from_str(workflow_type)
     )
-
-    runs = WorkflowRun.query(
-        project_id,
-        range_key_condition=(
-            WorkflowRun.range_key.startswith(f"{workflow_type.value}#{app_id}#")
-            if workflow_type
-            else None
-        ),
-    )
-
-    return [
-        WorkflowRunSummary.from_workflow_run(run)
-        for run in runs
-        if run.app_id() == app_id
-    ]
+    if isinstance(workflow_type, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid workflow type")
+
+    return list_workflow_runs(user_id, workflow_type, app_id, limit, next)
+
+
+async def open_log(deployment_log: DeployLog, offset: int):
+    """open_log returns a reader for the log from the byte offset. Logs that aren't on this
+    container's disk (written by another container, or evicted) are read from their archive
+    once it exists, and otherwise tailed as they're written."""
+    if not deployment_log.path.exists():
+        try:
+            storage = get_log_storage()
+            index = await asyncio.to_thread(
+                storage.get_index,
+                deployment_log.dir.user_id,
+                deployment_log.dir.deploy_id,
+                deployment_log.stack_id,
+            )
+            if index is not None:
+                return ArchivedLogReader(storage, deployment_log, index, offset)
+        except Exception:
+            logger.warning("Failed to read log archive", exc_info=True)
+    return deployment_log.tail(offset)
@@ -2,8 +2,12 @@ import os
 
 import boto3
 
+from src.deployer.pulumi.npm_cache import MaterializeMode, NodeModulesCache
 from src.engine_service.binaries.fetcher import BinaryStorage
+from src.project.storage.iac_cache import IacCache
 from src.project.storage.iac_storage import IacStorage
+from src.project.storage.live_state_storage import LiveStateStorage
+from src.project.storage.log_storage import LogStorage
 
 if os.getenv("STACK_SNAP_BINARIES_BUCKET_NAME", None) is None:
     s3_resource = boto3.resource(
@@ -28,6 +32,18 @@ def get_iac_storage():
     return IacStorage(create_iac_bucket())
 
 
+def get_iac_cache():
+    return IacCache(get_iac_storage())
+
+
+def get_live_state_storage():
+    return LiveStateStorage(create_iac_bucket())
+
+
+def get_log_storage():
+    return LogStorage(create_iac_bucket())
+
+
 def create_binary_bucket():
     return s3_resource.Bucket(
         os.environ.get("STACK_SNAP_BINARIES_BUCKET_NAME", "binary-store")
@@ -40,3 +56,8 @@ def get_binary_storage():
 
 def get_pulumi_state_bucket_name():
     return os.environ.get("PULUMI_STATE_BUCKET_NAME", None)
+
+
+def get_npm_cache():
+    cache = NodeModulesCache()
+    return None if cache.mode == MaterializeMode.OFF else cache
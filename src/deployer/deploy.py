@@ -1,18 +1,31 @@
 import asyncio
+import hashlib
 import json
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 from aiomultiprocess import Pool
 from pulumi import automation as auto
 
-from src.dependencies.injection import get_pulumi_state_bucket_name
-from src.deployer.engine import build_app, generate_iac, read_live_state
+from src.dependencies.injection import (
+    get_iac_storage,
+    get_log_storage,
+    get_npm_cache,
+    get_pulumi_state_bucket_name,
+)
+from src.deployer.engine import (
+    build_app,
+    generate_iac,
+    read_live_state,
+    snapshot_live_state,
+    store_import_constraints,
+)
 from src.deployer.models.util import (
     abort_workflow_run,
     complete_workflow_run,
+    refresh_app_statuses,
     start_workflow_run,
 )
 from src.deployer.models.workflow_job import (
@@ -22,9 +35,20 @@ from src.deployer.models.workflow_job import (
 )
 from src.deployer.models.workflow_run import WorkflowRun
 from src.deployer.pulumi.builder import AppBuilder
-from src.deployer.pulumi.deploy_logs import DeploymentDir
-from src.deployer.pulumi.deployer import AppDeployer
+from src.deployer.pulumi.deploy_logs import DeploymentDir, evict_logs
+from src.deployer.pulumi.deployer import (
+    DEFAULT_DEPLOY_STRATEGY,
+    DEFAULT_PULUMI_PARALLEL,
+    AppDeployer,
+    DeployStrategy,
+)
 from src.deployer.pulumi.manager import AppManager
+from src.deployer.pulumi.progress import DeployProgress, ProgressTracker
+from src.deployer.pulumi.targets import (
+    GENERATED_FILES,
+    changed_resources,
+    resource_urns,
+)
 from src.deployer.util import (
     get_app_workflows,
     get_expected_outputs_for_job,
@@ -37,6 +61,7 @@ from src.project.common_stack import CommonStack
 from src.project.live_state import LiveState
 from src.project.models.app_deployment import AppDeployment
 from src.project.models.project import Project
+from src.project.storage.iac_storage import DeployedIac, IacManifest
 from src.util.logging import MetricNames, MetricsLogger, logger
 from src.util.tmp import TempDir
 
@@ -63,31 +88,73 @@ async def deploy_workflow(job_id: str, job_number: int):
         workflow_job.update(
             actions=[WorkflowJob.status.set(WorkflowJobStatus.IN_PROGRESS.value)]
         )
+        refresh_app_statuses(
+            workflow_job.project_id(), [workflow_job.modified_app_id()]
+        )
+        is_common = workflow_job.modified_app_id() == CommonStack.COMMON_APP_NAME
+        # a preview must not change anything: pre-deploy hooks create resources, and
+        # the engine and IaC generation store their results for the app version
+        preview_only = get_deploy_strategy(workflow_job) == DeployStrategy.PREVIEW_ONLY
+        if (
+            preview_only
+            and not is_common
+            and AppDeployment.get_latest_deployed_version(
+                workflow_job.project_id(), CommonStack.COMMON_APP_NAME
+            )
+            is None
+        ):
+            # there's no common stack live state to build the app against
+            message = "Nothing to preview, the common stack has not been deployed."
+            workflow_job.update(
+                actions=[
+                    WorkflowJob.status.set(WorkflowJobStatus.SKIPPED.value),
+                    WorkflowJob.status_reason.set(message),
+                    WorkflowJob.completed_at.set(datetime.now(timezone.utc)),
+                ]
+            )
+            refresh_app_statuses(
+                workflow_job.project_id(), [workflow_job.modified_app_id()]
+            )
+            return WorkflowResult(WorkflowJobStatus.SKIPPED, message)
+        if not preview_only:
+            forget_live_state_checkpoint(app)
         live_state = None
-        if workflow_job.modified_app_id() != CommonStack.COMMON_APP_NAME:
+        if not is_common:
             live_state = await read_live_state(
                 workflow_job.project_id(), CommonStack.COMMON_APP_NAME
             )
         with TempDir() as tmp_dir:
-            if workflow_job.modified_app_id() != CommonStack.COMMON_APP_NAME:
+            if not is_common and not preview_only:
                 # We need to run the pre deploy hooks before building the app in case the outputs are used as config
                 success = run_pre_deploy_hooks(workflow_job, live_state)
                 if not success:
                     raise ValueError("Error running pre-deploy hooks")
-            run_engine_result = await build_app(workflow_job, tmp_dir, live_state)
-            await generate_iac(run_engine_result, workflow_job, tmp_dir)
+            run_engine_result = await build_app(
+                workflow_job, tmp_dir, live_state, dry_run=preview_only
+            )
+            await generate_iac(
+                run_engine_result, workflow_job, tmp_dir, dry_run=preview_only
+            )
             manager, deploy_status, deploy_message = deploy(workflow_job, tmp_dir)
+            await asyncio.to_thread(archive_deploy_log, workflow_job)
+            if (
+                is_common
+                and not preview_only
+                and deploy_status == WorkflowJobStatus.SUCCEEDED
+            ):
+                await snapshot_common_live_state(manager, workflow_job, project, app)
             outputs = get_expected_outputs_for_job(workflow_job)
             stack_outputs = manager.get_outputs(outputs)
             metrics_logger.log_metric(
                 MetricNames.PULUMI_DEPLOYMENT_FAILURE,
                 1 if deploy_status == WorkflowJobStatus.FAILED else 0,
             )
-            app.update(
-                actions=[
-                    AppDeployment.outputs.set(stack_outputs),
-                ],
-            )
+            if not preview_only:
+                app.update(
+                    actions=[
+                        AppDeployment.outputs.set(stack_outputs),
+                    ],
+                )
             workflow_job.update(
                 actions=[
                     WorkflowJob.status.set(deploy_status.value),
@@ -95,6 +162,9 @@ async def deploy_workflow(job_id: str, job_number: int):
                     WorkflowJob.completed_at.set(datetime.now(timezone.utc)),
                 ]
             )
+            refresh_app_statuses(
+                workflow_job.project_id(), [workflow_job.modified_app_id()]
+            )
             metrics_logger.log_metric(
                 MetricNames.DEPLOYMENT_WORKFLOW_FAILURE,
                 0,
@@ -114,9 +184,83 @@ async def deploy_workflow(job_id: str, job_number: int):
                 WorkflowJob.status_reason.set(str(e)),
             ]
         )
+        refresh_app_statuses(
+            workflow_job.project_id(), [workflow_job.modified_app_id()]
+        )
         return WorkflowResult(WorkflowJobStatus.FAILED, "Internal Error")
 
 
+async def snapshot_common_live_state(
+    manager: AppManager, workflow_job: WorkflowJob, project: Project, app: AppDeployment
+):
+    """Stores the common stack's live state once after it's deployed, and records the
+    checkpoint version it was taken at on the app, so the app jobs that follow can use it
+    without reading the stack or even selecting it (see read_live_state). The import
+    constraints derived from it are also stored once for the run's app jobs."""
+    try:
+        checkpoint_version = manager.checkpoint_version()
+        with TempDir() as tmp_dir:
+            live_state = await snapshot_live_state(
+                manager,
+                workflow_job.project_id(),
+                CommonStack.COMMON_APP_NAME,
+                tmp_dir,
+                checkpoint_version,
+            )
+        if checkpoint_version is not None:
+            app.update(
+                actions=[AppDeployment.live_state_checkpoint.set(checkpoint_version)]
+            )
+    except Exception:
+        logger.warning(
+            f"Failed to snapshot live state for {workflow_job.project_id()}",
+            exc_info=True,
+        )
+        return
+    try:
+        store_import_constraints(project, live_state, workflow_job.run_composite_key())
+    except Exception:
+        logger.warning(
+            f"Failed to store import constraints for {workflow_job.project_id()}",
+            exc_info=True,
+        )
+
+
+def forget_live_state_checkpoint(app: AppDeployment):
+    """Removes the app's recorded live state checkpoint before its stack changes, so
+    readers go back to checking the stack until a new snapshot is recorded."""
+    if app.live_state_checkpoint is not None:
+        app.update(actions=[AppDeployment.live_state_checkpoint.remove()])
+
+
+def archive_deploy_log(workflow_job: WorkflowJob):
+    """Uploads the job's log once it's complete, so it can still be read after this
+    container is gone, and evicts old archived logs from local disk."""
+    try:
+        deploy_log = DeploymentDir(
+            workflow_job.project_id(), workflow_job.partition_key
+        ).get_log(AppBuilder.sanitize_stack_name(workflow_job.modified_app_id()))
+        if deploy_log.is_complete():
+            deploy_log.archive(get_log_storage())
+        evict_logs()
+    except Exception:
+        logger.warning(
+            f"Failed to archive log for {workflow_job.composite_key()}", exc_info=True
+        )
+
+
+def get_progress_tracker(workflow_job: WorkflowJob) -> ProgressTracker:
+    """Returns a tracker that stores the job's progress as its pulumi operations run."""
+
+    def on_change(progress: DeployProgress):
+        # a key-only instance, so the update can't race with the job being updated elsewhere
+        WorkflowJob(workflow_job.partition_key, workflow_job.job_number).update(
+            actions=[WorkflowJob.progress.set(progress.model_dump(mode="json"))]
+        )
+
+    return ProgressTracker(on_change)
+
+
 def run_pre_deploy_hooks(deployment_job: WorkflowJob, live_state: LiveState):
     logger.info(f"Running pre-deploy hooks for {deployment_job.composite_key()}")
     project, app = get_project_and_app(deployment_job)
@@ -143,6 +287,91 @@ def get_pulumi_config(deployment_job: WorkflowJob) -> dict[str, str]:
     return pulumi_config
 
 
+def get_deploy_strategy(deployment_job: WorkflowJob) -> DeployStrategy:
+    """The job's own strategy wins over the stack pack's, falling back to the default."""
+    if deployment_job.deploy_strategy:
+        return DeployStrategy(deployment_job.deploy_strategy)
+    stack_pack = get_stack_pack_by_job(deployment_job)
+    if stack_pack.deploy_strategy:
+        return DeployStrategy(stack_pack.deploy_strategy)
+    return DEFAULT_DEPLOY_STRATEGY
+
+
+def get_pulumi_parallel(deployment_job: WorkflowJob) -> Optional[int]:
+    stack_pack = get_stack_pack_by_job(deployment_job)
+    return stack_pack.pulumi_parallel or DEFAULT_PULUMI_PARALLEL
+
+
+def get_config_digest(project: Project, pulumi_config: dict[str, str]) -> str:
+    """get_config_digest hashes the pulumi config and the project's AWS target."""
+    config = {
+        "config": pulumi_config,
+        "aws": [
+            project.region,
+            project.assumed_role_arn,
+            project.assumed_role_external_id,
+        ],
+    }
+    return hashlib.sha256(
+        json.dumps(config, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def get_deploy_fingerprint(manifest: IacManifest, config_digest: str) -> str:
+    """get_deploy_fingerprint hashes everything a deploy applies: the generated IaC and
+    the config (see get_config_digest)."""
+    fingerprint = {
+        "iac": [[f.path, f.digest, f.mode] for f in manifest.files],
+        "config": config_digest,
+    }
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+
+
+def get_update_targets(
+    deployment_job: WorkflowJob,
+    tmp_dir: Path,
+    manifest: IacManifest,
+    config_digest: str,
+    stack: auto.Stack,
+) -> Optional[list[str]]:
+    """get_update_targets returns the URNs of the only resources that changed since the
+    app's last successful deploy, or None if the whole stack should be updated."""
+    project_id = deployment_job.project_id()
+    app_id = deployment_job.modified_app_id()
+    try:
+        iac_storage = get_iac_storage()
+        deployed = iac_storage.get_deployed(project_id, app_id)
+        if deployed is None or deployed.config_digest != config_digest:
+            return None
+        old_files = {f.path: f.digest for f in deployed.manifest.files}
+        new_files = {f.path: f.digest for f in manifest.files}
+        changed_files = {
+            path
+            for path in old_files.keys() | new_files.keys()
+            if old_files.get(path) != new_files.get(path)
+        }
+        if "resources.yaml" not in changed_files or not changed_files.issubset(
+            GENERATED_FILES
+        ):
+            return None
+
+        changed = changed_resources(
+            iac_storage.get_blob(old_files["resources.yaml"]).decode(),
+            (tmp_dir / "resources.yaml").read_text(),
+        )
+        if changed is None:
+            return None
+        targets = resource_urns(stack.export_stack().deployment["resources"], changed)
+        logger.info(f"Targeting {targets} for {project_id}/{app_id}")
+        return targets
+    except Exception:
+        logger.warning(
+            f"Failed to compute update targets for {project_id}/{app_id}",
+            exc_info=True,
+        )
+        return None
+
+
 def deploy(
     deployment_job: WorkflowJob, tmp_dir: Path
 ) -> tuple[AppManager, WorkflowJobStatus, str]:
@@ -156,32 +385,82 @@ def deploy(
     )
 
     pulumi_config = get_pulumi_config(deployment_job)
+    manifest = IacManifest.from_directory(tmp_dir)
+    config_digest = get_config_digest(project, pulumi_config)
+    fingerprint = get_deploy_fingerprint(manifest, config_digest)
+    unchanged = app.deployed_fingerprint == fingerprint
 
-    builder = AppBuilder(tmp_dir, get_pulumi_state_bucket_name())
-    stack = builder.prepare_stack(deployment_job)
+    builder = AppBuilder(tmp_dir, get_pulumi_state_bucket_name(), get_npm_cache())
+    if unchanged:
+        # the program only runs if the drift check fails, so defer the npm install
+        stack = builder.create_pulumi_stack(deployment_job)
+    else:
+        stack = builder.prepare_stack(deployment_job)
     builder.configure_aws(
         stack,
         project.region,
         project.assumed_role_arn,
         project.assumed_role_external_id,
+        {k: auto.ConfigValue(v, secret=True) for k, v in pulumi_config.items()},
     )
-    for k, v in pulumi_config.items():
-        stack.set_config(k, auto.ConfigValue(v, secret=True))
     deployer = AppDeployer(
         stack,
         DeploymentDir(project_id, run_id),
+        get_pulumi_parallel(deployment_job),
+        get_progress_tracker(deployment_job),
     )
+    manager = AppManager(stack)
+    strategy = get_deploy_strategy(deployment_job)
+
+    # the drift check refreshes the stack, which a preview mustn't do, so previews run
+    # even when nothing changed
+    if (
+        unchanged
+        and strategy != DeployStrategy.PREVIEW_ONLY
+        and deployer.refresh_unchanged()
+    ):
+        logger.info(f"{project_id}/{app_id} is unchanged since its last deploy")
+        deployment_job.update(
+            actions=[WorkflowJob.phase_timings.set(deployer.phase_timings)]
+        )
+        return manager, WorkflowJobStatus.SUCCEEDED, "No changes to deploy."
+    if unchanged:
+        builder.install_npm_deps(deployment_job)
+
     logger.info(
         f"Deploying {project_id}/{app_id}, deployment id {deployment_job.composite_key()}"
     )
-    manager = AppManager(stack)
-    deploy_result = deployer.deploy()
+    targets = get_update_targets(
+        deployment_job, tmp_dir, manifest, config_digest, stack
+    )
+    deploy_result = deployer.deploy(strategy, targets)
+    deployment_job.update(
+        actions=[
+            WorkflowJob.deploy_strategy.set(strategy.value),
+            WorkflowJob.phase_timings.set(deployer.phase_timings),
+        ]
+    )
+    iac_storage = get_iac_storage()
+    if deploy_result[0] == WorkflowJobStatus.SUCCEEDED:
+        # targets are only used when the resources.yaml diff shows nothing else changed,
+        # so a targeted update also leaves the stack matching the whole program
+        app.update(actions=[AppDeployment.deployed_fingerprint.set(fingerprint)])
+        iac_storage.write_deployed(
+            project_id,
+            app_id,
+            DeployedIac(manifest=manifest, config_digest=config_digest),
+        )
+    elif deploy_result[0] == WorkflowJobStatus.FAILED:
+        # a partial update leaves the stack matching neither fingerprint
+        app.update(actions=[AppDeployment.deployed_fingerprint.remove()])
+        iac_storage.delete_deployed(project_id, app_id)
     return manager, deploy_result[0], deploy_result[1]
 
 
 def create_deploy_workflow_jobs(
     run: WorkflowRun,
     apps: List[str],
+    deploy_strategy: DeployStrategy | None = None,
 ) -> WorkflowJob:
     project_id = run.project_id
     project = Project.get(project_id)
@@ -196,6 +475,7 @@ def create_deploy_workflow_jobs(
         modified_app_id=CommonStack.COMMON_APP_NAME,
         modified_app_version=project.apps[CommonStack.COMMON_APP_NAME],
         initiated_by=run.initiated_by,
+        deploy_strategy=deploy_strategy.value if deploy_strategy else None,
     )
     deploy_app_jobs = []
     for app_name in apps:
@@ -209,6 +489,7 @@ def create_deploy_workflow_jobs(
                 modified_app_version=project.apps[app_name],
                 initiated_by=run.initiated_by,
                 dependencies=[deploy_common_job.composite_key()],
+                deploy_strategy=deploy_strategy.value if deploy_strategy else None,
             )
         )
     return deploy_common_job, deploy_app_jobs
@@ -231,7 +512,11 @@ async def run_full_deploy_workflow(run: WorkflowRun, common_job: WorkflowJob):
             results: list[WorkflowResult] = await asyncio.gather(*tasks)
             logger.info(f"Tasks: {tasks}")
 
-        if results[0].status != WorkflowJobStatus.SUCCEEDED:
+        # a preview-only common stack is SKIPPED, its apps are still previewed
+        if results[0].status not in [
+            WorkflowJobStatus.SUCCEEDED,
+            WorkflowJobStatus.SKIPPED,
+        ]:
             abort_workflow_run(run)
             return
     except Exception as e:
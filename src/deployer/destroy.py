@@ -5,11 +5,23 @@ from typing import List, Tuple
 
 from aiomultiprocess import Pool
 
-from src.dependencies.injection import get_iac_storage, get_pulumi_state_bucket_name
-from src.deployer.deploy import WorkflowResult
+from src.dependencies.injection import (
+    get_iac_cache,
+    get_iac_storage,
+    get_npm_cache,
+    get_pulumi_state_bucket_name,
+)
+from src.deployer.deploy import (
+    WorkflowResult,
+    archive_deploy_log,
+    forget_live_state_checkpoint,
+    get_progress_tracker,
+    get_pulumi_parallel,
+)
 from src.deployer.models.util import (
     abort_workflow_run,
     complete_workflow_run,
+    refresh_app_statuses,
     start_workflow_run,
 )
 from src.deployer.models.workflow_job import (
@@ -43,8 +55,13 @@ async def destroy_workflow(job_id: str, job_number: int):
         workflow_job.update(
             actions=[WorkflowJob.status.set(WorkflowJobStatus.IN_PROGRESS.value)]
         )
+        refresh_app_statuses(
+            workflow_job.project_id(), [workflow_job.modified_app_id()]
+        )
+        forget_live_state_checkpoint(app)
         with TempDir() as tmp_dir:
             destroy_status, destroy_message = destroy(workflow_job, tmp_dir)
+            await asyncio.to_thread(archive_deploy_log, workflow_job)
             metrics_logger.log_metric(
                 MetricNames.PULUMI_TEAR_DOWN_FAILURE,
                 1 if destroy_status == WorkflowJobStatus.FAILED else 0,
@@ -56,6 +73,9 @@ async def destroy_workflow(job_id: str, job_number: int):
                     WorkflowJob.completed_at.set(datetime.now(timezone.utc)),
                 ]
             )
+            refresh_app_statuses(
+                workflow_job.project_id(), [workflow_job.modified_app_id()]
+            )
             metrics_logger.log_metric(
                 MetricNames.DESTROY_WORKFLOW_FAILURE,
                 0,
@@ -73,6 +93,9 @@ async def destroy_workflow(job_id: str, job_number: int):
                 WorkflowJob.status_reason.set(str(e)),
             ]
         )
+        refresh_app_statuses(
+            workflow_job.project_id(), [workflow_job.modified_app_id()]
+        )
         return WorkflowResult(WorkflowJobStatus.FAILED, "Internal Error")
 
 
@@ -104,12 +127,14 @@ def destroy(
     logger.info(
         f"Destroying {app_id} in project {project_id} with job id {deployment_job.composite_key()}"
     )
-    iac_storage = get_iac_storage()
+    # a re-install after the destroy must not be mistaken for a no-op deploy
+    app.update(actions=[AppDeployment.deployed_fingerprint.remove()])
+    get_iac_storage().delete_deployed(project_id, app_id)
+    iac_cache = get_iac_cache()
 
     # todo: handle IaCDoesNotExistError
-    iac = iac_storage.get_iac(project_id, app_id, app.version())
-    builder = AppBuilder(tmp_dir, get_pulumi_state_bucket_name())
-    builder.write_iac_to_disk(iac)
+    iac_cache.extract_iac(project_id, app_id, app.version(), tmp_dir)
+    builder = AppBuilder(tmp_dir, get_pulumi_state_bucket_name(), get_npm_cache())
     stack = builder.prepare_stack(deployment_job)
     builder.configure_aws(
         stack,
@@ -120,6 +145,8 @@ def destroy(
     deployer = AppDeployer(
         stack,
         DeploymentDir(project_id, run_id),
+        get_pulumi_parallel(deployment_job),
+        get_progress_tracker(deployment_job),
     )
     return deployer.destroy_and_remove_stack()
 
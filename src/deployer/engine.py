@@ -1,14 +1,17 @@
 # Path: src/api/state_machine.py
 # Compare this snippet from src/deployer/pulumi/manager.py:
 
-from io import BytesIO
+import asyncio
 from pathlib import Path
+from typing import Optional
 
 from pulumi import automation as auto
 
 from src.dependencies.injection import (
     get_binary_storage,
+    get_iac_cache,
     get_iac_storage,
+    get_live_state_storage,
     get_pulumi_state_bucket_name,
 )
 from src.deployer.models.workflow_job import WorkflowJob
@@ -23,7 +26,10 @@ from src.project.common_stack import CommonStack
 from src.project.live_state import LiveState
 from src.project.models.app_deployment import AppDeployment
 from src.project.models.project import Project
-from src.util.compress import write_zip_to_directory, zip_directory_recurse
+from src.project.storage.live_state_storage import (
+    ImportConstraints,
+    LiveStateSnapshot,
+)
 from src.util.logging import MetricNames, MetricsLogger, logger
 from src.util.tmp import TempDir
 
@@ -32,16 +38,33 @@ async def read_live_state(project_id: str, app_id: str) -> LiveState:
     metrics_logger = MetricsLogger(project_id, app_id)
     try:
         logger.info(f"Reading live state for {project_id}/{app_id}")
-        iac_storage = get_iac_storage()
         latest_deployed = AppDeployment.get_latest_deployed_version(project_id, app_id)
+        if latest_deployed.live_state_checkpoint is not None:
+            # the snapshot taken after the last deploy is current until the stack changes
+            snapshot = get_live_state_storage().get_snapshot(project_id, app_id)
+            if (
+                snapshot is not None
+                and snapshot.checkpoint_version == latest_deployed.live_state_checkpoint
+            ):
+                logger.info(
+                    f"Using live state snapshot of {project_id}/{app_id} at recorded checkpoint {snapshot.checkpoint_version}"
+                )
+                metrics_logger.log_metric(MetricNames.READ_LIVE_STATE_FAILURE, 0)
+                return snapshot.live_state
 
+        iac_cache = get_iac_cache()
         with TempDir() as tmp_dir:
-            iac = iac_storage.get_iac(project_id, app_id, latest_deployed.version())
-            write_zip_to_directory(iac, tmp_dir)
+            await asyncio.to_thread(
+                iac_cache.extract_iac,
+                project_id,
+                app_id,
+                latest_deployed.version(),
+                tmp_dir,
+            )
             builder = AppBuilder(tmp_dir, get_pulumi_state_bucket_name())
             stack: auto.Stack = builder.select_stack(project_id, app_id)
             manager = AppManager(stack)
-            live_state = await manager.read_deployed_state(tmp_dir)
+            live_state = await load_live_state(manager, project_id, app_id, tmp_dir)
             metrics_logger.log_metric(MetricNames.READ_LIVE_STATE_FAILURE, 0)
             return live_state
     except Exception as e:
@@ -52,17 +75,96 @@ async def read_live_state(project_id: str, app_id: str) -> LiveState:
         raise e
 
 
+async def load_live_state(
+    manager: AppManager,
+    project_id: str,
+    app_id: str,
+    tmp_dir: Path,
+) -> LiveState:
+    """load_live_state returns the stack's live state from the stored snapshot if it was
+    taken at the stack's current checkpoint version. Otherwise the state is read from the
+    stack and a new snapshot is stored."""
+    storage = get_live_state_storage()
+    checkpoint_version = manager.checkpoint_version()
+    if checkpoint_version is not None:
+        snapshot = storage.get_snapshot(project_id, app_id)
+        if snapshot is not None:
+            if snapshot.checkpoint_version == checkpoint_version:
+                logger.info(
+                    f"Using live state snapshot of {project_id}/{app_id} at checkpoint {checkpoint_version}"
+                )
+                return snapshot.live_state
+            logger.info(
+                f"Live state snapshot of {project_id}/{app_id} is stale ({snapshot.checkpoint_version} != {checkpoint_version})"
+            )
+
+    return await snapshot_live_state(
+        manager, project_id, app_id, tmp_dir, checkpoint_version
+    )
+
+
+async def snapshot_live_state(
+    manager: AppManager,
+    project_id: str,
+    app_id: str,
+    tmp_dir: Path,
+    checkpoint_version: Optional[int],
+) -> LiveState:
+    """snapshot_live_state reads the live state from the stack and stores it as a snapshot
+    at checkpoint_version, the stack's current checkpoint version (see
+    AppManager.checkpoint_version). Without a checkpoint version nothing is stored."""
+    live_state = await manager.read_deployed_state(tmp_dir)
+    if checkpoint_version is not None:
+        get_live_state_storage().write_snapshot(
+            project_id,
+            app_id,
+            LiveStateSnapshot(
+                checkpoint_version=checkpoint_version, live_state=live_state
+            ),
+        )
+    return live_state
+
+
 def get_constraints_from_common_live_state(
-    project: Project, live_state: LiveState
+    project: Project, live_state: LiveState, run_id: Optional[str] = None
 ) -> list:
+    """get_constraints_from_common_live_state returns the import constraints for the
+    common stack's live state. The common job of a deploy run stores them once (see
+    store_import_constraints), so the run's app jobs don't each compute them. Otherwise,
+    eg when the common stack was only previewed, they're computed here."""
     logger.info("Getting constraints from common live state")
     if live_state is None:
         return []
-    stack_packs = get_stack_packs()
+    if run_id is not None:
+        try:
+            stored = get_live_state_storage().get_import_constraints(
+                project.id, CommonStack.COMMON_APP_NAME
+            )
+            if stored is not None and stored.run_id == run_id:
+                logger.info(f"Using import constraints stored by run {run_id}")
+                return stored.constraints
+        except Exception:
+            logger.warning("Failed to read stored import constraints", exc_info=True)
+    return compute_import_constraints(project, live_state)
+
+
+def store_import_constraints(project: Project, live_state: LiveState, run_id: str):
+    """store_import_constraints computes the import constraints for the common stack's
+    live state and stores them for the app jobs of the run."""
+    constraints = compute_import_constraints(project, live_state)
+    get_live_state_storage().write_import_constraints(
+        project.id,
+        CommonStack.COMMON_APP_NAME,
+        ImportConstraints(run_id=run_id, constraints=constraints),
+    )
+
+
+def compute_import_constraints(project: Project, live_state: LiveState) -> list:
     common_version = project.apps.get(CommonStack.COMMON_APP_NAME, 0)
     if common_version == 0:
         raise ValueError("Common stack not found")
 
+    stack_packs = get_stack_packs()
     common_app = AppDeployment.get(
         project.id,
         AppDeployment.compose_range_key(
@@ -74,7 +176,10 @@ def get_constraints_from_common_live_state(
 
 
 async def build_app(
-    deployment_job: WorkflowJob, tmp_dir: Path, live_state: LiveState = None
+    deployment_job: WorkflowJob,
+    tmp_dir: Path,
+    live_state: LiveState = None,
+    dry_run: bool = False,
 ) -> RunEngineResult:
     metrics_logger = MetricsLogger(
         deployment_job.project_id(), deployment_job.modified_app_id()
@@ -93,7 +198,10 @@ async def build_app(
             app_dir=tmp_dir,
             binary_storage=binary_storage,
             region=project.region,
-            imports=get_constraints_from_common_live_state(project, live_state),
+            imports=get_constraints_from_common_live_state(
+                project, live_state, deployment_job.run_composite_key()
+            ),
+            dry_run=dry_run,
         )
         metrics_logger.log_metric(MetricNames.ENGINE_FAILURE, 0)
         return engine_result
@@ -106,7 +214,10 @@ async def build_app(
 
 
 async def generate_iac(
-    run_result: RunEngineResult, deployment_job: WorkflowJob, tmp_dir: Path
+    run_result: RunEngineResult,
+    deployment_job: WorkflowJob,
+    tmp_dir: Path,
+    dry_run: bool = False,
 ):
     metrics_logger = MetricsLogger(
         deployment_job.project_id(), deployment_job.modified_app_id()
@@ -128,9 +239,11 @@ async def generate_iac(
         )
         stack_pack = get_stack_pack_by_job(deployment_job)
         stack_pack.copy_files(app.get_configurations(), tmp_dir)
-        iac_bytes = zip_directory_recurse(BytesIO(), tmp_dir)
-        logger.info(f"Writing IAC for {app_id} version {app.version()}")
-        iac_storage.write_iac(project_id, app_id, app.version(), iac_bytes)
+        if not dry_run:
+            logger.info(f"Writing IAC for {app_id} version {app.version()}")
+            await asyncio.to_thread(
+                iac_storage.write_iac_dir, project_id, app_id, app.version(), tmp_dir
+            )
         metrics_logger.log_metric(MetricNames.IAC_GENERATION_FAILURE, 0)
         return
     except Exception as e:
@@ -0,0 +1,72 @@
+import os
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from pynamodb.attributes import NumberAttribute, TTLAttribute, UnicodeAttribute
+from pynamodb.exceptions import PutError, UpdateError
+from pynamodb.models import Model
+
+from src.util.logging import logger
+
+
+class Counter(Model):
+    """Counter allocates sequence numbers (eg, run and job numbers) with an atomic ADD, so
+    concurrent writers each get a distinct number in a single round trip."""
+
+    class Meta:
+        table_name = os.environ.get("COUNTERS_TABLE_NAME", "Counters")
+        billing_mode = "PAY_PER_REQUEST"
+        host = os.environ.get("DYNAMODB_HOST", None)
+        region = os.environ.get("AWS_DEFAULT_REGION", None)
+
+    id: str = UnicodeAttribute(hash_key=True)
+    value: int = NumberAttribute(default=0)
+    # counters that are only needed for a while (eg, a run's job numbers) are removed by DynamoDB
+    expires_at: Optional[datetime] = TTLAttribute(null=True)
+
+    @classmethod
+    def next(cls, id: str, ttl: Optional[timedelta] = None) -> int:
+        """next returns the counter's next number, starting at 1. With a ttl, the counter
+        expires that long after its last use."""
+        counter = cls(id)
+        actions = [cls.value.add(1)]
+        if ttl is not None:
+            actions.append(cls.expires_at.set(ttl))
+        counter.update(actions=actions)
+        return counter.value
+
+    @classmethod
+    def advance_to(cls, id: str, value: int):
+        """advance_to raises the counter to at least value, eg, to skip numbers that were
+        allocated before the counter existed."""
+        try:
+            cls(id).update(
+                actions=[cls.value.set(value)],
+                condition=cls.value.does_not_exist() | (cls.value < value),
+            )
+        except UpdateError as e:
+            if e.cause_response_code != "ConditionalCheckFailedException":
+                raise
+
+
+def save_numbered(
+    counter_id: str,
+    save: Callable[[int], None],
+    latest: Callable[[], Optional[int]],
+    attempts: int = 5,
+    ttl: Optional[timedelta] = None,
+) -> int:
+    """save_numbered saves an item under the counter's next number. save must fail with a
+    PutError if the number is taken, which only happens if items were numbered before the
+    counter existed (or after it expired); the counter is then advanced past latest() and
+    the save retried."""
+    for i in range(attempts):
+        number = Counter.next(counter_id, ttl)
+        try:
+            save(number)
+            return number
+        except PutError:
+            logger.warning(f"Number {number} of {counter_id} taken; attempt={i + 1}")
+            if i == attempts - 1:
+                raise
+            Counter.advance_to(counter_id, latest() or 0)
@@ -1,4 +1,12 @@
 from datetime import datetime, timezone
+from functools import cache
+from typing import Iterable, Optional
+
+from pynamodb.connection import Connection
+from pynamodb.expressions.condition import Condition
+from pynamodb.expressions.update import Action
+from pynamodb.models import Model
+from pynamodb.transactions import TransactWrite
 
 from src.deployer.models.workflow_job import WorkflowJob, WorkflowJobStatus
 from src.deployer.models.workflow_run import WorkflowRun, WorkflowRunStatus
@@ -8,6 +16,47 @@ from src.util import analytics
 from src.util.logging import logger
 
 
+# the most items DynamoDB allows in a single TransactWriteItems call
+TRANSACT_WRITE_LIMIT = 100
+
+
+@cache
+def transaction_connection() -> Connection:
+    """transaction_connection returns the connection transactions are made on. The tables
+    all share the same region and host."""
+    return Connection(region=WorkflowRun.Meta.region, host=WorkflowRun.Meta.host)
+
+
+def transact_update(updates: list[tuple[Model, list[Action], Optional[Condition]]]):
+    """transact_update applies the updates in as few transactions as possible. Updates
+    beyond TRANSACT_WRITE_LIMIT go in further transactions, which aren't atomic with the
+    first. An item can only be updated once per transaction."""
+    for i in range(0, len(updates), TRANSACT_WRITE_LIMIT):
+        with TransactWrite(connection=transaction_connection()) as transaction:
+            for model, actions, condition in updates[i : i + TRANSACT_WRITE_LIMIT]:
+                transaction.update(model, actions=actions, condition=condition)
+
+
+def clear_destroy_in_progress(project_id: str):
+    Project(project_id).update(
+        actions=[Project.destroy_in_progress.set(False)],
+        condition=Project.id.exists(),
+    )
+
+
+def refresh_app_statuses(project_id: str, app_ids: Iterable[str]):
+    """refresh_app_statuses updates the materialized status of each app after its jobs
+    changed state. A failure is logged rather than raised since the job update itself has
+    succeeded; the status is fixed by the app's next job change or by repairing it."""
+    for app_id in set(app_ids):
+        try:
+            AppDeployment.refresh_status(project_id, app_id)
+        except Exception as e:
+            logger.error(
+                f"Error refreshing status of {project_id}/{app_id}: {e}", exc_info=True
+            )
+
+
 # cancel_in_progress_jobs can be used to cancel all jobs in progress or only those that have not yet started
 # this just marks them as canceled in the table -- it does not stop ongoing operations
 def abort_workflow_run(
@@ -15,12 +64,7 @@ def abort_workflow_run(
     cancel_in_progress_jobs: bool = False,
     default_run_status: WorkflowRunStatus = None,
 ):
-    project = Project.get(run.project_id)
-    project.update(
-        actions=[
-            Project.destroy_in_progress.set(False),
-        ],
-    )
+    clear_destroy_in_progress(run.project_id)
     if default_run_status is None:
         default_run_status = WorkflowRunStatus.CANCELED
     logger.info(f"Aborting workflow run {run.composite_key()}")
@@ -37,17 +81,20 @@ def abort_workflow_run(
     failed = False
     has_in_progress_jobs = False
     failed_job_number = None
+    now = datetime.now(timezone.utc)
+    cancel_actions = [
+        WorkflowJob.status.set(WorkflowJobStatus.CANCELED.value),
+        WorkflowJob.status_reason.set(
+            "Workflow job canceled due to early termination of workflow run"
+        ),
+        WorkflowJob.completed_at.set(now),
+    ]
+    updates = []
+    canceled_apps = []
     for job in jobs:
         if job.status in [WorkflowJobStatus.PENDING.value, WorkflowRunStatus.NEW.value]:
-            job.update(
-                actions=[
-                    WorkflowJob.status.set(WorkflowJobStatus.CANCELED.value),
-                    WorkflowJob.status_reason.set(
-                        "Workflow job canceled due to early termination of workflow run"
-                    ),
-                    WorkflowJob.completed_at.set(datetime.now(timezone.utc)),
-                ]
-            )
+            updates.append((job, cancel_actions, None))
+            canceled_apps.append(job.modified_app_id())
         elif job.status in [
             WorkflowJobStatus.SUCCEEDED.value,
             WorkflowJobStatus.SKIPPED.value,
@@ -55,15 +102,8 @@ def abort_workflow_run(
             continue
         elif job.status == WorkflowJobStatus.IN_PROGRESS.value:
             if cancel_in_progress_jobs:
-                job.update(
-                    actions=[
-                        WorkflowJob.status.set(WorkflowJobStatus.CANCELED.value),
-                        WorkflowJob.status_reason.set(
-                            "Workflow job canceled due to early termination of workflow run"
-                        ),
-                        WorkflowJob.completed_at.set(datetime.now(timezone.utc)),
-                    ]
-                )
+                updates.append((job, cancel_actions, None))
+                canceled_apps.append(job.modified_app_id())
             else:
                 has_in_progress_jobs = True
         elif job.status == WorkflowJobStatus.FAILED.value:
@@ -71,27 +111,34 @@ def abort_workflow_run(
             failed_job_number = job.job_number
 
     if not has_in_progress_jobs:
-        run.update(
-            actions=[
-                WorkflowRun.status.set(
-                    WorkflowRunStatus.FAILED.value
-                    if failed
-                    else default_run_status.value
-                ),
-                WorkflowRun.status_reason.set(
-                    f"Workflow run failed at job {failed_job_number}"
-                    if failed
-                    else "Workflow run aborted"
-                ),
-                WorkflowRun.completed_at.set(datetime.now(timezone.utc)),
-            ]
+        run.status = (
+            WorkflowRunStatus.FAILED.value if failed else default_run_status.value
+        )
+        run.status_reason = (
+            f"Workflow run failed at job {failed_job_number}"
+            if failed
+            else "Workflow run aborted"
         )
+        run.completed_at = now
+        updates.append(
+            (
+                run,
+                [
+                    WorkflowRun.status.set(run.status),
+                    WorkflowRun.status_reason.set(run.status_reason),
+                    WorkflowRun.completed_at.set(run.completed_at),
+                ],
+                None,
+            )
+        )
+    transact_update(updates)
+    refresh_app_statuses(run.project_id, canceled_apps)
 
 
 def complete_workflow_run(run: WorkflowRun) -> WorkflowRunStatus | None:
     try:
         logger.info(f"Completing workflow run {run.composite_key()}")
-        jobs = run.get_jobs()
+        jobs = list(run.get_jobs())
         failed = False
         canceled = False
         for job in jobs:
@@ -138,18 +185,15 @@ def complete_workflow_run(run: WorkflowRun) -> WorkflowRunStatus | None:
             if canceled
             else WorkflowRunStatus.FAILED if failed else WorkflowRunStatus.SUCCEEDED
         )
+        # catches statuses whose refresh failed after a job update during the run
+        refresh_app_statuses(run.project_id, [job.modified_app_id() for job in jobs])
         return end_status
 
     except Exception as e:
         logger.error(f"Error completing workflow run {run.composite_key()}: {e}")
         return None
     finally:
-        project = Project.get(run.project_id)
-        project.update(
-            actions=[
-                Project.destroy_in_progress.set(False),
-            ],
-        )
+        clear_destroy_in_progress(run.project_id)
         analytics.track(
             event="WorkflowRunCompleted",
             user_id=run.initiated_by,
@@ -165,40 +209,53 @@ def complete_workflow_run(run: WorkflowRun) -> WorkflowRunStatus | None:
 def start_workflow_run(run: WorkflowRun):
     try:
         logger.info(f"Starting workflow run {run.composite_key()}")
-        jobs = run.get_jobs()
-        run.update(
-            actions=[
-                WorkflowRun.status.set(WorkflowRunStatus.IN_PROGRESS.value),
-                WorkflowRun.status_reason.set("Workflow run in progress"),
-                WorkflowRun.initiated_at.set(datetime.now(timezone.utc)),
-            ]
-        )
-        project = Project.get(run.project_id)
+        jobs = list(run.get_jobs())
+        run.status = WorkflowRunStatus.IN_PROGRESS.value
+        run.status_reason = "Workflow run in progress"
+        run.initiated_at = datetime.now(timezone.utc)
+        updates = [
+            (
+                run,
+                [
+                    WorkflowRun.status.set(run.status),
+                    WorkflowRun.status_reason.set(run.status_reason),
+                    WorkflowRun.initiated_at.set(run.initiated_at),
+                ],
+                None,
+            )
+        ]
+        deployments: dict[str, list[str]] = {}
         for job in jobs:
-            job.update(
-                actions=[
-                    WorkflowJob.status.set(WorkflowJobStatus.PENDING.value),
-                    WorkflowJob.status_reason.set("Workflow job pending"),
-                ]
+            updates.append(
+                (
+                    job,
+                    [
+                        WorkflowJob.status.set(WorkflowJobStatus.PENDING.value),
+                        WorkflowJob.status_reason.set("Workflow job pending"),
+                    ],
+                    None,
+                )
             )
-            app = AppDeployment.get(
-                project.id,
-                AppDeployment.compose_range_key(
-                    app_id=job.modified_app_id(),
-                    version=job.modified_app_version(),
-                ),
+            app_range_key = AppDeployment.compose_range_key(
+                app_id=job.modified_app_id(),
+                version=job.modified_app_version(),
             )
-            app.update(
-                actions=[
-                    AppDeployment.deployments.set(
-                        (
-                            AppDeployment.deployments.append([job.composite_key()])
-                            if app.deployments
-                            else [job.composite_key()]
-                        ),
-                    ),
-                ]
+            deployments.setdefault(app_range_key, []).append(job.composite_key())
+        # appending to a missing list starts it, so the apps don't need to be read first
+        for app_range_key, job_keys in deployments.items():
+            updates.append(
+                (
+                    AppDeployment(run.project_id, app_range_key),
+                    [
+                        AppDeployment.deployments.set(
+                            (AppDeployment.deployments | []).append(job_keys)
+                        )
+                    ],
+                    AppDeployment.project_id.exists(),
+                )
             )
+        transact_update(updates)
+        refresh_app_statuses(run.project_id, [job.modified_app_id() for job in jobs])
         analytics.track(
             event="WorkflowRunStarted",
             user_id=run.initiated_by,
@@ -1,5 +1,5 @@
 import os
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from typing import Optional
 
@@ -10,11 +10,14 @@ from pynamodb.attributes import (
     UnicodeAttribute,
     UTCDateTimeAttribute,
 )
-from pynamodb.exceptions import PutError
 from pynamodb.models import Model
 
+from src.deployer.models.counter import save_numbered
 from src.project import get_app_name
-from src.util.logging import logger
+
+# A run's jobs are all created shortly after the run, so its job counter can expire well
+# before it's needed again. Numbering a job after that still works, it just takes a retry.
+JOB_COUNTER_TTL = timedelta(days=1)
 
 
 class WorkflowJobStatus(Enum):
@@ -57,6 +60,12 @@ class WorkflowJob(Model):
     dependencies: list[str] = ListAttribute(of=UnicodeAttribute, default=list)
     modified_app: str = UnicodeAttribute()
     outputs: dict[str, str] = JSONAttribute(null=True)
+    # DeployStrategy value for deploy jobs, None uses the pack's or the global default
+    deploy_strategy: str = UnicodeAttribute(null=True)
+    # seconds spent in each pulumi operation, eg {"refresh": 4.2, "up": 31.0}
+    phase_timings: dict[str, float] = JSONAttribute(null=True)
+    # DeployProgress of the job's pulumi operations, updated while they run
+    progress: dict = JSONAttribute(null=True)
 
     def project_id(self) -> str:
         return self.partition_key.split("#")[0]
@@ -141,6 +150,7 @@ class WorkflowJob(Model):
         initiated_by: str,
         dependencies: Optional[list[str]] = None,
         title: Optional[str] = None,
+        deploy_strategy: Optional[str] = None,
     ):
         if dependencies is None:
             dependencies = []
@@ -158,23 +168,21 @@ class WorkflowJob(Model):
             initiated_by=initiated_by,
             dependencies=dependencies,
             title=title,
+            deploy_strategy=deploy_strategy,
         )
 
-        for i in range(5):
-            try:
-                last_job = cls.get_latest_job(partition_key)
-                job_number = last_job.job_number + 1 if last_job else 1
-                job.job_number = job_number
-                job.save(
-                    condition=WorkflowJob.partition_key.does_not_exist()
-                    & WorkflowJob.job_number.does_not_exist()
-                )
-                break
-            except PutError:
-                logger.warning(f"Failed to save job {job.job_number}; attempt={i + 1}")
-                if i == 4:
-                    raise
+        def save(job_number: int):
+            job.job_number = job_number
+            job.save(
+                condition=WorkflowJob.partition_key.does_not_exist()
+                & WorkflowJob.job_number.does_not_exist()
+            )
+
+        def latest() -> Optional[int]:
+            last_job = cls.get_latest_job(partition_key)
+            return last_job.job_number if last_job else None
 
+        save_numbered(f"job#{partition_key}", save, latest, ttl=JOB_COUNTER_TTL)
         return job
 
 
@@ -1,14 +1,17 @@
+import heapq
 import os
 from datetime import datetime, timezone
 from enum import Enum
+from itertools import islice
 from typing import Iterable, NamedTuple, Optional
 
 from pynamodb.attributes import UnicodeAttribute, UTCDateTimeAttribute
-from pynamodb.exceptions import PutError
+from pynamodb.indexes import AllProjection, GlobalSecondaryIndex
 from pynamodb.models import Model
 
+from src.deployer.models.counter import save_numbered
 from src.deployer.models.workflow_job import WorkflowJob
-from src.util.logging import logger
+from src.util.pagination import decode_page_token, encode_page_token
 
 
 class WorkflowRunStatus(Enum):
@@ -38,6 +41,30 @@ class WorkflowRunRangeKey(NamedTuple):
     app_id: Optional[str]
 
 
+# the attributes of a WorkflowRunSummary
+SUMMARY_ATTRIBUTES = [
+    "project_id",
+    "range_key",
+    "type",
+    "status",
+    "created_at",
+    "initiated_by",
+    "initiated_at",
+    "completed_at",
+]
+
+
+class CreatedAtIndex(GlobalSecondaryIndex):
+    """Orders a project's runs by created_at, across workflow types and apps."""
+
+    class Meta:
+        index_name = "created_at_index"
+        projection = AllProjection()
+
+    project_id = UnicodeAttribute(hash_key=True)
+    created_at = UTCDateTimeAttribute(range_key=True)
+
+
 class WorkflowRun(Model):
     class Meta:
         table_name = os.environ.get("WORKFLOW_RUNS_TABLE_NAME", "WorkflowRuns")
@@ -59,6 +86,8 @@ class WorkflowRun(Model):
     initiated_by: str = UnicodeAttribute()
     notification_email: str = UnicodeAttribute(null=True)
 
+    created_at_index = CreatedAtIndex()
+
     def workflow_type(self) -> str:
         return self.range_key.split("#")[0]
 
@@ -82,14 +111,21 @@ class WorkflowRun(Model):
         app_id: Optional[str] = None,
     ):
 
+        if workflow_type is None and app_id is None:
+            for run in cls.created_at_index.query(
+                project_id, scan_index_forward=False, limit=1
+            ):
+                return run
+            return None
+
         if workflow_type is None:
-            # TODO: consider an LSI for this query
-            # get the latest run for the project by created_at
-            latest_run = None
-            for run in cls.query(project_id):
-                if latest_run is None or run.created_at > latest_run.created_at:
-                    latest_run = run
-            return latest_run
+            # the app's runs of each type are contiguous in the range key
+            runs = [cls.get_latest_run(project_id, t, app_id) for t in WorkflowType]
+            return max(
+                (r for r in runs if r is not None),
+                key=lambda r: r.created_at,
+                default=None,
+            )
 
         for run in cls.query(
             project_id,
@@ -157,6 +193,92 @@ class WorkflowRun(Model):
         if workflow_type is None and app_id:
             return filter(lambda x: x.app_id() == app_id, results)
 
+    @classmethod
+    def list_runs(
+        cls,
+        project_id: str,
+        workflow_type: Optional[WorkflowType] = None,
+        app_id: Optional[str] = None,
+        limit: int = 50,
+        page_token: Optional[str] = None,
+    ) -> tuple[list["WorkflowRun"], Optional[str]]:
+        """list_runs returns a page of the project's runs, newest first, with only the
+        attributes of a run summary, and the token of the next page (None on the last page).
+
+        The project's runs are read from the created_at index. An app's runs of each
+        workflow type are contiguous in the range key, so they're read by key condition,
+        one query per type, and merged. Each query reads one run past the page, to tell
+        whether there are more."""
+        state = decode_page_token(page_token) or {}
+        if app_id is None:
+            runs = list(
+                cls.created_at_index.query(
+                    project_id,
+                    filter_condition=(
+                        cls.type == workflow_type.value if workflow_type else None
+                    ),
+                    scan_index_forward=False,
+                    limit=limit + 1,
+                    last_evaluated_key=state.get("all"),
+                    attributes_to_get=SUMMARY_ATTRIBUTES,
+                )
+            )
+            if len(runs) <= limit:
+                return runs, None
+            last_key = {
+                **runs[limit - 1].key(),
+                "created_at": {
+                    "S": cls.created_at.serialize(runs[limit - 1].created_at)
+                },
+            }
+            return runs[:limit], encode_page_token({"all": last_key})
+
+        # a type's state is the key of its last run returned, None once all its runs
+        # have been returned, or missing if none of its runs have been returned yet
+        types = [t.value for t in ([workflow_type] if workflow_type else WorkflowType)]
+        streams = {}
+        for t in types:
+            if t in state and state[t] is None:
+                continue
+            streams[t] = list(
+                cls.query(
+                    project_id,
+                    range_key_condition=cls.range_key.startswith(f"{t}#{app_id}#"),
+                    scan_index_forward=False,
+                    limit=limit + 1,
+                    last_evaluated_key=state.get(t),
+                    attributes_to_get=SUMMARY_ATTRIBUTES,
+                )
+            )
+
+        page = list(
+            islice(
+                heapq.merge(
+                    *[[(t, run) for run in runs] for t, runs in streams.items()],
+                    key=lambda r: r[1].created_at,
+                    reverse=True,
+                ),
+                limit,
+            )
+        )
+        next_state = {t: v for t, v in state.items() if v is None}
+        for t, runs in streams.items():
+            returned = [run for page_t, run in page if page_t == t]
+            if len(returned) == len(runs):
+                next_state[t] = None
+            elif returned:
+                next_state[t] = returned[-1].key()
+            elif t in state:
+                next_state[t] = state[t]
+        more = any(next_state.get(t, "start") is not None for t in types)
+        return [run for _, run in page], encode_page_token(next_state if more else None)
+
+    def key(self) -> dict:
+        return {
+            "project_id": {"S": self.project_id},
+            "range_key": {"S": self.range_key},
+        }
+
     @classmethod
     def create(
         cls,
@@ -173,23 +295,25 @@ class WorkflowRun(Model):
             initiated_by=initiated_by,
             notification_email=notification_email,
         )
-        for i in range(5):
-            previous_run = cls.get_latest_run(project_id, workflow_type, app_id)
-            run_number = previous_run.run_number() + 1 if previous_run else 1
+
+        def save(run_number: int):
             run.range_key = cls.compose_range_key(
                 workflow_type=workflow_type.value, app_id=app_id, run_number=run_number
             )
-            try:
-                run.save(
-                    condition=(
-                        WorkflowRun.project_id.does_not_exist()
-                        & WorkflowRun.range_key.does_not_exist()
-                    )
+            run.save(
+                condition=(
+                    WorkflowRun.project_id.does_not_exist()
+                    & WorkflowRun.range_key.does_not_exist()
                 )
-                break
-            except PutError as e:
-                logger.warn(f"Failed to save run: {e}; attempt={i + 1}")
-                if i == 4:
-                    raise e
+            )
+
+        def latest() -> Optional[int]:
+            previous_run = cls.get_latest_run(project_id, workflow_type, app_id)
+            return previous_run.run_number() if previous_run else None
 
+        save_numbered(
+            f"run#{project_id}#{workflow_type.value}#{app_id if app_id else ''}",
+            save,
+            latest,
+        )
         return run
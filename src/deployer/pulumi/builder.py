@@ -1,23 +1,49 @@
+import json
 import os
 import re
+import shutil
 import subprocess
+import time
 import zipfile
 from io import BytesIO
 from pathlib import Path
 from typing import Optional
 
 from pulumi import automation as auto
+from pydantic_yaml import parse_yaml_raw_as
 
 from src.deployer.models.workflow_job import WorkflowJob
 from src.deployer.pulumi.deploy_logs import DeploymentDir
+from src.deployer.pulumi.npm_cache import NodeModulesCache
+from src.project.live_state import LiveState
 from src.util.compress import zip_directory_recurse
 from src.util.logging import logger as log
 
+# Plugins are installed into PULUMI_HOME. When it's set (eg, to a volume shared by every
+# task), every stack uses it so a provider is only downloaded once. Otherwise pulumi's
+# default, ~/.pulumi, is shared by the stacks of one container.
+PULUMI_HOME = Path(os.environ["PULUMI_HOME"]) if os.getenv("PULUMI_HOME") else None
+
+# Overrides the S3 state bucket, eg file:///tmp/stacksnap-state to keep state locally.
+PULUMI_BACKEND_URL = os.getenv("PULUMI_BACKEND_URL", None)
+# Replaces generated programs with a stand-in that creates no cloud resources.
+PULUMI_STANDIN_PROGRAM = os.getenv("PULUMI_STANDIN_PROGRAM", "").lower() in [
+    "1",
+    "true",
+]
+STANDIN_PROGRAM_DIR = Path(__file__).parent / "standin"
+
 
 class AppBuilder:
-    def __init__(self, output_dir: Path, state_bucket_name: str):
+    def __init__(
+        self,
+        output_dir: Path,
+        state_bucket_name: str,
+        npm_cache: Optional[NodeModulesCache] = None,
+    ):
         self.state_bucket_name = state_bucket_name
         self.output_dir = output_dir
+        self.npm_cache = npm_cache
 
     @staticmethod
     def sanitize_stack_name(name: str) -> str:
@@ -35,21 +61,36 @@ class AppBuilder:
         with zipfile.ZipFile(zip_io, "r") as zip_file:
             zip_file.extractall(self.output_dir)
 
-    def create_pulumi_stack(self, job: WorkflowJob) -> auto.Stack:
-        log.info(f"Creating stack for {job.project_id()} {job.modified_app_id()}")
-        s3_opts = auto.LocalWorkspaceOptions(
-            project_settings=auto.ProjectSettings(
-                name=AppBuilder.sanitize_stack_name(
-                    f"{job.project_id()}/{job.modified_app_id()}"
-                ),
-                runtime="nodejs",
-                backend=auto.ProjectBackend(f"s3://{self.state_bucket_name}"),
-            ),
+    def workspace_options(
+        self, project_id: str, app_id: str
+    ) -> auto.LocalWorkspaceOptions:
+        if PULUMI_HOME is not None:
+            PULUMI_HOME.mkdir(parents=True, exist_ok=True)
+        opts = auto.LocalWorkspaceOptions(
+            pulumi_home=str(PULUMI_HOME) if PULUMI_HOME is not None else None,
             env_vars={
                 "PULUMI_CONFIG_PASSPHRASE": "",
                 "PULUMI_CONFIG_PASSPHRASE_FILE": "",
+                # avoids a request to check for CLI updates on every command
+                "PULUMI_SKIP_UPDATE_CHECK": "true",
             },
         )
+        backend_url = self.backend_url()
+        if backend_url:
+            if backend_url.startswith("file://"):
+                Path(backend_url.removeprefix("file://")).mkdir(
+                    parents=True, exist_ok=True
+                )
+            opts.project_settings = auto.ProjectSettings(
+                name=AppBuilder.sanitize_stack_name(f"{project_id}/{app_id}"),
+                runtime="nodejs",
+                backend=auto.ProjectBackend(backend_url),
+            )
+        return opts
+
+    def create_pulumi_stack(self, job: WorkflowJob) -> auto.Stack:
+        log.info(f"Creating stack for {job.project_id()} {job.modified_app_id()}")
+        opts = self.workspace_options(job.project_id(), job.modified_app_id())
         os.environ["PULUMI_CONFIG_PASSPHRASE"] = ""
         os.environ["PULUMI_CONFIG_PASSPHRASE_FILE"] = ""
         os.environ["PULUMI_DEBUG"] = "true"
@@ -57,7 +98,7 @@ class AppBuilder:
             stack_name=AppBuilder.sanitize_stack_name(job.modified_app_id()),
             project_name=job.project_id(),
             work_dir=str(self.output_dir),
-            opts=s3_opts if self.state_bucket_name else None,
+            opts=opts,
         )
         log.info(
             f"Successfully created stack for {job.project_id()} {job.modified_app_id()}"
@@ -70,29 +111,100 @@ class AppBuilder:
         region: str,
         role_arn: str,
         external_id: Optional[str] = None,
+        config: Optional[dict[str, auto.ConfigValue]] = None,
     ):
-        stack.set_config("aws:region", auto.ConfigValue(region))
-        stack.set_config(
-            "aws:assumeRole.roleArn", auto.ConfigValue(role_arn), path=True
-        )
+        """configure_aws sets the AWS provider config along with any additional stack
+        config. Every config call shells out to the pulumi CLI, so everything is set in a
+        single batched call whenever possible."""
+        start = time.perf_counter()
+        aws_config = {
+            "aws:region": auto.ConfigValue(region),
+            "aws:assumeRole.roleArn": auto.ConfigValue(role_arn),
+        }
         if external_id:
-            stack.set_config(
-                "aws:assumeRole.externalId", auto.ConfigValue(external_id), path=True
+            aws_config["aws:assumeRole.externalId"] = auto.ConfigValue(external_id)
+
+        config = config or {}
+        # The assumeRole keys must be set as paths. Setting the other keys as paths is
+        # equivalent unless they contain path syntax, which needs a separate call.
+        if any("." in k or "[" in k for k in config):
+            stack.set_all_config(config)
+            stack.set_all_config(aws_config, path=True)
+        else:
+            stack.set_all_config({**aws_config, **config}, path=True)
+        log.info(
+            "Configured stack %s with %d keys in %.2fs",
+            stack.name,
+            len(aws_config) + len(config),
+            time.perf_counter() - start,
+        )
+
+    def backend_url(self) -> Optional[str]:
+        if PULUMI_BACKEND_URL:
+            return PULUMI_BACKEND_URL
+        if self.state_bucket_name:
+            return f"s3://{self.state_bucket_name}"
+        return None
+
+    def use_standin_program(self):
+        """use_standin_program swaps the generated program in output_dir for the stand-in
+        program, which mirrors the resources and edges of resources.yaml (see
+        standin/index.ts)."""
+        resources_yaml = Path(self.output_dir) / "resources.yaml"
+        graph = parse_yaml_raw_as(
+            LiveState, resources_yaml.read_text() if resources_yaml.exists() else "{}"
+        )
+        shutil.copytree(STANDIN_PROGRAM_DIR, self.output_dir, dirs_exist_ok=True)
+        (Path(self.output_dir) / "standin.json").write_text(
+            json.dumps(
+                {
+                    "resources": graph.resources,
+                    "edges": [
+                        [e.strip() for e in edge.split("->")]
+                        for edge in (graph.edges or {}).keys()
+                    ],
+                },
+                default=str,
             )
+        )
 
     def install_npm_deps(self, job: WorkflowJob):
+        if PULUMI_STANDIN_PROGRAM:
+            self.use_standin_program()
         deploy_dir = DeploymentDir(
             user_id=job.project_id(), deploy_id=job.partition_key
         )
-        deploy_log = deploy_dir.log_path(
+        deploy_log = deploy_dir.get_log(
             AppBuilder.sanitize_stack_name(job.modified_app_id())
         )
-        deploy_log.parent.mkdir(parents=True, exist_ok=True)
-        with open(deploy_log, "a") as writer:
-            writer.write("Installing pulumi dependencies\n")
+        deploy_log.write("Installing pulumi dependencies\n")
+
+        start = time.perf_counter()
+        source = "npm"
+        if self.npm_cache is not None:
+            try:
+                hit = self.npm_cache.install(Path(self.output_dir), self.npm_install)
+                source = "cache hit" if hit else "cache miss"
+            except Exception:
+                log.warning(
+                    "Failed to install dependencies from cache, falling back to npm",
+                    exc_info=True,
+                )
+                self.npm_install(self.output_dir)
+        else:
+            self.npm_install(self.output_dir)
+        log.info(
+            "Installed pulumi dependencies for %s %s in %.2fs (%s)",
+            job.project_id(),
+            job.modified_app_id(),
+            time.perf_counter() - start,
+            source,
+        )
 
+    @staticmethod
+    def npm_install(prefix: Path):
         result: subprocess.CompletedProcess[bytes] = subprocess.run(
-            ["npm", "install", "--prefix", self.output_dir],
+            ["npm", "install", "--prefix", prefix],
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
         )
@@ -100,23 +212,13 @@ class AppBuilder:
 
     def select_stack(self, project_id: str, app_id: str) -> auto.Stack:
         log.info(f"Selecting stack for {project_id} {app_id}")
-        s3_opts = auto.LocalWorkspaceOptions(
-            project_settings=auto.ProjectSettings(
-                name=AppBuilder.sanitize_stack_name(f"{project_id}/{app_id}"),
-                runtime="nodejs",
-                backend=auto.ProjectBackend(f"s3://{self.state_bucket_name}"),
-            ),
-            env_vars={
-                "PULUMI_CONFIG_PASSPHRASE": "",
-                "PULUMI_CONFIG_PASSPHRASE_FILE": "",
-            },
-        )
+        opts = self.workspace_options(project_id, app_id)
         os.environ["PULUMI_DEBUG"] = "true"
         stack = auto.select_stack(
             stack_name=AppBuilder.sanitize_stack_name(app_id),
             project_name=project_id,
             work_dir=str(self.output_dir),
-            opts=s3_opts if self.state_bucket_name else None,
+            opts=opts,
         )
         log.info(f"Successfully selected stack for {project_id} {app_id}")
         return stack
@@ -1,16 +1,26 @@
 import asyncio
 import os
 import threading
+import time
+from collections import deque
 from contextlib import contextmanager
 from pathlib import Path
+from typing import Optional
 
 from watchdog.events import PatternMatchingEventHandler
 from watchdog.observers import Observer
 
+from src.project.storage.log_storage import LogIndex, LogStorage
 from src.util.logging import logger
 
 LOG_DIR = Path(os.getenv("DEPLOY_LOG_DIR", "deployments"))
 PRINT_LOGS = os.getenv("PRINT_LOGS", False)
+# Maximum time a written line stays buffered before it's appended to the log file
+FLUSH_INTERVAL = float(os.getenv("DEPLOY_LOG_FLUSH_INTERVAL", "0.05"))
+# Archived logs are evicted from LOG_DIR after this many hours, or oldest first once they
+# take up more than DEPLOY_LOG_MAX_BYTES.
+LOG_MAX_AGE_HOURS = float(os.getenv("DEPLOY_LOG_MAX_AGE_HOURS", str(24 * 7)))
+LOG_MAX_BYTES = int(os.getenv("DEPLOY_LOG_MAX_BYTES", str(1024 * 1024 * 1024)))
 
 
 class DeploymentDir:
@@ -20,6 +30,7 @@ class DeploymentDir:
 
     def __init__(self, user_id: str, deploy_id: str):
         self.user_id = user_id
+        self.deploy_id = deploy_id
         self.user_root = LOG_DIR / user_id
         self.deploy_root = self.user_root / deploy_id
 
@@ -36,11 +47,14 @@ class DeploymentDir:
         self.user_root.mkdir(parents=True, exist_ok=True)
 
         latest = self.user_root / "latest"
+        if latest.is_symlink() and latest.readlink() == Path(self.deploy_root.name):
+            return
 
         logger.info(
             "Linking %s -> %s (%s)", latest, self.deploy_root.name, latest.exists()
         )
-        if latest.exists():
+        # a link to an evicted deployment no longer exists, but still has to be removed
+        if latest.is_symlink() or latest.exists():
             latest.unlink()
         latest.symlink_to(self.deploy_root.name)
 
@@ -59,34 +73,74 @@ class DeployLog:
         self.deploy_handler = None
 
     @contextmanager
-    def on_output(self):
+    def on_output(self, end: bool = True):
         """on_output is a context manager that opens the log file for writing and returns a function
         that can be used in pulumi automation calls' on_output parameter to write to the log file.
-        On exit, it writes the END_MESSAGE to the log file to signal to any readers that the log file is complete.
+        On exit, it writes the END_MESSAGE to the log file to signal to any readers that the log file is complete,
+        unless end is False (ie, more output will follow).
+        Lines are pushed to readers in this process as they're written, and appended to the file in batches
+        at most FLUSH_INTERVAL seconds later (see LogChannel).
         """
         self.path.parent.mkdir(parents=True, exist_ok=True)
 
         self.dir.update_latest()
 
+        # readers wait for the file to exist, so create it before the first batch is written
+        self.path.touch()
+        channel = LogChannel.open(self.path)
+
         def on_output(s: str):
             if PRINT_LOGS:
                 print(s)
-            # Note: this is deliberately being opened and closed on each line
-            # because FSEvents on macOS doesn't detect just pure writes (fsync) to the file
-            # for some reason.
-            # https://github.com/gorakhargosh/watchdog/issues/126#issuecomment-39026219
-            with open(self.path, "a") as writer:
-                writer.write(s + "\n")
+            channel.write(s + "\n")
 
         try:
             yield on_output
         finally:
-            with open(self.path, "a") as writer:
-                writer.write(DeployLog.END_MESSAGE)
+            try:
+                if end:
+                    self.end()
+            finally:
+                channel.close()
+
+    def write(self, s: str):
+        """write appends s to the log outside of an on_output context."""
+        channel = LogChannel.get(self.path)
+        if channel is not None:
+            channel.write(s)
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as writer:
+            writer.write(s.encode())
+
+    def end(self):
+        self.write(DeployLog.END_MESSAGE)
 
-    def tail(self):
+    def is_complete(self) -> bool:
+        """is_complete returns whether the log file ends with the END_MESSAGE."""
+        end = DeployLog.END_MESSAGE.encode()
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(max(self.path.stat().st_size - len(end), 0))
+                return f.read() == end
+        except FileNotFoundError:
+            return False
+
+    def archive(self, storage: LogStorage):
+        """archive uploads the complete log and marks the local copy as evictable (see evict_logs)."""
+        storage.write_log(
+            self.dir.user_id, self.dir.deploy_id, self.stack_id, self.path
+        )
+        self.archived_marker().touch()
+
+    def archived_marker(self) -> Path:
+        return self.path.with_name(f"{self.path.name}.archived")
+
+    def tail(self, offset: int = 0):
+        """tail returns an async iterator over the log's lines, starting at the byte offset.
+        After each line, the handler's offset is the byte offset of the next line."""
         if self.deploy_handler is None:
-            self.deploy_handler = DeployLogHandler(self)
+            self.deploy_handler = DeployLogHandler(self, offset)
         return self.deploy_handler
 
     def close(self):
@@ -94,129 +148,530 @@ class DeployLog:
             self.deploy_handler.close()
 
 
-class DeployLogHandler(PatternMatchingEventHandler):
-    """DeployLogHandler is used for communication between the watchdog FileSystemEventHandler and the StreamingResponse
-    using a Queue to pass messages between the two.
+class LogChannel:
+    """LogChannel is the in-process broadcast for one log file while on_output is writing it. Every line is
+    pushed directly to the subscribed readers, so readers in the same process don't have to wait for the file
+    to be flushed and re-read. Lines are appended to the file in batches, at most FLUSH_INTERVAL seconds after
+    they're written, for durability and for readers in other processes (the API, for logs written by the
+    workflow pool's processes), which then wake once per batch rather than once per line.
+    Once the last writer closes the channel, it's removed and its subscribers go back to tailing the file.
     """
 
-    OBSERVER = Observer()
-
-    def __init__(self, log: DeployLog):
-        super().__init__(patterns=[str(log.path)])
-        self.interrupted = None
-        self.log = log
-        self.messages = asyncio.Queue()
-        self.complete = False
-        self.file = None
-        self.sent = 0
-        self.watch = None
-        # _lock makes sure that the fields used in on_modified are thread safe from access in __anext__
-        # ie, that the independent _read_lines calls don't stomp eachother
+    _channels: dict[Path, "LogChannel"] = {}
+    _channels_lock = threading.Lock()
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.writers = 0
+        self.pending: list[bytes] = []
+        self.subscribers: list[tuple[asyncio.AbstractEventLoop, "LogTailer"]] = []
+        self.closed = False
+        self._flush_timer: Optional[threading.Timer] = None
+        # _lock serializes writes (which may come from pulumi's output threads) with flushes and subscriptions
         self._lock = threading.RLock()
 
-    def close(self, interrupted=True):
+    @classmethod
+    def get(cls, path: Path) -> Optional["LogChannel"]:
+        with cls._channels_lock:
+            return cls._channels.get(Path(path))
+
+    @classmethod
+    def open(cls, path: Path) -> "LogChannel":
+        """open returns the channel for path, creating it if needed, and registers a writer.
+        Every open must be matched by a close."""
+        with cls._channels_lock:
+            channel = cls._channels.get(Path(path))
+            if channel is None:
+                channel = cls._channels[Path(path)] = LogChannel(Path(path))
+            channel.writers += 1
+        return channel
+
+    def write(self, s: str):
+        data = s.encode()
+        with self._lock:
+            if self.closed:
+                with open(self.path, "ab") as writer:
+                    writer.write(data)
+                return
+            self.pending.append(data)
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(FLUSH_INTERVAL, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+            self._publish(s, len(data))
+
+    def flush(self):
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self.pending:
+                return
+            data = b"".join(self.pending)
+            self.pending = []
+            # Note: this is deliberately being opened and closed for each batch
+            # because FSEvents on macOS doesn't detect just pure writes (fsync) to the file
+            # for some reason.
+            # https://github.com/gorakhargosh/watchdog/issues/126#issuecomment-39026219
+            with open(self.path, "ab") as writer:
+                writer.write(data)
+
+    def close(self):
+        """close flushes the pending lines and unregisters a writer. When it's the last one, the channel is
+        removed and its subscribers are detached so they go back to tailing the file."""
+        with LogChannel._channels_lock:
+            self.writers -= 1
+            last = self.writers == 0
+            if last and LogChannel._channels.get(self.path) is self:
+                del LogChannel._channels[self.path]
         with self._lock:
-            if self.watch is not None:
-                cleanup_watch(DeployLogHandler.OBSERVER, self.watch)
-                self.watch = None
-            if self.file is not None:
-                self.file.close()
-                self.file = None
-            self.interrupted = interrupted
-
-    def _read_lines(self):
-        """TODO change read lines to just read characters and worry about line breaks on the UI side. This will allow
-        Pulumi's '...' to be displayed as it is written to the log file, instead of only once it's finished so that the
-        user can see the progress of the deployment as it happens. This change will need to be coordinated all through the
-        message queue up to the frontend.
+            try:
+                self.flush()
+            finally:
+                if last:
+                    self.closed = True
+                    for loop, tailer in self.subscribers:
+                        try:
+                            loop.call_soon_threadsafe(tailer.detach)
+                        except RuntimeError:
+                            # the subscriber's event loop is closed
+                            pass
+                    self.subscribers = []
+
+    def subscribe(
+        self, loop: asyncio.AbstractEventLoop, tailer: "LogTailer"
+    ) -> Optional[int]:
+        """subscribe flushes the file and registers the tailer to receive every line written after that.
+        It returns the size of the file at that point, which the subscriber reads from the file itself,
+        or None if the channel is already closed (in which case the subscriber should tail the file).
         """
         with self._lock:
-            if self.complete:
-                return True
+            if self.closed:
+                return None
+            self.flush()
+            self.subscribers.append((loop, tailer))
+            return self.path.stat().st_size
 
-            opened_file = False
-            if self.file is None:
-                if not self.log.path.exists():
-                    return False
-                self.file = open(self.log.path, "r")
-                opened_file = True
-
-            for line in self.file.readlines():
-                if line == DeployLog.END_MESSAGE:
-                    self.complete = True
-                    self.close(interrupted=False)
-                    break
+    def unsubscribe(self, tailer: "LogTailer"):
+        with self._lock:
+            self.subscribers = [(l, t) for l, t in self.subscribers if t is not tailer]
 
-                self.messages.put_nowait(line)
+    def _publish(self, s: str, size: int):
+        for loop, tailer in list(self.subscribers):
+            try:
+                loop.call_soon_threadsafe(tailer.put_nowait, (s, size))
+            except RuntimeError:
+                # the subscriber's event loop is closed
+                self.unsubscribe(tailer)
 
-            if opened_file and not self.complete:
-                self.watch = DeployLogHandler.OBSERVER.schedule(
-                    self, str(self.log.path.parent), recursive=False
-                )
-                with DeployLogHandler.OBSERVER._lock:
-                    if not DeployLogHandler.OBSERVER.is_alive():
-                        DeployLogHandler.OBSERVER.start()
 
+class LogTailer(PatternMatchingEventHandler):
+    """LogTailer reads one log for every DeployLogHandler tailing it in this process. New lines, either from the
+    log's LogChannel or read from the file as watchdog reports it modified, are read once and fanned out to each
+    handler's queue. Tailers are reference counted by their handlers and stop when the last one is closed.
+    All reads and fan-out happen on the event loop the tailer was acquired on.
+    """
+
+    OBSERVER = Observer()
+    _tailers: dict[tuple[Path, asyncio.AbstractEventLoop], "LogTailer"] = {}
+
+    def __init__(self, path: Path, loop: asyncio.AbstractEventLoop):
+        super().__init__(patterns=[str(path)])
+        self.path = path
+        self.loop = loop
+        self.handlers: list["DeployLogHandler"] = []
+        # offset is the end of the last complete line read, ie where the next line to fan out starts
+        self.offset = 0
+        self.complete = False
+        self.started = False
+        self.file = None
+        self.watch = None
+        self.channel: Optional[LogChannel] = None
+
+    @classmethod
+    def acquire(cls, path: Path) -> "LogTailer":
+        loop = asyncio.get_running_loop()
+        key = (Path(path), loop)
+        tailer = cls._tailers.get(key)
+        if tailer is None:
+            tailer = cls._tailers[key] = LogTailer(Path(path), loop)
+        return tailer
+
+    def subscribe(self, handler: "DeployLogHandler") -> bool:
+        """subscribe starts fanning out lines to the handler, after it has caught up from the file.
+        It returns False if the log doesn't exist yet."""
+        if not self._start():
+            return False
+        self.handlers.append(handler)
+        handler.catch_up()
+        return True
+
+    def unsubscribe(self, handler: "DeployLogHandler"):
+        if handler in self.handlers:
+            self.handlers.remove(handler)
+        if not self.handlers:
+            self._stop()
+
+    def _start(self) -> bool:
+        if self.started:
             return True
+        if not self.path.exists():
+            return False
+        channel = LogChannel.get(self.path)
+        size = channel.subscribe(self.loop, self) if channel is not None else None
+        if size is not None:
+            # later lines are pushed through put_nowait
+            self.channel = channel
+            self.offset = size
+        else:
+            self._tail_file()
+        self.started = True
+        return True
+
+    def _tail_file(self):
+        """_tail_file reads the file from offset, and watches it for more lines unless the log is complete."""
+        self.file = open(self.path, "rb")
+        self.file.seek(self.offset)
+        self.read()
+        if not self.complete:
+            self.watch = LogTailer.OBSERVER.schedule(
+                self, str(self.path.parent), recursive=False
+            )
+            with LogTailer.OBSERVER._lock:
+                if not LogTailer.OBSERVER.is_alive():
+                    LogTailer.OBSERVER.start()
+
+    def detach(self):
+        """detach is called by the tailer's LogChannel when it closes, after every line it pushed. The rest of
+        the log, if any, is tailed from the file."""
+        if self.channel is None:
+            # already stopped
+            return
+        self.channel = None
+        if not self.complete:
+            self._tail_file()
+
+    def _stop(self):
+        if LogTailer._tailers.get((self.path, self.loop)) is self:
+            del LogTailer._tailers[(self.path, self.loop)]
+        if self.watch is not None:
+            cleanup_watch(LogTailer.OBSERVER, self.watch)
+            self.watch = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.channel is not None:
+            self.channel.unsubscribe(self)
+            self.channel = None
+
+    def flush(self):
+        """flush makes sure every line fanned out so far can be read from the file."""
+        if self.channel is not None:
+            self.channel.flush()
+
+    def read(self):
+        """read fans out the complete lines added to the file since the last read. Lines from a channel
+        don't need to be read."""
+        if self.file is None or self.complete:
+            return
+        for raw in self.file.readlines():
+            if not raw.endswith(b"\n"):
+                # the writer flushed part of a line, read it again once it's complete
+                self.file.seek(-len(raw), os.SEEK_CUR)
+                break
+            self.put_nowait((raw.decode(errors="replace"), len(raw)))
+            if self.complete:
+                break
+
+    def put_nowait(self, item: tuple[str, int]):
+        """put_nowait fans out a line and its size in bytes. It's named to receive lines from a LogChannel
+        like a subscriber's queue would."""
+        line, size = item
+        if line == DeployLog.END_MESSAGE:
+            self.complete = True
+            for handler in list(self.handlers):
+                handler.wake()
+            return
+        start = self.offset
+        self.offset += size
+        for handler in list(self.handlers):
+            handler.receive(start, line, size)
 
     def on_modified(self, event):
-        self._read_lines()
+        # watchdog calls this from the observer's thread
+        try:
+            self.loop.call_soon_threadsafe(self.read)
+        except RuntimeError:
+            logger.debug("Event loop for %s is closed", self.path)
+
+
+class DeployLogHandler:
+    """DeployLogHandler is one reader's async iterator over a log, fed by the log's shared LogTailer.
+    offset is the byte offset in the log file of the next line to return, which readers can use to resume from.
+
+    Each handler's queue is bounded. A handler that falls behind (its queue is full) stops receiving lines from
+    the tailer, and once it drains its queue it catches up from the file before rejoining, so a slow reader
+    never holds up the tailer or the other readers.
+    """
+
+    QUEUE_SIZE = int(os.getenv("DEPLOY_LOG_QUEUE_SIZE", "1000"))
+
+    def __init__(self, log: DeployLog, offset: int = 0):
+        self.interrupted = None
+        self.log = log
+        self.messages = asyncio.Queue(maxsize=DeployLogHandler.QUEUE_SIZE)
+        self.complete = False
+        self.sent = 0
+        self.tailer: Optional[LogTailer] = None
+        self.offset = offset
+        # the offset of the last line returned
+        self.line_offset = offset
+        # the offset of the next line to enqueue, ahead of offset by what's in the queue
+        self.next_offset = offset
+        # lagging is set when lines were missed and must be caught up from the file
+        self.lagging = False
+
+    def close(self, interrupted=True):
+        if self.tailer is not None:
+            self.tailer.unsubscribe(self)
+            self.tailer = None
+        self.interrupted = interrupted
+
+    def receive(self, start: int, line: str, size: int):
+        if self.lagging or start < self.next_offset:
+            return
+        if start > self.next_offset:
+            self.lagging = True
+            self.wake()
+            return
+        try:
+            self.messages.put_nowait((line, size))
+            self.next_offset += size
+        except asyncio.QueueFull:
+            self.lagging = True
+
+    def wake(self):
+        """wake puts an empty message so a reader waiting on the queue re-checks the tailer's state."""
+        try:
+            self.messages.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    def catch_up(self):
+        """catch_up enqueues the lines the tailer has already fanned out, from the file, for as long as the
+        queue has room. An offset past the end of the log continues from the end."""
+        tailer = self.tailer
+        if self.next_offset > tailer.offset:
+            self.offset = self.next_offset = tailer.offset
+        if self.next_offset < tailer.offset:
+            tailer.flush()
+            with open(self.log.path, "rb") as f:
+                f.seek(self.next_offset)
+                while self.next_offset < tailer.offset and not self.messages.full():
+                    raw = f.readline()
+                    if not raw.endswith(b"\n"):
+                        break
+                    self.messages.put_nowait((raw.decode(errors="replace"), len(raw)))
+                    self.next_offset += len(raw)
+        self.lagging = self.next_offset < tailer.offset
 
     def __aiter__(self):
         return self
 
-    async def __anext__(self):
+    async def _subscribe(self) -> bool:
         # Poll for file creation
         for _ in range(60 * 2):  # wait up to 2 minutes
             if self.interrupted:
-                raise StopAsyncIteration
-            if self._read_lines():
-                break
+                return False
+            self.tailer = LogTailer.acquire(self.log.path)
+            if self.tailer.subscribe(self):
+                return True
+            self.tailer.unsubscribe(self)
+            self.tailer = None
             await asyncio.sleep(1)
-        else:
-            logger.warning("Log file %s was never created", self.log.path)
-            raise StopAsyncIteration
+        logger.warning("Log file %s was never created", self.log.path)
+        return False
+
+    def next_nowait(self) -> Optional[str]:
+        """next_nowait returns the next line if one is ready, without waiting."""
+        while True:
+            if self.messages.empty() and self.lagging:
+                self.catch_up()
+            try:
+                message = self.messages.get_nowait()
+            except asyncio.QueueEmpty:
+                return None
+            if message is not None:
+                return self._take(message)
+
+    def _take(self, message: tuple[str, int]) -> str:
+        line, size = message
+        self.sent += 1
+        self.line_offset = self.offset
+        self.offset += size
+        return line
 
-        if self.interrupted:
-            raise StopAsyncIteration
+    async def __anext__(self):
+        if self.tailer is None and not self.complete:
+            if not await self._subscribe():
+                raise StopAsyncIteration
 
-        if self.complete and self.messages.empty():
-            logger.debug(
-                "Log %s complete (%d messages), stopping", self.log.path, self.sent
-            )
-            raise StopAsyncIteration
+        timeouts = 0
+        while timeouts < 10:
+            if self.interrupted or self.complete:
+                raise StopAsyncIteration
 
-        for _ in range(10):
-            try:
-                line = await asyncio.wait_for(
-                    self.messages.get(),
-                    timeout=60,
-                )
-                if self.interrupted:
-                    raise StopAsyncIteration
-                self.sent += 1
+            line = self.next_nowait()
+            if line is not None:
                 return line
+
+            if self.tailer.complete and self.next_offset >= self.tailer.offset:
+                logger.debug(
+                    "Log %s complete (%d messages), stopping",
+                    self.log.path,
+                    self.sent,
+                )
+                self.complete = True
+                self.close(interrupted=False)
+                raise StopAsyncIteration
+
+            try:
+                message = await asyncio.wait_for(self.messages.get(), timeout=60)
             except TimeoutError:
+                timeouts += 1
                 # manually check to see if the file has been updated
-                self._read_lines()
-                if not self.messages.empty():
-                    logger.debug("Found update from poll, continuing")
-                    continue
-
-                if self.complete and self.messages.empty():
-                    logger.debug(
-                        "Log %s complete (%d messages), stopping",
-                        self.log.path,
-                        self.sent,
-                    )
-                    raise StopAsyncIteration
+                self.tailer.read()
+                continue
+            if message is None or self.interrupted:
+                continue
+            return self._take(message)
+
+        logger.warning("No messages in log %s for 10 minutes, stopping", self.log.path)
+        self.close(interrupted=True)
+        raise TimeoutError()
+
+    async def batches(self, window: float, max_bytes: int):
+        """batches yields the log's lines in lists, coalescing the lines that arrive within window seconds
+        of the first one, up to max_bytes. After each batch, offset is the byte offset of the next line.
+        """
+        full = False
+        async for line in self:
+            # not the size of line.encode(), which differs from the bytes read for invalid UTF-8
+            start = self.line_offset
+            if not full:
+                await asyncio.sleep(window)
+            batch = [line]
+            while self.offset - start < max_bytes:
+                line = self.next_nowait()
+                if line is None:
+                    break
+                batch.append(line)
+            # when the batch was cut short, more lines are ready so the next batch doesn't wait
+            full = self.offset - start >= max_bytes
+            yield batch
 
-        else:
-            logger.warning(
-                "No messages in log %s for 10 minutes, stopping", self.log.path
-            )
-            self.close(interrupted=True)
-            raise TimeoutError()
+
+class ArchivedLogReader:
+    """ArchivedLogReader reads a completed log from its archive, as an async iterator over its lines like
+    DeployLogHandler. Only the archive's chunks from the one containing offset are read.
+    """
+
+    def __init__(
+        self, storage: LogStorage, log: DeployLog, index: LogIndex, offset: int = 0
+    ):
+        self.storage = storage
+        self.log = log
+        self.index = index
+        self.offset = min(offset, index.size)
+        self._chunk = index.chunk_for(self.offset)
+        self._lines: deque[tuple[int, bytes]] = deque()
+
+    def close(self):
+        self._lines.clear()
+        self._chunk = len(self.index.chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def _read_chunk(self) -> bool:
+        if self._chunk >= len(self.index.chunks):
+            return False
+        chunk = self.index.chunks[self._chunk]
+        self._chunk += 1
+        data = await asyncio.to_thread(
+            self.storage.read_chunk,
+            self.log.dir.user_id,
+            self.log.dir.deploy_id,
+            self.log.stack_id,
+            chunk,
+        )
+        start = chunk.offset
+        for raw in data.splitlines(keepends=True):
+            # lines starting before the offset were already read
+            if start >= self.offset:
+                self._lines.append((start, raw))
+            start += len(raw)
+        return True
+
+    async def __anext__(self):
+        while not self._lines:
+            if not await self._read_chunk():
+                raise StopAsyncIteration
+        start, raw = self._lines.popleft()
+        line = raw.decode(errors="replace")
+        if line == DeployLog.END_MESSAGE:
+            self.close()
+            raise StopAsyncIteration
+        self.offset = start + len(raw)
+        return line
+
+    async def batches(self, window: float, max_bytes: int):
+        """batches yields the log's lines in lists of up to max_bytes. All the lines are already
+        available, so there's no need to wait for window."""
+        batch = []
+        start = self.offset
+        async for line in self:
+            batch.append(line)
+            if self.offset - start >= max_bytes or not self._lines:
+                yield batch
+                batch = []
+                start = self.offset
+        if batch:
+            yield batch
+
+
+def evict_logs():
+    """evict_logs deletes archived logs from LOG_DIR that are older than LOG_MAX_AGE_HOURS, then the
+    oldest ones until the rest take up at most LOG_MAX_BYTES. Logs that haven't been archived are kept.
+    """
+    logs = []
+    for marker in LOG_DIR.glob("*/*/*.log.archived"):
+        path = marker.with_name(marker.name.removesuffix(".archived"))
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            marker.unlink(missing_ok=True)
+            continue
+        logs.append((stat.st_mtime, stat.st_size, path, marker))
+
+    logs.sort()
+    total = sum(size for _, size, _, _ in logs)
+    cutoff = time.time() - LOG_MAX_AGE_HOURS * 60 * 60
+    evicted = 0
+    for mtime, size, path, marker in logs:
+        if mtime >= cutoff and total <= LOG_MAX_BYTES:
+            break
+        path.unlink(missing_ok=True)
+        marker.unlink(missing_ok=True)
+        total -= size
+        evicted += 1
+        try:
+            path.parent.rmdir()
+        except OSError:
+            # the deployment has other logs
+            pass
+    if evicted:
+        logger.info("Evicted %d archived logs from %s", evicted, LOG_DIR)
 
 
 def cleanup_watch(observer, watch):
@@ -1,30 +1,111 @@
-from typing import Tuple
+import os
+import time
+from contextlib import contextmanager
+from enum import Enum
+from typing import Optional, Tuple
 
 from pulumi import automation as auto
 
 from src.deployer.models.workflow_job import WorkflowJobStatus
 from src.deployer.pulumi.deploy_logs import DeploymentDir
+from src.deployer.pulumi.progress import ProgressTracker
 from src.util.logging import logger
 
 
+class DeployStrategy(Enum):
+    # a single `up`, without a separate refresh or preview pass
+    FAST = "fast"
+    # refresh, preview then up, refreshing again if the update fails
+    SAFE = "safe"
+    # preview only, against the stack's last recorded state. Nothing is changed, so
+    # there's no refresh either (it would write a new checkpoint)
+    PREVIEW_ONLY = "preview-only"
+
+
+DEFAULT_DEPLOY_STRATEGY = DeployStrategy(os.getenv("DEPLOY_STRATEGY", "safe"))
+# Pulumi's resource operation parallelism, unset uses pulumi's default
+DEFAULT_PULUMI_PARALLEL = (
+    int(os.environ["PULUMI_PARALLEL"]) if os.getenv("PULUMI_PARALLEL") else None
+)
+
+
 class AppDeployer:
-    def __init__(self, stack: auto.Stack, deploy_dir: DeploymentDir):
+    def __init__(
+        self,
+        stack: auto.Stack,
+        deploy_dir: DeploymentDir,
+        parallel: Optional[int] = DEFAULT_PULUMI_PARALLEL,
+        progress: Optional[ProgressTracker] = None,
+    ):
         self.stack = stack
+        self.parallel = parallel
+        self.progress = progress
         self.deploy_dir = deploy_dir
         self.deploy_log = deploy_dir.get_log(stack.name)
         self.deploy_dir.update_latest()
+        # seconds spent in each pulumi operation of the last deploy, eg {"up": 12.3}
+        self.phase_timings: dict[str, float] = {}
 
-    def deploy(self) -> Tuple[WorkflowJobStatus, str]:
-        with self.deploy_log.on_output() as on_output:
-            try:
-                logger.info(f"refreshing and previewing stack {self.stack.name}")
-                self.stack.refresh(on_output=on_output, color="always")
-                preview_result = self.stack.preview(on_output=on_output, color="always")
-            except Exception as e:
-                logger.error(f"Failed to preview stack", exc_info=True)
-                return WorkflowJobStatus.FAILED, str(e)
+    @contextmanager
+    def timed(self, phase: str):
+        if self.progress:
+            self.progress.start(phase)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = round(time.perf_counter() - start, 3)
+            self.phase_timings[phase] = self.phase_timings.get(phase, 0) + elapsed
+            logger.info(f"{phase} of stack {self.stack.name} took {elapsed:.2f}s")
+
+    @contextmanager
+    def tracked(self):
+        """tracked marks the progress done when the job's pulumi operations are over."""
+        try:
+            yield
+        finally:
+            if self.progress:
+                self.progress.finish()
+
+    def opts(self, **kwargs) -> dict:
+        """opts returns the options shared by every pulumi operation, plus kwargs."""
+        if self.parallel:
+            kwargs["parallel"] = self.parallel
+        if self.progress:
+            kwargs["on_event"] = self.progress.on_event
+        return {"color": "always", **kwargs}
+
+    def deploy(
+        self,
+        strategy: DeployStrategy = DeployStrategy.SAFE,
+        targets: Optional[list[str]] = None,
+    ) -> Tuple[WorkflowJobStatus, str]:
+        """deploy updates the stack. If targets (URNs) are given, only those resources and
+        their dependents are refreshed and updated."""
+        self.phase_timings = {}
+        refresh_opts, update_opts = self.opts(), self.opts()
+        if targets:
+            refresh_opts = self.opts(target=targets)
+            update_opts = self.opts(target=targets, target_dependents=True)
+            logger.info(f"Targeting {len(targets)} resources in {self.stack.name}")
+        with self.deploy_log.on_output() as on_output, self.tracked():
+            if strategy != DeployStrategy.FAST:
+                try:
+                    if strategy != DeployStrategy.PREVIEW_ONLY:
+                        logger.info(f"refreshing stack {self.stack.name}")
+                        with self.timed("refresh"):
+                            self.stack.refresh(on_output=on_output, **refresh_opts)
+                    logger.info(f"previewing stack {self.stack.name}")
+                    with self.timed("preview"):
+                        self.stack.preview(on_output=on_output, **update_opts)
+                except Exception as e:
+                    logger.error(f"Failed to preview stack", exc_info=True)
+                    return WorkflowJobStatus.FAILED, str(e)
+                if strategy == DeployStrategy.PREVIEW_ONLY:
+                    return WorkflowJobStatus.SKIPPED, "Preview succeeded."
             try:
-                self.stack.up(on_output=on_output, color="always")
+                with self.timed("up"):
+                    self.stack.up(on_output=on_output, **update_opts)
                 logger.info(f"Deployed stack, {self.stack.name}, successfully.")
                 return WorkflowJobStatus.SUCCEEDED, "Deployment succeeded."
             except Exception as e:
@@ -32,14 +113,40 @@ class AppDeployer:
                     f"Deployment of stack, {self.stack.name}, failed.", exc_info=True
                 )
                 logger.info(f"Refreshing stack {self.stack.name}")
-                self.stack.refresh(on_output=on_output, color="always")
+                with self.timed("failure_refresh"):
+                    self.stack.refresh(on_output=on_output, **self.opts())
                 return WorkflowJobStatus.FAILED, str(e)
 
+    def refresh_unchanged(self) -> bool:
+        """refresh_unchanged checks an already deployed stack for drift without running the
+        program. It returns True if the stack has resources and none of them changed. On
+        False the log is left open so a full deploy can follow."""
+        self.phase_timings = {}
+        with self.deploy_log.on_output(end=False) as on_output:
+            try:
+                with self.timed("refresh"):
+                    result = self.stack.refresh(
+                        on_output=on_output, **self.opts(expect_no_changes=True)
+                    )
+            except Exception:
+                logger.info(f"Stack {self.stack.name} drifted", exc_info=True)
+                return False
+        # an empty stack (eg, removed outside of a destroy) has nothing to refresh
+        if not (result.summary.resource_changes or {}).get("same"):
+            logger.info(f"Stack {self.stack.name} has no resources")
+            return False
+        self.deploy_log.end()
+        if self.progress:
+            self.progress.finish()
+        return True
+
     def destroy_and_remove_stack(self) -> Tuple[WorkflowJobStatus, str]:
-        with self.deploy_log.on_output() as on_output:
+        with self.deploy_log.on_output() as on_output, self.tracked():
             try:
-                self.stack.refresh(on_output=on_output, color="always")
-                self.stack.destroy(on_output=on_output, color="always")
+                with self.timed("refresh"):
+                    self.stack.refresh(on_output=on_output, **self.opts())
+                with self.timed("destroy"):
+                    self.stack.destroy(on_output=on_output, **self.opts())
                 logger.info(f"Removing stack {self.stack.name}")
                 self.stack.workspace.remove_stack(self.stack.name)
                 return WorkflowJobStatus.SUCCEEDED, "Stack removed successfully."
@@ -48,5 +155,6 @@ class AppDeployer:
                     f"Destroy of stack, {self.stack.name}, failed.", exc_info=True
                 )
                 logger.info(f"Refreshing stack {self.stack.name}")
-                self.stack.refresh(on_output=on_output, color="always")
+                with self.timed("failure_refresh"):
+                    self.stack.refresh(on_output=on_output, **self.opts())
                 return WorkflowJobStatus.FAILED, str(e)
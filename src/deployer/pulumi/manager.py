@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 
 from pulumi import automation as auto
 from pydantic_yaml import parse_yaml_raw_as
@@ -23,6 +24,12 @@ class AppManager:
         live_state = parse_yaml_raw_as(LiveState, resources_yaml)
         return live_state
 
+    def checkpoint_version(self) -> Optional[int]:
+        """checkpoint_version returns the number of the stack's latest update, which
+        changes whenever its state does."""
+        info = self.stack.info()
+        return info.version if info else None
+
     def get_outputs(self, outputs: dict[str, str]) -> dict[str, str]:
         result: dict[str, str] = {}
         stack_outputs = self.stack.outputs()
@@ -0,0 +1,162 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+from enum import Enum
+from pathlib import Path
+from typing import Callable, Optional
+
+from src.util.logging import logger
+
+NPM_CACHE_DIR = Path(
+    os.getenv(
+        "PULUMI_NPM_CACHE_DIR", Path(tempfile.gettempdir()) / "stacksnap-npm-cache"
+    )
+)
+NPM_CACHE_MODE = os.getenv("PULUMI_NPM_CACHE_MODE", "hardlink")
+NPM_CACHE_MAX_BYTES = int(
+    os.getenv("PULUMI_NPM_CACHE_MAX_BYTES", str(4 * 1024 * 1024 * 1024))
+)
+
+
+class MaterializeMode(Enum):
+    """How a cached node_modules is placed into a Pulumi work dir."""
+
+    # node_modules is a symlink to the cache entry, effectively free. Every job shares
+    # the one mutable directory, and evicting the entry breaks jobs still using it.
+    SYMLINK = "symlink"
+    # files are hardlinked, falls back to copies across filesystems. Each job gets its
+    # own directory tree, so adding, removing or replacing files (as npm does) doesn't
+    # touch the cache, and evicting an entry leaves the linked files in place. Only
+    # writing into an existing file would, and deploys don't write to node_modules.
+    HARDLINK = "hardlink"
+    # copy-on-write clone via `cp --reflink=auto`, a plain copy if unsupported
+    REFLINK = "reflink"
+    COPY = "copy"
+    # the cache is disabled
+    OFF = "off"
+
+
+class NodeModulesCache:
+    """NodeModulesCache stores one installed node_modules per unique dependency set.
+
+    Entries are keyed by a hash of package.json and package-lock.json (if present). A
+    miss runs the install once in a staging directory which is renamed into place, so
+    concurrent jobs installing the same dependencies never see a partial entry. Entries
+    are evicted least-recently-used first once the cache exceeds max_bytes.
+    """
+
+    LOCKFILE = "package-lock.json"
+    SIZE_FILE = ".size"
+
+    def __init__(
+        self,
+        root: Path = NPM_CACHE_DIR,
+        mode: MaterializeMode | str | None = None,
+        max_bytes: int = NPM_CACHE_MAX_BYTES,
+    ):
+        self.root = Path(root)
+        self.mode = MaterializeMode(mode or NPM_CACHE_MODE)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def cache_key(work_dir: Path) -> str:
+        digest = hashlib.sha256()
+        for name in ["package.json", NodeModulesCache.LOCKFILE]:
+            path = Path(work_dir) / name
+            digest.update(name.encode())
+            if path.exists():
+                digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+    def install(self, work_dir: Path, npm_install: Callable[[Path], None]) -> bool:
+        """install makes node_modules available in work_dir, running npm_install(prefix) in
+        a staging directory on a miss. Returns whether the cache was hit."""
+        work_dir = Path(work_dir)
+        entry = self.root / NodeModulesCache.cache_key(work_dir)
+        hit = (entry / "node_modules").exists()
+        if not hit:
+            self._populate(work_dir, entry, npm_install)
+        self._materialize(entry / "node_modules", work_dir / "node_modules")
+        # the size file's mtime doubles as the entry's last access time for eviction
+        (entry / NodeModulesCache.SIZE_FILE).touch(exist_ok=True)
+        self.evict(keep=entry)
+        return hit
+
+    def _populate(self, work_dir: Path, entry: Path, npm_install):
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=self.root, prefix=".staging-"))
+        try:
+            for name in ["package.json", NodeModulesCache.LOCKFILE]:
+                if (work_dir / name).exists():
+                    shutil.copy2(work_dir / name, staging / name)
+            npm_install(staging)
+            size = sum(
+                f.stat().st_size
+                for f in (staging / "node_modules").rglob("*")
+                if f.is_file() and not f.is_symlink()
+            )
+            (staging / NodeModulesCache.SIZE_FILE).write_text(str(size))
+            try:
+                staging.rename(entry)
+            except OSError:
+                # another job populated the same dependency set first
+                logger.debug(f"node_modules cache entry {entry} already populated")
+        finally:
+            if staging.exists():
+                shutil.rmtree(staging, ignore_errors=True)
+
+    def evict(self, keep: Optional[Path] = None):
+        """evict removes least recently used entries until the cache fits in max_bytes,
+        never removing keep (the entry just materialized)."""
+        entries = []
+        total = 0
+        for size_file in self.root.glob(f"*/{NodeModulesCache.SIZE_FILE}"):
+            entry = size_file.parent
+            if entry.name.startswith("."):
+                # a staging directory that is still being installed
+                continue
+            try:
+                size = int(size_file.read_text() or 0)
+                entries.append((size_file.stat().st_mtime, size, entry))
+            except (FileNotFoundError, ValueError):
+                continue
+            total += size
+
+        entries.sort()
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            logger.info(f"Evicting {entry} from node_modules cache ({size} bytes)")
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def _materialize(self, src: Path, dst: Path):
+        if dst.exists() or dst.is_symlink():
+            if dst.is_symlink() or dst.is_file():
+                dst.unlink()
+            else:
+                shutil.rmtree(dst)
+
+        match self.mode:
+            case MaterializeMode.SYMLINK:
+                dst.symlink_to(src, target_is_directory=True)
+            case MaterializeMode.HARDLINK:
+
+                def link(s, d):
+                    try:
+                        os.link(s, d)
+                    except OSError:
+                        shutil.copy2(s, d)
+
+                shutil.copytree(src, dst, symlinks=True, copy_function=link)
+            case MaterializeMode.REFLINK:
+                subprocess.run(
+                    ["cp", "-R", "--reflink=auto", str(src), str(dst)],
+                    check=True,
+                )
+            case _:
+                shutil.copytree(src, dst, symlinks=True)
@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from pulumi.automation import EngineEvent, OpType
+from pydantic import BaseModel
+
+from src.util.logging import logger
+
+# Minimum seconds between progress writes while a job is running
+PROGRESS_UPDATE_INTERVAL = float(os.getenv("DEPLOY_PROGRESS_UPDATE_INTERVAL", "2"))
+
+# ops that don't change the resource, or that are only one half of a replacement
+UNCHANGED_OPS = {OpType.SAME, OpType.READ, OpType.REFRESH, OpType.DISCARD}
+REPLACEMENT_STEPS = {
+    OpType.CREATE_REPLACEMENT,
+    OpType.DELETE_REPLACED,
+    OpType.DISCARD_REPLACED,
+    OpType.READ_REPLACEMENT,
+    OpType.IMPORT_REPLACEMENT,
+    OpType.REMOVE_PENDING_REPLACE,
+}
+
+
+class DeployProgress(BaseModel):
+    # the pulumi operation in progress (or last run), eg refresh, preview, up or destroy
+    operation: Optional[str] = None
+    # resources the preview (or the update so far) plans to change
+    planned: int = 0
+    created: int = 0
+    updated: int = 0
+    replaced: int = 0
+    deleted: int = 0
+    failed: int = 0
+    # the most recently started resource step, eg "create aws:s3/bucket:Bucket my-bucket"
+    current: Optional[str] = None
+    done: bool = False
+    updated_at: Optional[datetime] = None
+
+
+class ProgressTracker:
+    """ProgressTracker builds a DeployProgress from pulumi's engine events. on_event is called
+    from pulumi's event thread, and on_change (eg, to store the progress) is called with a
+    copy of the progress at most every interval seconds, and again when the job finishes.
+    """
+
+    def __init__(
+        self,
+        on_change: Optional[Callable[[DeployProgress], None]] = None,
+        interval: float = PROGRESS_UPDATE_INTERVAL,
+    ):
+        self.progress = DeployProgress()
+        self.on_change = on_change
+        self.interval = interval
+        self._planned: set[str] = set()
+        self._lock = threading.Lock()
+        self._last_change = 0.0
+
+    def start(self, operation: str):
+        with self._lock:
+            self.progress.operation = operation
+            self.progress.current = None
+        self.changed(force=True)
+
+    def finish(self):
+        with self._lock:
+            self.progress.current = None
+            self.progress.done = True
+        self.changed(force=True)
+
+    def on_event(self, event: EngineEvent):
+        with self._lock:
+            if event.resource_pre_event is not None:
+                meta = event.resource_pre_event.metadata
+                if meta.op not in UNCHANGED_OPS:
+                    self._planned.add(meta.urn)
+                    self.progress.planned = len(self._planned)
+                    self.progress.current = (
+                        f"{meta.op.value} {meta.type} {meta.urn.rsplit('::', 1)[-1]}"
+                    )
+            elif event.res_outputs_event is not None:
+                if self.progress.operation in ("up", "destroy"):
+                    self.count(event.res_outputs_event.metadata.op)
+            elif event.res_op_failed_event is not None:
+                self.progress.failed += 1
+            elif (
+                event.summary_event is not None and self.progress.operation == "preview"
+            ):
+                # OpType is a str enum, so the summary's string keys match it directly
+                changes = event.summary_event.resource_changes or {}
+                planned = sum(
+                    n
+                    for op, n in changes.items()
+                    if op not in UNCHANGED_OPS and op not in REPLACEMENT_STEPS
+                )
+                self.progress.planned = max(self.progress.planned, planned)
+            else:
+                return
+        self.changed()
+
+    def count(self, op: OpType):
+        if op == OpType.CREATE or op == OpType.IMPORT:
+            self.progress.created += 1
+        elif op == OpType.UPDATE:
+            self.progress.updated += 1
+        elif op == OpType.REPLACE:
+            self.progress.replaced += 1
+        elif op == OpType.DELETE:
+            self.progress.deleted += 1
+
+    def changed(self, force: bool = False):
+        if self.on_change is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_change < self.interval:
+                return
+            self._last_change = now
+            self.progress.updated_at = datetime.now(timezone.utc)
+            progress = self.progress.model_copy()
+        try:
+            self.on_change(progress)
+        except Exception:
+            logger.warning("Failed to update deploy progress", exc_info=True)
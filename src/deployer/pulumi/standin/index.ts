@@ -0,0 +1,82 @@
+// Stand-in for a generated program, used when PULUMI_STANDIN_PROGRAM is set. Every
+// engine resource in standin.json becomes a dynamic resource that only exists in the
+// stack's state, and every edge becomes a dependency, so the pipeline can be run and
+// timed without a cloud account.
+import * as pulumi from "@pulumi/pulumi";
+import * as fs from "fs";
+
+interface StandinGraph {
+  resources: { [id: string]: any };
+  edges: [string, string][];
+}
+
+const graph: StandinGraph = JSON.parse(fs.readFileSync("standin.json", "utf-8"));
+
+// simulated latency of each provider call, in milliseconds
+const latencyMs = Number(process.env.STANDIN_LATENCY_MS || "0");
+
+const provider: pulumi.dynamic.ResourceProvider = {
+  async check(olds: any, news: any) {
+    return { inputs: news };
+  },
+  async diff(id: string, olds: any, news: any) {
+    return {
+      changes: JSON.stringify(olds.properties) !== JSON.stringify(news.properties),
+    };
+  },
+  async create(inputs: any) {
+    await new Promise((resolve) => setTimeout(resolve, latencyMs));
+    return { id: inputs.resourceId, outs: inputs };
+  },
+  async read(id: string, props: any) {
+    await new Promise((resolve) => setTimeout(resolve, latencyMs));
+    return { id, props };
+  },
+  async update(id: string, olds: any, news: any) {
+    await new Promise((resolve) => setTimeout(resolve, latencyMs));
+    return { outs: news };
+  },
+  async delete(id: string, props: any) {
+    await new Promise((resolve) => setTimeout(resolve, latencyMs));
+  },
+};
+
+const dependencies: { [id: string]: string[] } = {};
+for (const [source, target] of graph.edges) {
+  (dependencies[source] = dependencies[source] || []).push(target);
+}
+
+// resources are named like the generated program names them, unless that's ambiguous
+const nameCounts: { [name: string]: number } = {};
+for (const id of Object.keys(graph.resources)) {
+  const name = id.split(":").pop()!;
+  nameCounts[name] = (nameCounts[name] || 0) + 1;
+}
+const resourceName = (id: string) => {
+  const name = id.split(":").pop()!;
+  return nameCounts[name] > 1 ? id.replace(/:/g, "-") : name;
+};
+
+const created: { [id: string]: pulumi.dynamic.Resource } = {};
+const visiting = new Set<string>();
+
+function create(id: string): pulumi.dynamic.Resource | undefined {
+  if (created[id] || visiting.has(id) || !(id in graph.resources)) {
+    // cycles are broken by dropping the edge that closes them
+    return created[id];
+  }
+  visiting.add(id);
+  const dependsOn = (dependencies[id] || [])
+    .map(create)
+    .filter((r): r is pulumi.dynamic.Resource => r !== undefined);
+  visiting.delete(id);
+  created[id] = new pulumi.dynamic.Resource(
+    provider,
+    resourceName(id),
+    { resourceId: id, properties: graph.resources[id] || {} },
+    { dependsOn },
+  );
+  return created[id];
+}
+
+Object.keys(graph.resources).forEach(create);
@@ -0,0 +1,71 @@
+import re
+from typing import Optional
+
+from pydantic_yaml import parse_yaml_raw_as
+
+from src.project.live_state import LiveState
+from src.util.logging import logger
+
+# Files in the IaC bundle that are regenerated from resources.yaml. A change to any
+# other file can't be attributed to specific resources.
+GENERATED_FILES = {"resources.yaml", "index.ts"}
+
+
+def changed_resources(old_yaml: str, new_yaml: str) -> Optional[list[str]]:
+    """changed_resources returns the ids of the resources whose properties differ between
+    two engine resources.yaml files. It returns None when the change isn't limited to
+    properties of existing resources (resources or edges added or removed), or when
+    nothing changed at all."""
+    old = parse_yaml_raw_as(LiveState, old_yaml)
+    new = parse_yaml_raw_as(LiveState, new_yaml)
+    if set(old.resources.keys()) != set(new.resources.keys()):
+        logger.info("Resources were added or removed")
+        return None
+    if set((old.edges or {}).keys()) != set((new.edges or {}).keys()):
+        logger.info("Edges were added or removed")
+        return None
+    changed = [r for r, props in new.resources.items() if old.resources[r] != props]
+    return changed or None
+
+
+def resource_urns(
+    stack_resources: list[dict], resource_ids: list[str]
+) -> Optional[list[str]]:
+    """resource_urns maps engine resource ids (eg, aws:ecs_service:my-service) to the URNs of
+    the Pulumi resources generated for them, matching on the resource name and type (eg,
+    aws:ecs/service:Service). It returns None if any id doesn't match exactly one URN.
+    """
+    urns = []
+    for resource_id in resource_ids:
+        provider, resource_type = resource_id.split(":")[:2]
+        name = resource_id.split(":")[-1]
+        matches = [
+            urn
+            for urn in (resource.get("urn", "") for resource in stack_resources)
+            if urn_matches(urn, provider, resource_type, name)
+        ]
+        if len(matches) != 1:
+            logger.info(f"{resource_id} matches {len(matches)} URNs: {matches}")
+            return None
+        urns.extend(matches)
+    return urns
+
+
+def urn_matches(urn: str, provider: str, resource_type: str, name: str) -> bool:
+    """urn_matches returns whether the URN is of a resource named name whose Pulumi type
+    corresponds to the engine's provider and resource type. The engine's type is a suffix
+    of the Pulumi type's module and class, ignoring case and separators (ecs_service for
+    aws:ecs/service:Service, load_balancer for aws:lb/loadBalancer:LoadBalancer)."""
+    parts = urn.split("::")
+    if len(parts) != 4 or parts[3] != name:
+        return False
+    # child resources are qualified by their parents' types, eg parent$aws:s3/bucket:Bucket
+    pulumi_type = parts[2].split("$")[-1].split(":")
+    if len(pulumi_type) != 3 or pulumi_type[0] != provider:
+        return False
+    module, cls = pulumi_type[1].split("/")[0], pulumi_type[2]
+    return type_key(module + cls).endswith(type_key(resource_type))
+
+
+def type_key(resource_type: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", resource_type.lower())
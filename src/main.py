@@ -9,9 +9,11 @@ from src.api.project_router import router as projects_router
 from src.api.stackpacks_router import router as stackpacks_router
 from src.api.workflow_router import router as workflow_router
 from src.auth.token import AuthError
+from src.deployer.models.counter import Counter
 from src.deployer.models.workflow_job import WorkflowJob
 from src.deployer.models.workflow_run import WorkflowRun
 from src.project.models.app_deployment import AppDeployment
+from src.project.models.app_status import AppStatus
 from src.project.models.project import Project
 from src.util.logging import logger
 
@@ -23,6 +25,8 @@ async def lifespan(app: FastAPI):
         WorkflowJob.create_table(wait=True)
         Project.create_table(wait=True)
         AppDeployment.create_table(wait=True)
+        Counter.create_table(wait=True)
+        AppStatus.create_table(wait=True)
     yield
 
 
@@ -246,6 +246,10 @@ class StackPack(BaseModel):
     configuration: dict[str, StackConfig] = Field(default_factory=dict)
     outputs: dict[str, Output] = Field(default_factory=dict)
     docker_images: dict[str, DockerImage | None] = Field(default_factory=dict)
+    # deploy strategy (see DeployStrategy) used when the job doesn't specify one
+    deploy_strategy: Optional[str] = Field(default=None)
+    # max concurrent resource operations for pulumi, unset uses the deployer's default
+    pulumi_parallel: Optional[int] = Field(default=None)
 
     def final_config(self, user_config: ConfigValues):
         final_cfg = ConfigValues()
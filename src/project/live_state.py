@@ -1,3 +1,4 @@
+import copy
 from typing import Optional
 
 from pydantic import BaseModel, Field
@@ -12,17 +13,20 @@ class LiveState(BaseModel):
     edges: Optional[Edges] = Field(default_factory=Edges)
 
     def to_constraints(self, common_stack: CommonStack, configuration: ConfigValues):
+        """to_constraints returns the constraints to import the live state into an app's
+        graph. The live state itself is left unmodified, so the result can be cached."""
         constraints = []
+        resources = copy.deepcopy(self.resources)
 
         for res, properties in common_stack.base.resources.items():
-            current_properties = self.resources.get(res)
+            current_properties = resources.get(res)
             if current_properties is not None and properties is not None:
                 current_properties.update(properties)
-                self.resources.update({res: current_properties})
+                resources.update({res: current_properties})
 
         for r, properties in common_stack.base.resources.items():
             if r in common_stack.always_inject:
-                current_properties = self.resources.get(r)
+                current_properties = resources.get(r)
                 if properties is not None:
                     current_properties = (
                         Properties({})
@@ -33,12 +37,12 @@ class LiveState(BaseModel):
                 logger.info(
                     f"Adding from common resource {r} due to always inject, with properties {properties}"
                 )
-                self.resources.update({r: current_properties})
+                resources.update({r: current_properties})
 
         resources_from_state = Resources(
             {
                 r: properties
-                for r, properties in self.resources.items()
+                for r, properties in resources.items()
                 if r not in common_stack.never_inject
             }
         )
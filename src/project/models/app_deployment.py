@@ -1,17 +1,20 @@
 import os
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 from pydantic import BaseModel, Field
 from pynamodb.attributes import (
     JSONAttribute,
     ListAttribute,
+    NumberAttribute,
     UnicodeAttribute,
     UTCDateTimeAttribute,
 )
+from pynamodb.exceptions import PutError
 from pynamodb.models import Model
 
 from src.deployer.models.workflow_job import (
@@ -27,10 +30,19 @@ from src.engine_service.engine_commands.run import (
 )
 from src.project import ConfigValues, StackPack
 from src.project.common_stack import CommonStack
+from src.project.models.app_status import AppStatus
 from src.util.aws.iam import Policy
 from src.util.logging import logger
 
 
+# app versions whose deployment history is read per query page when computing a status
+STATUS_VERSIONS_PAGE_SIZE = 10
+# the most keys DynamoDB allows in a single BatchGetItem call
+BATCH_GET_LIMIT = 100
+# times a status refresh is retried when another refresh saved the status first
+STATUS_REFRESH_ATTEMPTS = 5
+
+
 class AppLifecycleStatus(Enum):
     NEW = "NEW"
     PENDING = "PENDING"
@@ -62,6 +74,11 @@ class AppDeployment(Model):
     configuration: dict = JSONAttribute()
     display_name: str = UnicodeAttribute(null=True)
     policy: str = UnicodeAttribute(null=True)
+    # fingerprint of the IaC and config of the last successful deploy of this version
+    deployed_fingerprint: str = UnicodeAttribute(null=True)
+    # the stack's checkpoint version when its live state snapshot was stored, at the end
+    # of a successful deploy. Removed whenever the stack is about to change.
+    live_state_checkpoint: int = NumberAttribute(null=True)
 
     def app_id(self):
         return self.range_key.split("#")[0]
@@ -69,10 +86,15 @@ class AppDeployment(Model):
     def version(self):
         return int(self.range_key.split("#")[1]) if "#" in self.range_key else None
 
-    def to_view_model(self):
-        latest_deployed, status, reason = AppDeployment.get_status(
-            self.project_id, self.app_id()
-        )
+    def to_view_model(
+        self,
+        app_status: Optional[
+            tuple[Optional["AppDeployment"], "AppLifecycleStatus", str]
+        ] = None,
+    ):
+        if app_status is None:
+            app_status = AppDeployment.get_status(self.project_id, self.app_id())
+        latest_deployed, status, reason = app_status
         return AppDeploymentView(
             app_id=self.app_id(),
             version=self.version(),
@@ -238,92 +260,189 @@ class AppDeployment(Model):
     def get_status(
         cls, project_id: str, app_id: str
     ) -> tuple["AppDeployment", "AppLifecycleStatus", str]:
+        """get_status returns the app's materialized status. The returned AppDeployment is
+        the version the status refers to, with only its keys loaded."""
+        try:
+            return cls._from_app_status(AppStatus.get(project_id, app_id))
+        except AppStatus.DoesNotExist:
+            # apps that haven't changed since statuses were materialized
+            return cls.refresh_status(project_id, app_id)
+
+    @classmethod
+    def get_statuses(
+        cls, project_id: str, app_ids: list[str]
+    ) -> dict[str, tuple["AppDeployment", "AppLifecycleStatus", str]]:
+        """get_statuses is get_status for several of a project's apps in one batch get."""
+        statuses = {
+            app_status.app_id: cls._from_app_status(app_status)
+            for app_status in AppStatus.batch_get(
+                [(project_id, app_id) for app_id in app_ids]
+            )
+        }
+        for app_id in app_ids:
+            if app_id not in statuses:
+                statuses[app_id] = cls.refresh_status(project_id, app_id)
+        return statuses
+
+    @classmethod
+    def refresh_status(
+        cls, project_id: str, app_id: str
+    ) -> tuple["AppDeployment", "AppLifecycleStatus", str]:
+        """refresh_status recomputes the app's status from its deployment history and stores
+        it. It must be called whenever one of the app's jobs changes state.
+        The status is read before it's recomputed, and only saved if no other refresh saved
+        it in the meantime. Otherwise it's recomputed, so the last status saved is always
+        computed after the last job change."""
+        for i in range(STATUS_REFRESH_ATTEMPTS):
+            try:
+                app_status = AppStatus.get(project_id, app_id, consistent_read=True)
+            except AppStatus.DoesNotExist:
+                app_status = AppStatus(project_id, app_id)
+            app, status, reason = cls.compute_status(project_id, app_id)
+            app_status.status = status.value
+            app_status.status_reason = reason
+            app_status.version = app.version() if app else None
+            app_status.updated_at = datetime.now(timezone.utc)
+            try:
+                app_status.save()
+                return app, status, reason
+            except PutError as e:
+                if (
+                    e.cause_response_code != "ConditionalCheckFailedException"
+                    or i == STATUS_REFRESH_ATTEMPTS - 1
+                ):
+                    raise
+                logger.info(
+                    f"Status of {project_id}/{app_id} changed while refreshing; attempt={i + 1}"
+                )
+
+    @classmethod
+    def _from_app_status(
+        cls, app_status: AppStatus
+    ) -> tuple["AppDeployment", "AppLifecycleStatus", str]:
+        app = None
+        if app_status.version is not None:
+            app = cls(
+                app_status.project_id,
+                cls.compose_range_key(app_status.app_id, app_status.version),
+            )
+        return app, AppLifecycleStatus(app_status.status), app_status.status_reason
+
+    @classmethod
+    def compute_status(
+        cls, project_id: str, app_id: str
+    ) -> tuple["AppDeployment", "AppLifecycleStatus", str]:
+        """compute_status walks the app's jobs, newest first, until one determines its
+        status. The reads are consistent so a job update made just before is seen."""
         results = cls.query(
             project_id,
             AppDeployment.range_key.startswith(f"{app_id}#"),
             filter_condition=AppDeployment.deployments.exists(),  # Only include items where status is not null
             scan_index_forward=False,  # Sort in descending order
-            page_size=10,  # Only check the ten most recent versions
+            page_size=STATUS_VERSIONS_PAGE_SIZE,
+            consistent_read=True,
         )
         local_state = None
-        for app in results:
-            for i in range(len(app.deployments), 0, -1):
-                deployment = app.deployments[i - 1]
-                hk, rk = WorkflowJob.composite_key_to_keys(deployment)
-                try:
-                    job = WorkflowJob.get(hk, rk)
-                except WorkflowJob.DoesNotExist:
-                    logger.error(f"Job {hk} # {rk} not found")
-                    return app, AppLifecycleStatus.INSTALLED, None
-                if local_state:
-                    if job.job_type == WorkflowJobType.DESTROY.value:
-                        if job.status == WorkflowJobStatus.SUCCEEDED.value:
-                            return local_state
-                    if local_state[1] == AppLifecycleStatus.INSTALLING:
-                        return (
-                            local_state[0],
-                            AppLifecycleStatus.UPDATING,
-                            job.status_reason,
-                        )
-                    elif local_state[1] == AppLifecycleStatus.INSTALL_FAILED:
-                        return app, AppLifecycleStatus.UPDATE_FAILED, job.status_reason
-
-                if job.job_type == WorkflowJobType.DEPLOY.value:
-                    if job.status == WorkflowJobStatus.FAILED.value:
-                        local_state = (
-                            app,
-                            AppLifecycleStatus.INSTALL_FAILED,
-                            job.status_reason,
-                        )
-                    elif job.status == WorkflowJobStatus.SUCCEEDED.value:
-                        return app, AppLifecycleStatus.INSTALLED, job.status_reason
-                    elif job.status == WorkflowJobStatus.IN_PROGRESS.value:
-                        local_state = (
-                            app,
-                            AppLifecycleStatus.INSTALLING,
-                            job.status_reason,
-                        )
-                    elif (
-                        job.status == WorkflowJobStatus.NEW.value
-                        or job.status == WorkflowJobStatus.PENDING.value
-                    ):
-                        return app, AppLifecycleStatus.PENDING, job.status_reason
-                    elif (
-                        job.status == WorkflowJobStatus.CANCELED.value
-                        or job.status == WorkflowJobStatus.SKIPPED.value
-                    ):
-                        continue
-                    else:
-                        return app, AppLifecycleStatus.UNKNOWN, job.status_reason
-                elif job.job_type == WorkflowJobType.DESTROY.value:
-                    if job.status == WorkflowJobStatus.FAILED.value:
-                        return (
-                            app,
-                            AppLifecycleStatus.UNINSTALL_FAILED,
-                            job.status_reason,
-                        )
-                    elif job.status == WorkflowJobStatus.SUCCEEDED.value:
-                        return None, AppLifecycleStatus.UNINSTALLED, job.status_reason
-                    elif job.status == WorkflowJobStatus.IN_PROGRESS.value:
-                        return app, AppLifecycleStatus.UNINSTALLING, job.status_reason
-                    elif (
-                        job.status == WorkflowJobStatus.NEW.value
-                        or job.status == WorkflowJobStatus.PENDING.value
-                    ):
-                        return app, AppLifecycleStatus.PENDING, job.status_reason
-                    elif (
-                        job.status == WorkflowJobStatus.CANCELED.value
-                        or job.status == WorkflowJobStatus.SKIPPED.value
-                    ):
-                        continue
-                    else:
-                        return app, AppLifecycleStatus.UNKNOWN, job.status_reason
+        for app, (hk, rk), job in cls._deployment_jobs(results):
+            if job is None:
+                logger.error(f"Job {hk} # {rk} not found")
+                return app, AppLifecycleStatus.INSTALLED, None
+            if local_state:
+                if job.job_type == WorkflowJobType.DESTROY.value:
+                    if job.status == WorkflowJobStatus.SUCCEEDED.value:
+                        return local_state
+                if local_state[1] == AppLifecycleStatus.INSTALLING:
+                    return (
+                        local_state[0],
+                        AppLifecycleStatus.UPDATING,
+                        job.status_reason,
+                    )
+                elif local_state[1] == AppLifecycleStatus.INSTALL_FAILED:
+                    return app, AppLifecycleStatus.UPDATE_FAILED, job.status_reason
+
+            if job.job_type == WorkflowJobType.DEPLOY.value:
+                if job.status == WorkflowJobStatus.FAILED.value:
+                    local_state = (
+                        app,
+                        AppLifecycleStatus.INSTALL_FAILED,
+                        job.status_reason,
+                    )
+                elif job.status == WorkflowJobStatus.SUCCEEDED.value:
+                    return app, AppLifecycleStatus.INSTALLED, job.status_reason
+                elif job.status == WorkflowJobStatus.IN_PROGRESS.value:
+                    local_state = (
+                        app,
+                        AppLifecycleStatus.INSTALLING,
+                        job.status_reason,
+                    )
+                elif (
+                    job.status == WorkflowJobStatus.NEW.value
+                    or job.status == WorkflowJobStatus.PENDING.value
+                ):
+                    return app, AppLifecycleStatus.PENDING, job.status_reason
+                elif (
+                    job.status == WorkflowJobStatus.CANCELED.value
+                    or job.status == WorkflowJobStatus.SKIPPED.value
+                ):
+                    continue
+                else:
+                    return app, AppLifecycleStatus.UNKNOWN, job.status_reason
+            elif job.job_type == WorkflowJobType.DESTROY.value:
+                if job.status == WorkflowJobStatus.FAILED.value:
+                    return (
+                        app,
+                        AppLifecycleStatus.UNINSTALL_FAILED,
+                        job.status_reason,
+                    )
+                elif job.status == WorkflowJobStatus.SUCCEEDED.value:
+                    return None, AppLifecycleStatus.UNINSTALLED, job.status_reason
+                elif job.status == WorkflowJobStatus.IN_PROGRESS.value:
+                    return app, AppLifecycleStatus.UNINSTALLING, job.status_reason
+                elif (
+                    job.status == WorkflowJobStatus.NEW.value
+                    or job.status == WorkflowJobStatus.PENDING.value
+                ):
+                    return app, AppLifecycleStatus.PENDING, job.status_reason
+                elif (
+                    job.status == WorkflowJobStatus.CANCELED.value
+                    or job.status == WorkflowJobStatus.SKIPPED.value
+                ):
+                    continue
                 else:
-                    raise ValueError(f"Unknown job type {job.job_type}")
+                    return app, AppLifecycleStatus.UNKNOWN, job.status_reason
+            else:
+                raise ValueError(f"Unknown job type {job.job_type}")
         if local_state:
             return local_state
         return None, AppLifecycleStatus.NEW, None
 
+    @staticmethod
+    def _deployment_jobs(
+        apps: Iterable["AppDeployment"],
+    ) -> Iterator[tuple["AppDeployment", tuple[str, int], Optional[WorkflowJob]]]:
+        """_deployment_jobs yields the apps' jobs, newest first, with the app version each
+        deployed and None for jobs that don't exist. Jobs are batch got for a page of app
+        versions at a time, in as few requests as the walk over them needs."""
+        apps = iter(apps)
+        while page := list(islice(apps, STATUS_VERSIONS_PAGE_SIZE)):
+            deployments = [
+                (app, WorkflowJob.composite_key_to_keys(deployment))
+                for app in page
+                for deployment in reversed(app.deployments)
+            ]
+            for i in range(0, len(deployments), BATCH_GET_LIMIT):
+                window = deployments[i : i + BATCH_GET_LIMIT]
+                jobs = {
+                    (job.partition_key, job.job_number): job
+                    for job in WorkflowJob.batch_get(
+                        # a key can only be requested once per batch
+                        list(dict.fromkeys(keys for _, keys in window)),
+                        consistent_read=True,
+                    )
+                }
+                for app, keys in window:
+                    yield app, keys, jobs.get(keys)
+
     @staticmethod
     def compose_range_key(app_id, version):
         return f"{app_id}#{version:08}"
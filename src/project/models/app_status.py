@@ -0,0 +1,35 @@
+import os
+from datetime import datetime, timezone
+
+from pynamodb.attributes import (
+    NumberAttribute,
+    UnicodeAttribute,
+    UTCDateTimeAttribute,
+    VersionAttribute,
+)
+from pynamodb.models import Model
+
+
+class AppStatus(Model):
+    """AppStatus is an app's lifecycle status, materialized from its deployment history
+    whenever one of its jobs changes state, so reading it is a single get."""
+
+    class Meta:
+        table_name = os.environ.get("APP_STATUSES_TABLE_NAME", "AppStatuses")
+        billing_mode = "PAY_PER_REQUEST"
+        host = os.environ.get("DYNAMODB_HOST", None)
+        region = os.environ.get("AWS_DEFAULT_REGION", None)
+
+    project_id: str = UnicodeAttribute(hash_key=True)
+    app_id: str = UnicodeAttribute(range_key=True)
+    # an AppLifecycleStatus value
+    status: str = UnicodeAttribute()
+    status_reason: str = UnicodeAttribute(null=True)
+    # the app version the status refers to, eg the last deployed version when INSTALLED
+    version: int = NumberAttribute(null=True)
+    updated_at: datetime = UTCDateTimeAttribute(
+        default=lambda: datetime.now(timezone.utc)
+    )
+    # saves are conditional on the revision that was read, so a status computed from an
+    # older view of the app's jobs can't overwrite one computed after it
+    revision: int = VersionAttribute()
@@ -319,8 +319,9 @@ class Project(Model):
     def to_view_model(self):
         apps = {}
         policy = Policy()
+        statuses = AppDeployment.get_statuses(self.id, list(self.apps.keys()))
         for app in self.get_app_deployments():
-            apps[app.app_id()] = app.to_view_model()
+            apps[app.app_id()] = app.to_view_model(statuses.get(app.app_id()))
             policy.combine(Policy(app.policy))
 
         return ProjectView(
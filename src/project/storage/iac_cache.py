@@ -0,0 +1,137 @@
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from src.project.storage.iac_storage import IacStorage
+from src.util.logging import logger
+
+IAC_CACHE_DIR = Path(
+    os.getenv("IAC_CACHE_DIR", Path(tempfile.gettempdir()) / "stacksnap-iac-cache")
+)
+IAC_CACHE_MAX_BYTES = int(os.getenv("IAC_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+
+class IacCache:
+    """IacCache keeps extracted IaC directories on local disk, keyed by (project, app, version).
+
+    Each entry records the ETag of the stored IaC it was extracted from. A lookup only
+    issues a HEAD request to validate the ETag; the download and extraction are skipped
+    on a hit. Entries are evicted least-recently-used first once the cache exceeds
+    max_bytes.
+
+    Entries are populated in a staging directory and renamed into place, so concurrent
+    workers (eg, the deploy process pool) never observe a partially extracted entry.
+    """
+
+    ETAG_FILE = ".etag"
+    SIZE_FILE = ".size"
+    IAC_DIR = "iac"
+
+    def __init__(
+        self,
+        iac_storage: IacStorage,
+        root: Path = IAC_CACHE_DIR,
+        max_bytes: int = IAC_CACHE_MAX_BYTES,
+    ):
+        self.iac_storage = iac_storage
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def entry_dir(self, pack_id: str, app_name: str, version: int) -> Path:
+        return self.root / _path_part(pack_id) / _path_part(app_name) / str(version)
+
+    def extract_iac(self, pack_id: str, app_name: str, version: int, target_dir: Path):
+        """extract_iac has the same contract as IacStorage.extract_iac but serves the files
+        from the local cache when the cached entry's ETag is still current."""
+        etag = self.iac_storage.get_iac_etag(pack_id, app_name, version)
+        entry = self.entry_dir(pack_id, app_name, version)
+        if etag is None or self._read(entry / IacCache.ETAG_FILE) != etag:
+            logger.info(f"IaC cache miss for {pack_id}/{app_name}/{version}")
+            self._populate(pack_id, app_name, version, entry, etag)
+        else:
+            logger.info(f"IaC cache hit for {pack_id}/{app_name}/{version}")
+
+        try:
+            shutil.copytree(entry / IacCache.IAC_DIR, target_dir, dirs_exist_ok=True)
+            # the size file's mtime doubles as the entry's last access time for eviction
+            (entry / IacCache.SIZE_FILE).touch(exist_ok=True)
+        except FileNotFoundError:
+            # evicted by another worker between populate and copy
+            logger.warning(f"IaC cache entry {entry} disappeared, extracting directly")
+            self.iac_storage.extract_iac(pack_id, app_name, version, target_dir)
+        self.evict()
+
+    def _populate(
+        self,
+        pack_id: str,
+        app_name: str,
+        version: int,
+        entry: Path,
+        etag: Optional[str],
+    ):
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=entry.parent, prefix=".staging-"))
+        try:
+            self.iac_storage.extract_iac(
+                pack_id, app_name, version, staging / IacCache.IAC_DIR
+            )
+            size = sum(
+                f.stat().st_size for f in (staging / IacCache.IAC_DIR).rglob("*")
+            )
+            (staging / IacCache.SIZE_FILE).write_text(str(size))
+            if etag is not None:
+                (staging / IacCache.ETAG_FILE).write_text(etag)
+
+            old = None
+            if entry.exists():
+                old = Path(tempfile.mkdtemp(dir=entry.parent, prefix=".old-"))
+                entry.rename(old / "entry")
+            try:
+                staging.rename(entry)
+            except OSError:
+                # another worker populated the entry first, theirs is just as good
+                logger.debug(f"IaC cache entry {entry} already populated")
+            if old is not None:
+                shutil.rmtree(old, ignore_errors=True)
+        finally:
+            if staging.exists():
+                shutil.rmtree(staging, ignore_errors=True)
+
+    def evict(self):
+        entries = []
+        total = 0
+        # every entry has a size file, including those stored without an ETag
+        for size_file in self.root.glob(f"*/*/*/{IacCache.SIZE_FILE}"):
+            entry = size_file.parent
+            if entry.name.startswith("."):
+                # a staging directory that is still being populated
+                continue
+            try:
+                size = int(self._read(size_file) or 0)
+                entries.append((size_file.stat().st_mtime, size, entry))
+            except (FileNotFoundError, ValueError):
+                continue
+            total += size
+
+        entries.sort()
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            logger.info(f"Evicting {entry} from IaC cache ({size} bytes)")
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    @staticmethod
+    def _read(path: Path) -> Optional[str]:
+        try:
+            return path.read_text()
+        except FileNotFoundError:
+            return None
+
+
+def _path_part(name: str) -> str:
+    # names are used as single path components, so they can't contain separators or be ..
+    return re.sub(r"[^\w.-]", "_", name).lstrip(".") or "_"
@@ -1,9 +1,27 @@
-from typing import Optional
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
 
 from botocore.exceptions import ClientError
+from pydantic import BaseModel, Field
 
-from src.util.aws.s3 import delete_objects, get_object, put_object
+from src.util.aws.s3 import (
+    concurrent_map,
+    delete_objects,
+    download_fileobj,
+    get_object,
+    object_exists,
+    put_object,
+    upload_fileobj,
+)
+from src.util.compress import iter_files, spooled_zip, write_zip_to_directory
 from src.util.logging import logger
+from src.util.tmp import TempDir
 
 
 class WriteIacError(Exception):
@@ -14,12 +32,66 @@ class IaCDoesNotExistError(Exception):
     pass
 
 
+# the most keys S3 allows in a single DeleteObjects call
+DELETE_OBJECTS_LIMIT = 1000
+# write_iac_dir uploads a version's blobs before its manifest, so blobs younger than this
+# may be about to be referenced
+BLOB_GC_MIN_AGE = timedelta(hours=int(os.getenv("IAC_BLOB_GC_MIN_AGE_HOURS", "24")))
+
+
+class IacManifestEntry(BaseModel):
+    path: str
+    digest: str
+    size: int
+    mode: int = Field(default=0o644)
+
+
+class IacManifest(BaseModel):
+    """IacManifest describes one version of an app's IaC as a list of files whose contents
+    are stored as content-addressed blobs (see IacStorage.get_path_for_blob)."""
+
+    files: list[IacManifestEntry] = Field(default_factory=list)
+
+    @staticmethod
+    def from_directory(directory: str | Path) -> "IacManifest":
+        files = []
+        for srcpath, relpath in iter_files(directory):
+            digest = hashlib.sha256()
+            with open(srcpath, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            stat = srcpath.stat()
+            files.append(
+                IacManifestEntry(
+                    path=relpath,
+                    digest=digest.hexdigest(),
+                    size=stat.st_size,
+                    mode=stat.st_mode & 0o777,
+                )
+            )
+        files.sort(key=lambda f: f.path)
+        return IacManifest(files=files)
+
+    def to_bytes(self) -> bytes:
+        return json.dumps(self.model_dump(), sort_keys=True).encode()
+
+
+class DeployedIac(BaseModel):
+    """DeployedIac records what the last successful deploy of an app applied, so the next
+    deploy can tell which parts changed."""
+
+    manifest: IacManifest
+    config_digest: str
+
+
 class IacStorage:
 
     def __init__(self, bucket):
         self._bucket = bucket
 
     def get_iac(self, pack_id: str, app_name: str, version: int) -> Optional[bytes]:
+        """get_iac returns the zip bytes of a version written with write_iac. Versions
+        written with write_iac_dir have no zip, use extract_iac or iac_zip for those."""
         logger.info(
             f"Getting iac for pack_id: {pack_id}, app_name: {app_name}, version: {version}"
         )
@@ -42,30 +114,166 @@ class IacStorage:
                 raise IaCDoesNotExistError(f"No iac exists for user: {pack_id}")
             raise
 
+    def get_manifest(
+        self, pack_id: str, app_name: str, version: int
+    ) -> Optional[IacManifest]:
+        obj = self._bucket.Object(
+            IacStorage.get_path_for_manifest(pack_id, app_name, version)
+        )
+        try:
+            return IacManifest.model_validate_json(get_object(obj))
+        except ClientError as err:
+            if err.response["Error"]["Code"] == "NoSuchKey":
+                return None
+            raise
+
+    def get_iac_etag(self, pack_id: str, app_name: str, version: int) -> Optional[str]:
+        """get_iac_etag returns the ETag of the version's manifest (or legacy zip) using a
+        HEAD request, or None if no iac exists."""
+        for key in [
+            IacStorage.get_path_for_manifest(pack_id, app_name, version),
+            IacStorage.get_path_for_iac(pack_id, app_name, version),
+        ]:
+            obj = self._bucket.Object(key)
+            if object_exists(obj):
+                return obj.e_tag
+        return None
+
+    def extract_iac(self, pack_id: str, app_name: str, version: int, target_dir: Path):
+        """extract_iac writes the iac files directly into target_dir, downloading each blob
+        straight to its destination instead of going through a zip."""
+        logger.info(
+            f"Extracting iac for pack_id: {pack_id}, app_name: {app_name}, version: {version} to {target_dir}"
+        )
+        target_dir = Path(target_dir)
+        manifest = self.get_manifest(pack_id, app_name, version)
+        if manifest is None:
+            write_zip_to_directory(self.get_iac(pack_id, app_name, version), target_dir)
+            return
+        self._download_blobs(manifest, target_dir)
+
+    @contextmanager
+    def iac_zip(self, pack_id: str, app_name: str, version: int) -> Iterator[BinaryIO]:
+        """iac_zip yields the version's iac as a zip file object, rewound to the start.
+        Versions written with write_iac_dir are zipped from their blobs into a spooled file,
+        so large programs aren't held in memory."""
+        manifest = self.get_manifest(pack_id, app_name, version)
+        if manifest is None:
+            yield BytesIO(self.get_iac(pack_id, app_name, version))
+            return
+        with TempDir() as tmp_dir:
+            self._download_blobs(manifest, tmp_dir)
+            with spooled_zip(tmp_dir) as iac_zip:
+                yield iac_zip
+
+    def _download_blobs(self, manifest: IacManifest, target_dir: Path):
+        def download_blob(entry: IacManifestEntry):
+            dst = target_dir / entry.path
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            blob = self._bucket.Object(IacStorage.get_path_for_blob(entry.digest))
+            with open(dst, "wb") as f:
+                download_fileobj(blob, f)
+            os.chmod(dst, entry.mode)
+
+        concurrent_map(download_blob, manifest.files)
+
     def write_iac(
-        self, pack_id: str, app_name: str, version: int, content: bytes
+        self, pack_id: str, app_name: str, version: int, content: bytes | BinaryIO
     ) -> str:
+        """write_iac uploads the zipped iac. content is either the zip bytes or a seekable
+        binary file object (eg, from spooled_zip) which is streamed to S3."""
         logger.info(
             f"Writing iac for pack_id: {pack_id}, app_name: {app_name}, version: {version}"
         )
         key = IacStorage.get_path_for_iac(pack_id, app_name, version)
         try:
-            if not isinstance(content, bytes):
-                raise TypeError(f"content must be of type bytes, not {type(content)}")
             obj = self._bucket.Object(key)
-            put_object(obj, content)
-            logger.info("Wrote %s (size: %d)", key, len(content))
+            if isinstance(content, bytes):
+                put_object(obj, content)
+                size = len(content)
+            elif hasattr(content, "read"):
+                size = content.seek(0, os.SEEK_END)
+                content.seek(0)
+                upload_fileobj(obj, content)
+            else:
+                raise TypeError(
+                    f"content must be of type bytes or a file object, not {type(content)}"
+                )
+            logger.info("Wrote %s (size: %d)", key, size)
             return key
         except Exception as e:
             raise WriteIacError(
                 f"Failed to write iac to S3 bucket {self._bucket.name} and key {key}: {e}"
             )
 
+    def write_iac_dir(
+        self, pack_id: str, app_name: str, version: int, directory: Path
+    ) -> IacManifest:
+        """write_iac_dir stores the iac in directory as content-addressed blobs plus a
+        per-version manifest. Blobs that already exist (from any version or project) are
+        not uploaded again."""
+        logger.info(
+            f"Writing iac for pack_id: {pack_id}, app_name: {app_name}, version: {version}"
+        )
+        key = IacStorage.get_path_for_manifest(pack_id, app_name, version)
+        try:
+            manifest = IacManifest.from_directory(directory)
+            unique = {entry.digest: entry for entry in manifest.files}
+
+            def upload_blob(entry: IacManifestEntry) -> int:
+                blob = self._bucket.Object(IacStorage.get_path_for_blob(entry.digest))
+                if object_exists(blob):
+                    return 0
+                with open(Path(directory) / entry.path, "rb") as f:
+                    upload_fileobj(blob, f)
+                return entry.size
+
+            uploaded_bytes = sum(concurrent_map(upload_blob, unique.values()))
+            put_object(self._bucket.Object(key), manifest.to_bytes())
+            logger.info(
+                "Wrote %s (%d files, uploaded %d of %d bytes)",
+                key,
+                len(manifest.files),
+                uploaded_bytes,
+                sum(f.size for f in manifest.files),
+            )
+            return manifest
+        except Exception as e:
+            raise WriteIacError(
+                f"Failed to write iac to S3 bucket {self._bucket.name} and key {key}: {e}"
+            )
+
+    def get_blob(self, digest: str) -> bytes:
+        return get_object(self._bucket.Object(IacStorage.get_path_for_blob(digest)))
+
+    def get_deployed(self, pack_id: str, app_name: str) -> Optional[DeployedIac]:
+        obj = self._bucket.Object(IacStorage.get_path_for_deployed(pack_id, app_name))
+        try:
+            return DeployedIac.model_validate_json(get_object(obj))
+        except ClientError as err:
+            if err.response["Error"]["Code"] == "NoSuchKey":
+                return None
+            raise
+
+    def write_deployed(self, pack_id: str, app_name: str, deployed: DeployedIac):
+        obj = self._bucket.Object(IacStorage.get_path_for_deployed(pack_id, app_name))
+        put_object(obj, deployed.model_dump_json().encode())
+
+    def delete_deployed(self, pack_id: str, app_name: str):
+        delete_objects(
+            self._bucket, [IacStorage.get_path_for_deployed(pack_id, app_name)]
+        )
+
     def delete_iac(self, pack_id: str, app_name: str, version: int):
+        """delete_iac removes the version's manifest and zip. Blobs may be shared with
+        other versions, so they are left for collect_garbage."""
         logger.info(
             f"Deleting iac for pack_id: {pack_id}, app_name: {app_name}, version: {version}"
         )
-        keys = [IacStorage.get_path_for_iac(pack_id, app_name, version)]
+        keys = [
+            IacStorage.get_path_for_iac(pack_id, app_name, version),
+            IacStorage.get_path_for_manifest(pack_id, app_name, version),
+        ]
         try:
             delete_objects(self._bucket, keys)
         except Exception as e:
@@ -73,6 +281,76 @@ class IacStorage:
                 f"Failed to delete iac from S3 bucket {self._bucket.name} and key {keys}: {e}"
             )
 
+    def collect_garbage(
+        self, min_age: timedelta = BLOB_GC_MIN_AGE, dry_run: bool = False
+    ) -> list[str]:
+        """collect_garbage deletes the blobs that no manifest or deployed record references
+        and returns their keys. Blobs younger than min_age are kept for writes in progress.
+        Manifests written while it runs are read again before deleting, which leaves a
+        window of a few requests in which a new version can reuse a blob being deleted.
+        """
+        started = datetime.now(timezone.utc)
+        blob_prefix = IacStorage.get_path_for_blob("")[:-1]
+        blobs = []
+        records = []
+        for obj in self._bucket.objects.all():
+            if obj.key.startswith(blob_prefix):
+                if obj.last_modified <= started - min_age:
+                    blobs.append(obj.key)
+            elif obj.key.endswith(("/manifest.json", "/deployed.json")):
+                records.append(obj.key)
+
+        referenced = self._referenced_blobs(records)
+        referenced |= self._referenced_blobs(
+            [
+                obj.key
+                for obj in self._bucket.objects.all()
+                if obj.key.endswith(("/manifest.json", "/deployed.json"))
+                and obj.last_modified >= started
+            ]
+        )
+        unreferenced = [key for key in blobs if key not in referenced]
+        logger.info(
+            "Found %d unreferenced of %d collectable blobs",
+            len(unreferenced),
+            len(blobs),
+        )
+        if not dry_run:
+            for i in range(0, len(unreferenced), DELETE_OBJECTS_LIMIT):
+                delete_objects(self._bucket, unreferenced[i : i + DELETE_OBJECTS_LIMIT])
+        return unreferenced
+
+    def _referenced_blobs(self, keys: list[str]) -> set[str]:
+        client, bucket_name = self._bucket.meta.client, self._bucket.name
+
+        def read(key: str) -> IacManifest:
+            try:
+                body = client.get_object(Bucket=bucket_name, Key=key)["Body"].read()
+            except client.exceptions.NoSuchKey:
+                # deleted since it was listed
+                return IacManifest()
+            if key.endswith("/deployed.json"):
+                return DeployedIac.model_validate_json(body).manifest
+            return IacManifest.model_validate_json(body)
+
+        return {
+            IacStorage.get_path_for_blob(entry.digest)
+            for manifest in concurrent_map(read, keys)
+            for entry in manifest.files
+        }
+
     @staticmethod
     def get_path_for_iac(pack_id: str, app_name: str, version: int) -> str:
         return "/".join([pack_id, app_name, "iac", str(version), "iac.zip"])
+
+    @staticmethod
+    def get_path_for_manifest(pack_id: str, app_name: str, version: int) -> str:
+        return "/".join([pack_id, app_name, "iac", str(version), "manifest.json"])
+
+    @staticmethod
+    def get_path_for_deployed(pack_id: str, app_name: str) -> str:
+        return "/".join([pack_id, app_name, "iac", "deployed.json"])
+
+    @staticmethod
+    def get_path_for_blob(digest: str) -> str:
+        return "/".join(["blobs", "sha256", digest[:2], digest])
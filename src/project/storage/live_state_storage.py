@@ -0,0 +1,84 @@
+import json
+from typing import Optional
+
+from botocore.exceptions import ClientError
+from pydantic import BaseModel
+
+from src.project.live_state import LiveState
+from src.util.aws.s3 import get_object, put_object
+from src.util.logging import logger
+
+
+class LiveStateSnapshot(BaseModel):
+    """LiveStateSnapshot is the parsed live state of a stack as of one checkpoint version
+    (the stack's update number)."""
+
+    checkpoint_version: int
+    live_state: LiveState
+
+
+class ImportConstraints(BaseModel):
+    """ImportConstraints are the constraints derived from the common stack's live state for
+    importing it into app graphs, as computed by the common job of one deploy run."""
+
+    run_id: str
+    constraints: list[dict]
+
+
+class LiveStateStorage:
+
+    def __init__(self, bucket):
+        self._bucket = bucket
+
+    def get_snapshot(self, pack_id: str, app_name: str) -> Optional[LiveStateSnapshot]:
+        obj = self._bucket.Object(
+            LiveStateStorage.get_path_for_snapshot(pack_id, app_name)
+        )
+        try:
+            # Resources/Edges use instance-or-dict schemas, which can't validate JSON directly
+            return LiveStateSnapshot.model_validate(json.loads(get_object(obj)))
+        except ClientError as err:
+            if err.response["Error"]["Code"] == "NoSuchKey":
+                return None
+            raise
+
+    def write_snapshot(self, pack_id: str, app_name: str, snapshot: LiveStateSnapshot):
+        logger.info(
+            f"Writing live state snapshot for pack_id: {pack_id}, app_name: {app_name}, checkpoint: {snapshot.checkpoint_version}"
+        )
+        obj = self._bucket.Object(
+            LiveStateStorage.get_path_for_snapshot(pack_id, app_name)
+        )
+        put_object(obj, snapshot.model_dump_json().encode())
+
+    def get_import_constraints(
+        self, pack_id: str, app_name: str
+    ) -> Optional[ImportConstraints]:
+        obj = self._bucket.Object(
+            LiveStateStorage.get_path_for_import_constraints(pack_id, app_name)
+        )
+        try:
+            return ImportConstraints.model_validate_json(get_object(obj))
+        except ClientError as err:
+            if err.response["Error"]["Code"] == "NoSuchKey":
+                return None
+            raise
+
+    def write_import_constraints(
+        self, pack_id: str, app_name: str, import_constraints: ImportConstraints
+    ):
+        logger.info(
+            f"Writing import constraints for pack_id: {pack_id}, app_name: {app_name}, run: {import_constraints.run_id}"
+        )
+        obj = self._bucket.Object(
+            LiveStateStorage.get_path_for_import_constraints(pack_id, app_name)
+        )
+        put_object(obj, import_constraints.model_dump_json().encode())
+
+    @staticmethod
+    def get_path_for_snapshot(pack_id: str, app_name: str) -> str:
+        return "/".join([pack_id, app_name, "live_state.json"])
+
+    @staticmethod
+    def get_path_for_import_constraints(pack_id: str, app_name: str) -> str:
+        return "/".join([pack_id, app_name, "import_constraints.json"])
@@ -0,0 +1,116 @@
+import bisect
+import gzip
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from botocore.exceptions import ClientError
+from pydantic import BaseModel
+
+from src.util.aws.s3 import get_object, get_object_range, put_object, upload_fileobj
+from src.util.logging import logger
+
+# Uncompressed size of each independently compressed chunk of an archived log. Reading
+# from any offset only needs the chunks from the one containing it.
+LOG_ARCHIVE_CHUNK_SIZE = int(os.getenv("LOG_ARCHIVE_CHUNK_SIZE", str(256 * 1024)))
+
+
+class LogChunk(BaseModel):
+    """LogChunk is one gzip member of an archived log, covering whole lines."""
+
+    # byte offset in the log of the chunk's first line
+    offset: int
+    # number of the chunk's first line in the log, starting at 0
+    line: int
+    # byte range of the chunk's gzip member in the archive
+    start: int
+    length: int
+
+
+class LogIndex(BaseModel):
+    size: int
+    lines: int
+    chunks: list[LogChunk]
+
+    def chunk_for(self, offset: int) -> int:
+        """chunk_for returns the index of the chunk containing the byte offset."""
+        return max(bisect.bisect_right([c.offset for c in self.chunks], offset) - 1, 0)
+
+
+class LogStorage:
+    """LogStorage archives completed deployment logs. Each log is stored as concatenated gzip
+    members of about LOG_ARCHIVE_CHUNK_SIZE (which together are still a valid gzip file),
+    along with an index of the chunks' offsets, so it can be read from any offset with
+    ranged reads."""
+
+    def __init__(self, bucket):
+        self._bucket = bucket
+
+    def write_log(self, pack_id: str, deploy_id: str, stack_id: str, path: Path):
+        chunks = []
+        offset = line = 0
+        with open(path, "rb") as log, tempfile.TemporaryFile() as archive:
+            while data := log.read(LOG_ARCHIVE_CHUNK_SIZE):
+                # end every chunk on a line boundary
+                data += log.readline()
+                member = gzip.compress(data)
+                chunks.append(
+                    LogChunk(
+                        offset=offset,
+                        line=line,
+                        start=archive.tell(),
+                        length=len(member),
+                    )
+                )
+                archive.write(member)
+                offset += len(data)
+                line += data.count(b"\n")
+            archive.seek(0)
+            upload_fileobj(
+                self._bucket.Object(
+                    LogStorage.get_path_for_log(pack_id, deploy_id, stack_id)
+                ),
+                archive,
+            )
+        # the index is written last, so a log is only read once its archive is complete
+        logger.info(
+            f"Archived log for pack_id: {pack_id}, deploy_id: {deploy_id}, stack_id: {stack_id} ({offset} bytes, {len(chunks)} chunks)"
+        )
+        put_object(
+            self._bucket.Object(
+                LogStorage.get_path_for_index(pack_id, deploy_id, stack_id)
+            ),
+            LogIndex(size=offset, lines=line, chunks=chunks).model_dump_json().encode(),
+        )
+
+    def get_index(
+        self, pack_id: str, deploy_id: str, stack_id: str
+    ) -> Optional[LogIndex]:
+        obj = self._bucket.Object(
+            LogStorage.get_path_for_index(pack_id, deploy_id, stack_id)
+        )
+        try:
+            return LogIndex.model_validate_json(get_object(obj))
+        except ClientError as err:
+            if err.response["Error"]["Code"] == "NoSuchKey":
+                return None
+            raise
+
+    def read_chunk(
+        self, pack_id: str, deploy_id: str, stack_id: str, chunk: LogChunk
+    ) -> bytes:
+        obj = self._bucket.Object(
+            LogStorage.get_path_for_log(pack_id, deploy_id, stack_id)
+        )
+        return gzip.decompress(
+            get_object_range(obj, chunk.start, chunk.start + chunk.length - 1)
+        )
+
+    @staticmethod
+    def get_path_for_log(pack_id: str, deploy_id: str, stack_id: str) -> str:
+        return "/".join(["logs", pack_id, deploy_id, f"{stack_id}.log.gz"])
+
+    @staticmethod
+    def get_path_for_index(pack_id: str, deploy_id: str, stack_id: str) -> str:
+        return "/".join(["logs", pack_id, deploy_id, f"{stack_id}.index.json"])
@@ -1,9 +1,44 @@
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, TypeVar
 
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 
 logger = logging.getLogger(__name__)
 
+# Objects larger than the threshold are uploaded in parts of chunk size. Managed
+# transfers only ever buffer a few chunks, regardless of the object size.
+MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))
+MULTIPART_CHUNK_SIZE = int(os.getenv("S3_MULTIPART_CHUNK_SIZE", str(8 * 1024 * 1024)))
+
+transfer_config = TransferConfig(
+    multipart_threshold=MULTIPART_THRESHOLD,
+    multipart_chunksize=MULTIPART_CHUNK_SIZE,
+)
+
+# Bounds the number of S3 requests in flight for batched operations. Only leaf S3 calls
+# are submitted to this pool (never work that itself submits), so it cannot deadlock.
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "16"))
+_executor = ThreadPoolExecutor(max_workers=S3_MAX_CONCURRENCY, thread_name_prefix="s3")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def concurrent_map(fn: Callable[[T], R], items: Iterable[T]) -> list[R]:
+    """
+    Runs fn over items on the S3 thread pool and returns the results in order.
+    The first exception raised by fn is re-raised.
+
+    boto3 clients are thread safe, but resources are not. Sharing a Bucket across items
+    is fine as long as fn only derives sub-resources from it (eg, bucket.Object(key)),
+    which reads the bucket's name and reuses its client. fn must not load or modify
+    attributes of a resource that other items use.
+    """
+    return list(_executor.map(fn, items))
+
 
 def put_object(obj, data):
     """
@@ -22,8 +57,9 @@ def put_object(obj, data):
             raise
 
     try:
+        # S3 provides strong read-after-write consistency, so there's no need to poll
+        # for the object to exist after a successful PUT.
         obj.put(Body=put_data)
-        obj.wait_until_exists()
         logger.info(
             "Put object '%s' to bucket '%s'.",
             obj.key,
@@ -41,6 +77,67 @@ def put_object(obj, data):
             put_data.close()
 
 
+def upload_fileobj(obj, fileobj):
+    """
+    Streams a readable binary file object to the object, using a multipart upload
+    when it is larger than the multipart threshold.
+
+    :param fileobj: The file object to upload, positioned at the start of the data.
+    """
+    try:
+        obj.upload_fileobj(fileobj, Config=transfer_config)
+        logger.info(
+            "Uploaded object '%s' to bucket '%s'.",
+            obj.key,
+            obj.bucket_name,
+        )
+    except ClientError:
+        logger.exception(
+            "Couldn't upload object '%s' to bucket '%s'.",
+            obj.key,
+            obj.bucket_name,
+        )
+        raise
+
+
+def download_fileobj(obj, fileobj):
+    """
+    Streams the object into a writable binary file object.
+    """
+    try:
+        obj.download_fileobj(fileobj, Config=transfer_config)
+        logger.info(
+            "Downloaded object '%s' from bucket '%s'.",
+            obj.key,
+            obj.bucket_name,
+        )
+    except ClientError:
+        logger.exception(
+            "Couldn't download object '%s' from bucket '%s'.",
+            obj.key,
+            obj.bucket_name,
+        )
+        raise
+
+
+def object_exists(obj) -> bool:
+    """
+    Checks whether the object exists with a HEAD request.
+    """
+    try:
+        obj.load()
+    except ClientError as err:
+        if err.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return False
+        logger.exception(
+            "Couldn't check object '%s' in bucket '%s'.",
+            obj.key,
+            obj.bucket_name,
+        )
+        raise
+    return True
+
+
 def get_object(obj):
     """
     Gets the object.
@@ -65,6 +162,32 @@ def get_object(obj):
         return body
 
 
+def get_object_range(obj, start: int, end: int):
+    """
+    Gets bytes start through end (inclusive) of the object.
+
+    :return: The data in bytes.
+    """
+    try:
+        body = obj.get(Range=f"bytes={start}-{end}")["Body"].read()
+        logger.info(
+            "Got bytes %d-%d of object '%s' from bucket '%s'.",
+            start,
+            end,
+            obj.key,
+            obj.bucket_name,
+        )
+    except ClientError:
+        logger.exception(
+            "Couldn't get object '%s' from bucket '%s'.",
+            obj.key,
+            obj.bucket_name,
+        )
+        raise
+    else:
+        return body
+
+
 def list_objects(bucket, prefix=None):
     """
     Lists the objects in a bucket, optionally filtered by a prefix.
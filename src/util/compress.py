@@ -1,7 +1,10 @@
 import os
+import tempfile
 import zipfile
+from contextlib import contextmanager
 from io import BytesIO
 from pathlib import Path
+from typing import BinaryIO, Iterator
 
 skip_dirs = {
     "secrets",
@@ -9,23 +12,66 @@ skip_dirs = {
     "logs",
 }
 
+# zlib compression level (0-9) used when packaging IaC. Generated Pulumi programs
+# are small text files, so the default trades a little ratio for speed.
+IAC_COMPRESSION_LEVEL = int(os.getenv("IAC_COMPRESSION_LEVEL", "6"))
+
+# Zips smaller than this stay in memory, larger ones are rolled over to disk.
+SPOOL_MAX_SIZE = int(os.getenv("IAC_SPOOL_MAX_SIZE", str(8 * 1024 * 1024)))
+
+
+def iter_files(output_dir: str | Path) -> Iterator[tuple[Path, str]]:
+    """Yields (path on disk, path relative to output_dir) for every file that belongs in
+    a packaged IaC bundle."""
+    for subdir, dirs, files in os.walk(output_dir):
+        # prune in place so os.walk doesn't descend into skipped dirs
+        dirs[:] = [d for d in dirs if d not in skip_dirs]
+        subdir = Path(subdir)
+        for file in files:
+            srcpath = subdir / file
+            yield srcpath, srcpath.relative_to(output_dir).as_posix()
+
+
+def write_zip(
+    fileobj: BinaryIO,
+    output_dir: str | Path,
+    compresslevel: int = IAC_COMPRESSION_LEVEL,
+):
+    """Writes every file under output_dir into fileobj as a zip archive.
+    Entries are streamed from disk in binary mode, so neither the file contents
+    nor the archive are ever held in memory as a whole."""
+    with zipfile.ZipFile(
+        fileobj,
+        mode="w",
+        compression=zipfile.ZIP_DEFLATED,
+        compresslevel=compresslevel,
+    ) as out_zip:
+        for srcpath, dstpath_in_zip in iter_files(output_dir):
+            out_zip.write(srcpath, dstpath_in_zip)
+
 
 def zip_directory_recurse(io: BytesIO, output_dir: str) -> bytes:
-    with zipfile.ZipFile(io, mode="w", compression=zipfile.ZIP_DEFLATED) as out_zip:
-        for subdir, dirs, files in os.walk(output_dir):
-            subdir = Path(subdir)
-            if subdir.name in skip_dirs:
-                continue
-            for file in files:
-                srcpath = subdir / file
-                dstpath_in_zip = srcpath.relative_to(output_dir)
-                out_zip.writestr(str(dstpath_in_zip), srcpath.read_text())
+    write_zip(io, output_dir)
     return io.getvalue()
 
 
-def write_zip_to_directory(zip_bytes, target_directory):
-    # Create a BytesIO object from the zip bytes
-    zip_io = BytesIO(zip_bytes)
+@contextmanager
+def spooled_zip(
+    output_dir: str | Path,
+    compresslevel: int = IAC_COMPRESSION_LEVEL,
+    max_size: int = SPOOL_MAX_SIZE,
+) -> Iterator[BinaryIO]:
+    """spooled_zip zips output_dir into a SpooledTemporaryFile and yields it rewound to
+    the start, ready to be streamed (eg, to S3). The file is removed on exit."""
+    with tempfile.SpooledTemporaryFile(max_size=max_size) as spool:
+        write_zip(spool, output_dir, compresslevel)
+        spool.seek(0)
+        yield spool
+
+
+def write_zip_to_directory(zip_bytes: bytes | BinaryIO, target_directory):
+    # Accept either the raw zip bytes or an already open (seekable) file object
+    zip_io = BytesIO(zip_bytes) if isinstance(zip_bytes, bytes) else zip_bytes
 
     # Create a ZipFile object from the BytesIO object
     with zipfile.ZipFile(zip_io, "r") as zip_file:
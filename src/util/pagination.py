@@ -0,0 +1,30 @@
+import base64
+import binascii
+import json
+from typing import Any, Optional
+
+
+class InvalidPageToken(ValueError):
+    pass
+
+
+def encode_page_token(state: Optional[dict[str, Any]]) -> Optional[str]:
+    """encode_page_token wraps a query's position (eg, DynamoDB last evaluated keys) in an
+    opaque, URL safe token. None (no more pages) encodes to None."""
+    if state is None:
+        return None
+    return base64.urlsafe_b64encode(
+        json.dumps(state, separators=(",", ":")).encode()
+    ).decode()
+
+
+def decode_page_token(token: Optional[str]) -> Optional[dict[str, Any]]:
+    if not token:
+        return None
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidPageToken(f"Invalid page token: {token}") from e
+    if not isinstance(state, dict):
+        raise InvalidPageToken(f"Invalid page token: {token}")
+    return state
@@ -1,11 +1,15 @@
 import datetime
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import aiounittest
+from fastapi import HTTPException
 from sse_starlette import EventSourceResponse
 
 from src.api.models.workflow_models import WorkflowRunSummary
 from src.api.workflow_router import (
+    get_app_workflow_runs,
+    get_job_progress,
+    get_project_workflow_runs,
     install,
     install_app,
     stream_deployment_logs,
@@ -52,10 +56,8 @@ class TestWorkflowRouter(PynamoTest, aiounittest.AsyncTestCase):
     @patch("src.api.workflow_router.get_email")
     @patch("src.api.workflow_router.get_user_id")
     @patch("src.api.workflow_router.BackgroundTasks")
-    @patch("src.api.workflow_router.uuid")
     async def test_install(
         self,
-        mock_uuid,
         mock_bg,
         mock_get_user_id,
         mock_get_email,
@@ -64,7 +66,6 @@ class TestWorkflowRouter(PynamoTest, aiounittest.AsyncTestCase):
         mock_create_deploy_workflow_jobs,
     ):
         # Setup mock objects
-        mock_uuid.uuid4.return_value = "deployment_id"
         mock_get_user_id.return_value = "project_id"
         mock_get_email.return_value = "users_email"
 
@@ -97,6 +98,7 @@ class TestWorkflowRouter(PynamoTest, aiounittest.AsyncTestCase):
         mock_create_deploy_workflow_jobs.assert_called_once_with(
             mock_wf_run_instance,
             list(self.project.apps.keys()),
+            deploy_strategy=None,
         )
         mock_from_workflow_run.assert_called_once_with(mock_wf_run_instance)
 
@@ -165,6 +167,7 @@ class TestWorkflowRouter(PynamoTest, aiounittest.AsyncTestCase):
         mock_create_deploy_workflow_jobs.assert_called_once_with(
             mock_wf_run_instance,
             ["app1"],
+            deploy_strategy=None,
         )
         mock_from_workflow_run.assert_called_once_with(mock_wf_run_instance)
 
@@ -355,3 +358,194 @@ class TestWorkflowRouter(PynamoTest, aiounittest.AsyncTestCase):
 
         # Assert response
         self.assertEqual(200, response.status_code)
+
+    @patch("src.api.workflow_router.WorkflowJob")
+    @patch("src.api.workflow_router.get_user_id")
+    @patch("src.api.workflow_router.DeploymentDir")
+    async def test_stream_deployment_logs_resume(
+        self, mock_deploy_dir_ctor, mock_get_user_id, mock_job
+    ):
+        mock_get_user_id.return_value = "user_id"
+        mock_deploy_log = mock_deploy_dir_ctor.return_value.get_log.return_value
+        mock_deploy_log.tail.return_value = MagicMock(offset=9)
+        mock_deploy_log.tail.return_value.__aiter__.return_value = ["line\n"]
+        mock_job.get.return_value = MagicMock(
+            modified_app_id=MagicMock(return_value="app_id")
+        )
+
+        with self.subTest("Plain text offset"):
+            await stream_deployment_logs(
+                MagicMock(),
+                run_number="1",
+                job_number=1,
+                workflow_type=WorkflowType.DEPLOY.value,
+                offset=42,
+            )
+            mock_deploy_log.tail.assert_called_once_with(42)
+
+        mock_deploy_log.tail.reset_mock()
+
+        with self.subTest("Event stream Last-Event-ID"):
+            request = MagicMock(
+                headers={"accept": "text/event-stream", "last-event-id": "4"},
+                is_disconnected=AsyncMock(return_value=False),
+            )
+            response: EventSourceResponse = await stream_deployment_logs(
+                request,
+                run_number="1",
+                job_number=1,
+                workflow_type=WorkflowType.DEPLOY.value,
+                offset=42,
+            )
+            events = [e async for e in response.body_iterator]
+
+            mock_deploy_log.tail.assert_called_once_with(4)
+            self.assertEqual(
+                [
+                    {"event": "log-line", "data": "line\n", "id": "9"},
+                    {"event": "done", "data": "done", "id": "9"},
+                ],
+                events,
+            )
+
+    @patch("src.api.workflow_router.WorkflowJob")
+    @patch("src.api.workflow_router.get_user_id")
+    @patch("src.api.workflow_router.DeploymentDir")
+    async def test_stream_deployment_logs_batches(
+        self, mock_deploy_dir_ctor, mock_get_user_id, mock_job
+    ):
+        mock_get_user_id.return_value = "user_id"
+        mock_deploy_log = mock_deploy_dir_ctor.return_value.get_log.return_value
+        mock_tail = MagicMock(offset=12)
+        mock_tail.batches.return_value.__aiter__.return_value = [["line1\n", "line2\n"]]
+        mock_deploy_log.tail.return_value = mock_tail
+        mock_job.get.return_value = MagicMock(
+            modified_app_id=MagicMock(return_value="app_id")
+        )
+        request = MagicMock(
+            headers={"accept": "text/event-stream"},
+            is_disconnected=AsyncMock(return_value=False),
+        )
+
+        response: EventSourceResponse = await stream_deployment_logs(
+            request,
+            run_number="1",
+            job_number=1,
+            workflow_type=WorkflowType.DEPLOY.value,
+            batch_ms=100,
+            batch_bytes=1024,
+        )
+        events = [e async for e in response.body_iterator]
+
+        mock_tail.batches.assert_called_once_with(0.1, 1024)
+        self.assertEqual(
+            [
+                {"event": "log-batch", "data": "line1\nline2\n", "id": "12"},
+                {"event": "done", "data": "done", "id": "12"},
+            ],
+            events,
+        )
+
+    @patch("src.api.workflow_router.ArchivedLogReader")
+    @patch("src.api.workflow_router.get_log_storage")
+    @patch("src.api.workflow_router.WorkflowJob")
+    @patch("src.api.workflow_router.get_user_id")
+    @patch("src.api.workflow_router.DeploymentDir")
+    async def test_stream_deployment_logs_archived(
+        self,
+        mock_deploy_dir_ctor,
+        mock_get_user_id,
+        mock_job,
+        mock_get_log_storage,
+        mock_reader_ctor,
+    ):
+        mock_get_user_id.return_value = "user_id"
+        mock_deploy_log = mock_deploy_dir_ctor.return_value.get_log.return_value
+        mock_deploy_log.path.exists.return_value = False
+        mock_deploy_log.dir = MagicMock(user_id="user_id", deploy_id="deploy_id")
+        mock_deploy_log.stack_id = "app_id"
+        mock_storage = mock_get_log_storage.return_value
+        mock_job.get.return_value = MagicMock(
+            modified_app_id=MagicMock(return_value="app_id")
+        )
+
+        response = await stream_deployment_logs(
+            MagicMock(headers={}),
+            run_number="1",
+            job_number=1,
+            workflow_type=WorkflowType.DEPLOY.value,
+            offset=7,
+        )
+
+        mock_storage.get_index.assert_called_once_with("user_id", "deploy_id", "app_id")
+        mock_reader_ctor.assert_called_once_with(
+            mock_storage, mock_deploy_log, mock_storage.get_index.return_value, 7
+        )
+        mock_deploy_log.tail.assert_not_called()
+        self.assertEqual(mock_reader_ctor.return_value, response.body_iterator)
+
+    @patch("src.api.workflow_router.WorkflowJob")
+    @patch("src.api.workflow_router.get_user_id")
+    async def test_get_job_progress(self, mock_get_user_id, mock_job):
+        mock_get_user_id.return_value = "user_id"
+        mock_job.get.return_value = MagicMock(
+            status="IN_PROGRESS",
+            progress={"operation": "up", "planned": 3, "created": 1},
+            composite_key=MagicMock(return_value="user_id#DEPLOY##00000001#1"),
+        )
+
+        view = await get_job_progress(
+            MagicMock(),
+            workflow_type=WorkflowType.DEPLOY.value,
+            run_number="1",
+            job_number=1,
+        )
+
+        mock_job.get.assert_called_once_with(
+            "user_id#DEPLOY##00000001",
+            1,
+            attributes_to_get=["partition_key", "job_number", "status", "progress"],
+        )
+        self.assertEqual("IN_PROGRESS", view.status.value)
+        self.assertEqual("up", view.progress.operation)
+        self.assertEqual(3, view.progress.planned)
+        self.assertEqual(1, view.progress.created)
+
+    @patch("src.api.pagination.WorkflowRun")
+    @patch("src.api.workflow_router.get_user_id")
+    async def test_get_app_workflow_runs(self, mock_get_user_id, mock_run):
+        mock_get_user_id.return_value = "user_id"
+        run = WorkflowRun(
+            project_id="user_id",
+            range_key="DEPLOY#app#00000001",
+            type="DEPLOY",
+            status="SUCCEEDED",
+            initiated_by="user_id",
+        )
+        mock_run.list_runs.return_value = ([run], "token2")
+
+        page = await get_app_workflow_runs(
+            MagicMock(), "app", "deploy", limit=10, next="token1"
+        )
+
+        mock_run.list_runs.assert_called_once_with(
+            "user_id", WorkflowType.DEPLOY, "app", 10, "token1"
+        )
+        self.assertEqual(["user_id#DEPLOY#app#00000001"], [r.id for r in page.runs])
+        self.assertEqual("token2", page.next)
+
+        with self.assertRaises(HTTPException):
+            await get_app_workflow_runs(MagicMock(), "app", "deploy", limit=1000)
+
+    @patch("src.api.pagination.WorkflowRun")
+    @patch("src.api.workflow_router.get_user_id")
+    async def test_list_workflow_runs_invalid_type(self, mock_get_user_id, mock_run):
+        mock_get_user_id.return_value = "user_id"
+
+        with self.assertRaises(HTTPException) as e:
+            await get_project_workflow_runs(MagicMock(), "bogus")
+        self.assertEqual(400, e.exception.status_code)
+        with self.assertRaises(HTTPException) as e:
+            await get_app_workflow_runs(MagicMock(), "app", "bogus")
+        self.assertEqual(400, e.exception.status_code)
+        mock_run.list_runs.assert_not_called()
@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import aiounittest
+
+from src.deployer.models.counter import Counter
+from src.deployer.models.workflow_job import WorkflowJob, WorkflowJobType
+from src.deployer.models.workflow_run import WorkflowRun, WorkflowType
+from tests.test_utils.pynamo_test import PynamoTest
+
+
+class TestCounter(PynamoTest, aiounittest.AsyncTestCase):
+    models = [Counter, WorkflowJob, WorkflowRun]
+
+    def test_next(self):
+        self.assertEqual([1, 2, 3], [Counter.next("a") for _ in range(3)])
+        self.assertEqual(1, Counter.next("b"))
+
+    def test_advance_to(self):
+        Counter.advance_to("a", 5)
+        Counter.advance_to("a", 3)
+        self.assertEqual(6, Counter.next("a"))
+
+    def test_create_runs(self):
+        with ThreadPoolExecutor(8) as pool:
+            runs = list(
+                pool.map(
+                    lambda _: WorkflowRun.create(
+                        "project", WorkflowType.DEPLOY, initiated_by="user"
+                    ),
+                    range(8),
+                )
+            )
+
+        self.assertEqual(list(range(1, 9)), sorted(r.run_number() for r in runs))
+        app_run = WorkflowRun.create(
+            "project", WorkflowType.DEPLOY, app_id="app", initiated_by="user"
+        )
+        self.assertEqual(1, app_run.run_number())
+
+    def test_create_run_after_unnumbered_runs(self):
+        # runs created before the counter existed
+        for run_number in [1, 2]:
+            WorkflowRun(
+                project_id="project",
+                range_key=WorkflowRun.compose_range_key("DESTROY", None, run_number),
+                type="DESTROY",
+                status="SUCCEEDED",
+                initiated_by="user",
+            ).save()
+
+        run = WorkflowRun.create("project", WorkflowType.DESTROY, initiated_by="user")
+
+        self.assertEqual(3, run.run_number())
+        self.assertEqual(
+            4,
+            WorkflowRun.create(
+                "project", WorkflowType.DESTROY, initiated_by="user"
+            ).run_number(),
+        )
+
+    def test_create_job(self):
+        jobs = [
+            WorkflowJob.create_job(
+                "project#DEPLOY##00000001", WorkflowJobType.DEPLOY, "app", 1, "user"
+            )
+            for _ in range(3)
+        ]
+
+        self.assertEqual([1, 2, 3], [j.job_number for j in jobs])
+        self.assertEqual(
+            [1, 2, 3],
+            [j.job_number for j in WorkflowJob.query("project#DEPLOY##00000001")],
+        )
+        # a run's job counter expires, unlike run counters
+        counter = Counter.get("job#project#DEPLOY##00000001")
+        self.assertGreater(counter.expires_at, datetime.now(timezone.utc))
+
+    def test_create_job_after_counter_expired(self):
+        WorkflowJob.create_job(
+            "project#DEPLOY##00000001", WorkflowJobType.DEPLOY, "app", 1, "user"
+        )
+        Counter("job#project#DEPLOY##00000001").delete()
+
+        job = WorkflowJob.create_job(
+            "project#DEPLOY##00000001", WorkflowJobType.DEPLOY, "app", 1, "user"
+        )
+
+        self.assertEqual(2, job.job_number)
+
+    def test_run_counter_does_not_expire(self):
+        WorkflowRun.create("project", WorkflowType.DEPLOY, initiated_by="user")
+        self.assertIsNone(Counter.get("run#project#DEPLOY#").expires_at)
@@ -1,11 +1,151 @@
+from unittest.mock import patch
+
 import aiounittest
 
-from src.deployer.models.workflow_job import WorkflowJob
-from src.deployer.models.workflow_run import WorkflowRun
-from src.project.models.app_deployment import AppDeployment
+from src.deployer.models.util import (
+    abort_workflow_run,
+    complete_workflow_run,
+    start_workflow_run,
+    transaction_connection,
+)
+from src.deployer.models.workflow_job import (
+    WorkflowJob,
+    WorkflowJobStatus,
+    WorkflowJobType,
+)
+from src.deployer.models.workflow_run import (
+    WorkflowRun,
+    WorkflowRunStatus,
+    WorkflowType,
+)
+from src.project.models.app_deployment import AppDeployment, AppLifecycleStatus
+from src.project.models.app_status import AppStatus
 from src.project.models.project import Project
-from tests.test_utils.pynamo_test import PynamoTest
+from tests.test_utils.pynamo_test import PynamoTest, count_requests
 
 
 class TestUtil(PynamoTest, aiounittest.AsyncTestCase):
-    models = [AppDeployment, Project, WorkflowJob, WorkflowRun]
+    models = [AppDeployment, AppStatus, Project, WorkflowJob, WorkflowRun]
+
+    def setUp(self):
+        super().setUp()
+        Project(
+            id="project",
+            owner="user",
+            created_by="user",
+            apps={},
+            destroy_in_progress=True,
+        ).save()
+        self.run = WorkflowRun(
+            project_id="project",
+            range_key=WorkflowRun.compose_range_key("DEPLOY", None, 1),
+            type=WorkflowType.DEPLOY.value,
+            status=WorkflowRunStatus.NEW.value,
+            initiated_by="user",
+        )
+        self.run.save()
+        self.jobs = []
+        for i, app_id in enumerate(["common"] + [f"app{i}" for i in range(10)]):
+            AppDeployment(
+                project_id="project",
+                range_key=AppDeployment.compose_range_key(app_id, 1),
+                created_by="user",
+                configuration={},
+                deployments=["earlier#1"] if i == 1 else None,
+            ).save()
+            job = WorkflowJob(
+                partition_key=self.run.job_id(),
+                job_number=i + 1,
+                job_type=WorkflowJobType.DEPLOY.value,
+                modified_app=WorkflowJob.compose_modified_app(app_id, 1),
+                status=WorkflowJobStatus.NEW.value,
+                status_reason="",
+                initiated_by="user",
+                title=f"Deploy {app_id}",
+            )
+            job.save()
+            self.jobs.append(job)
+
+    @patch("src.deployer.models.util.analytics")
+    def test_start_workflow_run(self, mock_analytics):
+        with count_requests(*self.models, transaction_connection()) as requests:
+            start_workflow_run(self.run)
+
+        self.assertEqual(1, requests["TransactWriteItems"])
+        self.assertEqual(0, requests["UpdateItem"])
+        self.assertEqual(WorkflowRunStatus.IN_PROGRESS.value, self.run.status)
+        run = WorkflowRun.get(self.run.project_id, self.run.range_key)
+        self.assertEqual(WorkflowRunStatus.IN_PROGRESS.value, run.status)
+        self.assertIsNotNone(run.initiated_at)
+        for job in WorkflowJob.query(self.run.job_id()):
+            self.assertEqual(WorkflowJobStatus.PENDING.value, job.status)
+            app = AppDeployment.get(
+                "project",
+                AppDeployment.compose_range_key(
+                    job.modified_app_id(), job.modified_app_version()
+                ),
+            )
+            self.assertEqual(job.composite_key(), app.deployments[-1])
+        app = AppDeployment.get("project", AppDeployment.compose_range_key("app0", 1))
+        self.assertEqual(["earlier#1", self.jobs[1].composite_key()], app.deployments)
+        for job in self.jobs:
+            app_status = AppStatus.get("project", job.modified_app_id())
+            self.assertEqual(AppLifecycleStatus.PENDING.value, app_status.status)
+            self.assertEqual(1, app_status.version)
+
+    @patch("src.deployer.models.util.analytics")
+    def test_start_workflow_run_missing_app(self, mock_analytics):
+        AppDeployment("project", AppDeployment.compose_range_key("app3", 1)).delete()
+
+        with self.assertRaises(Exception):
+            start_workflow_run(self.run)
+
+        run = WorkflowRun.get(self.run.project_id, self.run.range_key)
+        self.assertEqual(WorkflowRunStatus.CANCELED.value, run.status)
+        for job in WorkflowJob.query(self.run.job_id()):
+            self.assertEqual(WorkflowJobStatus.CANCELED.value, job.status)
+
+    def test_abort_workflow_run(self):
+        self.jobs[0].update(
+            actions=[WorkflowJob.status.set(WorkflowJobStatus.SUCCEEDED.value)]
+        )
+        self.jobs[1].update(
+            actions=[WorkflowJob.status.set(WorkflowJobStatus.FAILED.value)]
+        )
+
+        with count_requests(*self.models, transaction_connection()) as requests:
+            abort_workflow_run(self.run)
+
+        self.assertEqual(1, requests["TransactWriteItems"])
+        self.assertEqual(1, requests["UpdateItem"])
+        self.assertFalse(Project.get("project").destroy_in_progress)
+        run = WorkflowRun.get(self.run.project_id, self.run.range_key)
+        self.assertEqual(WorkflowRunStatus.FAILED.value, run.status)
+        self.assertEqual("Workflow run failed at job 2", run.status_reason)
+        self.assertEqual(
+            [WorkflowJobStatus.SUCCEEDED.value, WorkflowJobStatus.FAILED.value]
+            + [WorkflowJobStatus.CANCELED.value] * 9,
+            [job.status for job in WorkflowJob.query(self.run.job_id())],
+        )
+        self.assertEqual(
+            AppLifecycleStatus.NEW.value, AppStatus.get("project", "app1").status
+        )
+        self.assertRaises(AppStatus.DoesNotExist, AppStatus.get, "project", "common")
+
+    @patch("src.deployer.models.util.analytics")
+    def test_complete_workflow_run(self, mock_analytics):
+        for job in self.jobs:
+            job.update(
+                actions=[WorkflowJob.status.set(WorkflowJobStatus.SUCCEEDED.value)]
+            )
+        AppDeployment("project", AppDeployment.compose_range_key("app0", 1)).update(
+            actions=[AppDeployment.deployments.set([self.jobs[1].composite_key()])]
+        )
+
+        self.assertEqual(WorkflowRunStatus.SUCCEEDED, complete_workflow_run(self.run))
+        self.assertFalse(Project.get("project").destroy_in_progress)
+        # the job updates didn't refresh the app's status, completing the run does
+        self.assertEqual(
+            AppLifecycleStatus.INSTALLED.value,
+            AppStatus.get("project", "app0").status,
+        )
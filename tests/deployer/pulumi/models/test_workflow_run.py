@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta, timezone
+
+import aiounittest
+
+from src.deployer.models.workflow_run import WorkflowRun, WorkflowType
+from src.util.pagination import InvalidPageToken
+from tests.test_utils.pynamo_test import PynamoTest
+
+
+class TestWorkflowRun(PynamoTest, aiounittest.AsyncTestCase):
+    models = [WorkflowRun]
+
+    def setUp(self):
+        super().setUp()
+        t = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for minutes, workflow_type, app_id, run_number in [
+            (0, "DEPLOY", None, 1),
+            (1, "DEPLOY", "app", 1),
+            (2, "DESTROY", "app", 1),
+            (3, "DEPLOY", None, 2),
+            (4, "DEPLOY", "other", 1),
+        ]:
+            WorkflowRun(
+                project_id="project",
+                range_key=WorkflowRun.compose_range_key(
+                    workflow_type, app_id, run_number
+                ),
+                type=workflow_type,
+                status="SUCCEEDED",
+                initiated_by="user",
+                created_at=t + timedelta(minutes=minutes),
+            ).save()
+
+    def test_get_latest_run(self):
+        run = WorkflowRun.get_latest_run("project", WorkflowType.DEPLOY)
+        self.assertEqual("DEPLOY##00000002", run.range_key)
+
+        run = WorkflowRun.get_latest_run("project", WorkflowType.DEPLOY, "app")
+        self.assertEqual("DEPLOY#app#00000001", run.range_key)
+
+    def test_get_latest_run_any_type(self):
+        run = WorkflowRun.get_latest_run("project")
+        self.assertEqual("DEPLOY#other#00000001", run.range_key)
+
+        run = WorkflowRun.get_latest_run("project", app_id="app")
+        self.assertEqual("DESTROY#app#00000001", run.range_key)
+
+        self.assertIsNone(WorkflowRun.get_latest_run("missing"))
+        self.assertIsNone(WorkflowRun.get_latest_run("project", app_id="missing"))
+
+    def pages(self, **kwargs) -> list[list[str]]:
+        pages, token = [], None
+        while True:
+            runs, token = WorkflowRun.list_runs("project", page_token=token, **kwargs)
+            pages.append([r.range_key for r in runs])
+            if token is None:
+                return pages
+
+    def test_list_runs(self):
+        self.assertEqual(
+            [
+                ["DEPLOY#other#00000001", "DEPLOY##00000002"],
+                ["DESTROY#app#00000001", "DEPLOY#app#00000001"],
+                ["DEPLOY##00000001"],
+            ],
+            self.pages(limit=2),
+        )
+        self.assertEqual(
+            [["DESTROY#app#00000001"]],
+            self.pages(workflow_type=WorkflowType.DESTROY),
+        )
+
+        runs, _ = WorkflowRun.list_runs("project", limit=1)
+        self.assertIsNone(runs[0].status_reason)
+        self.assertEqual("SUCCEEDED", runs[0].status)
+
+    def test_list_app_runs(self):
+        WorkflowRun(
+            project_id="project",
+            range_key=WorkflowRun.compose_range_key("DEPLOY", "app", 2),
+            type="DEPLOY",
+            status="SUCCEEDED",
+            initiated_by="user",
+            created_at=datetime(2024, 1, 2, tzinfo=timezone.utc),
+        ).save()
+
+        self.assertEqual(
+            [
+                ["DEPLOY#app#00000002"],
+                ["DESTROY#app#00000001"],
+                ["DEPLOY#app#00000001"],
+            ],
+            self.pages(app_id="app", limit=1),
+        )
+        self.assertEqual(
+            [["DEPLOY#app#00000002", "DEPLOY#app#00000001"]],
+            self.pages(app_id="app", workflow_type=WorkflowType.DEPLOY),
+        )
+        self.assertEqual([[]], self.pages(app_id="missing"))
+
+    def test_list_runs_invalid_token(self):
+        with self.assertRaises(InvalidPageToken):
+            WorkflowRun.list_runs("project", page_token="not a token")
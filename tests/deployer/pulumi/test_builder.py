@@ -1,5 +1,6 @@
+import json
 import subprocess
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, call, patch
 
 import aiounittest
 
@@ -45,19 +46,46 @@ class TestAppBuilder(aiounittest.AsyncTestCase):
         # Call the method
         builder = AppBuilder(MagicMock(), "test_bucket")
         builder.configure_aws(
-            mock_stack, role_arn="arn", region="region", external_id="external_id"
+            mock_stack,
+            role_arn="arn",
+            region="region",
+            external_id="external_id",
+            config={"app:secret": "value"},
         )
 
-        # Assert calls
-        self.assertEqual(len(mock_stack.mock_calls), 3)
-        self.assertEqual(mock_stack.set_config.call_count, 3)
-        mock_stack.set_config.assert_any_call("aws:region", "region")
+        # Assert a single batched call
+        mock_stack.set_config.assert_not_called()
+        mock_stack.set_all_config.assert_called_once_with(
+            {
+                "aws:region": "region",
+                "aws:assumeRole.roleArn": "arn",
+                "aws:assumeRole.externalId": "external_id",
+                "app:secret": "value",
+            },
+            path=True,
+        )
+
+    @patch("src.deployer.pulumi.builder.auto.ConfigValue")
+    def test_configure_aws_non_path_keys(self, mock_config_value):
+        mock_config_value.side_effect = lambda x: x
+        mock_stack = MagicMock()
 
-        mock_stack.set_config.assert_any_call(
-            "aws:assumeRole.roleArn", "arn", path=True
+        builder = AppBuilder(MagicMock(), "test_bucket")
+        builder.configure_aws(
+            mock_stack,
+            role_arn="arn",
+            region="region",
+            config={"app:db.password": "value"},
         )
-        mock_stack.set_config.assert_any_call(
-            "aws:assumeRole.externalId", "external_id", path=True
+
+        mock_stack.set_all_config.assert_has_calls(
+            [
+                call({"app:db.password": "value"}),
+                call(
+                    {"aws:region": "region", "aws:assumeRole.roleArn": "arn"},
+                    path=True,
+                ),
+            ]
         )
 
     @patch("src.deployer.pulumi.builder.auto.create_or_select_stack")
@@ -70,18 +98,21 @@ class TestAppBuilder(aiounittest.AsyncTestCase):
             modified_app_id=MagicMock(return_value="app_id"),
         )
         # Call the method
-        with TempDir() as tmp_dir:
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.builder.PULUMI_HOME", tmp_dir / "pulumi_home"
+        ):
             builder = AppBuilder(tmp_dir, "test_bucket")
             stack = builder.create_pulumi_stack(mock_job)
+            self.assertTrue((tmp_dir / "pulumi_home").is_dir())
 
         # Assert call
         mock_create_or_select_stack.assert_called_once()
+        opts = mock_create_or_select_stack.call_args.kwargs["opts"]
         self.assertEqual(
-            mock_create_or_select_stack.call_args.kwargs[
-                "opts"
-            ].project_settings.backend.url,
+            opts.project_settings.backend.url,
             f"s3://{builder.state_bucket_name}",
         )
+        self.assertEqual(opts.pulumi_home, str(tmp_dir / "pulumi_home"))
 
         # Assert return value
         self.assertEqual(stack, mock_stack)
@@ -96,13 +127,18 @@ class TestAppBuilder(aiounittest.AsyncTestCase):
             modified_app_id=MagicMock(return_value="app_id"),
         )
         # Call the method
-        with TempDir() as tmp_dir:
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.builder.PULUMI_HOME", None
+        ):
             builder = AppBuilder(tmp_dir, None)
             stack = builder.create_pulumi_stack(mock_job)
 
         # Assert call
         mock_create_or_select_stack.assert_called_once()
-        self.assertIsNone(mock_create_or_select_stack.call_args.kwargs["opts"])
+        opts = mock_create_or_select_stack.call_args.kwargs["opts"]
+        self.assertIsNone(opts.project_settings)
+        # unset, pulumi uses its default home
+        self.assertIsNone(opts.pulumi_home)
 
         # Assert return value
         self.assertEqual(stack, mock_stack)
@@ -127,3 +163,86 @@ class TestAppBuilder(aiounittest.AsyncTestCase):
             stderr=subprocess.DEVNULL,
         )
         mock_result.check_returncode.assert_called_once()
+
+    @patch("src.deployer.pulumi.builder.subprocess.run")
+    def test_install_npm_deps_cache_fallback(self, mock_run):
+        mock_job = MagicMock(
+            spec=WorkflowJob,
+            modified_app_id=MagicMock(return_value="app_id"),
+        )
+        npm_cache = MagicMock(install=MagicMock(side_effect=OSError("cache error")))
+        with TempDir() as tmp_dir:
+            builder = AppBuilder(tmp_dir, None, npm_cache)
+            builder.install_npm_deps(mock_job)
+
+        npm_cache.install.assert_called_once_with(tmp_dir, AppBuilder.npm_install)
+        mock_run.assert_called_once_with(
+            ["npm", "install", "--prefix", tmp_dir],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    @patch("src.deployer.pulumi.builder.auto.create_or_select_stack")
+    def test_create_pulumi_stack_file_backend(self, mock_create_or_select_stack):
+        mock_job = MagicMock(
+            spec=WorkflowJob,
+            modified_app_id=MagicMock(return_value="app_id"),
+        )
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.builder.PULUMI_HOME", tmp_dir / "pulumi_home"
+        ), patch(
+            "src.deployer.pulumi.builder.PULUMI_BACKEND_URL",
+            f"file://{tmp_dir / 'state'}",
+        ):
+            builder = AppBuilder(tmp_dir, "test_bucket")
+            builder.create_pulumi_stack(mock_job)
+            self.assertTrue((tmp_dir / "state").is_dir())
+
+        opts = mock_create_or_select_stack.call_args.kwargs["opts"]
+        self.assertEqual(
+            opts.project_settings.backend.url, f"file://{tmp_dir / 'state'}"
+        )
+
+    def test_use_standin_program(self):
+        with TempDir() as tmp_dir:
+            (tmp_dir / "index.ts").write_text("generated program")
+            (tmp_dir / "resources.yaml").write_text(
+                "resources:\n"
+                "  aws:ecs_service:svc:\n"
+                "    DesiredCount: 1\n"
+                "  aws:ecs_cluster:cluster:\n"
+                "edges:\n"
+                "  aws:ecs_service:svc -> aws:ecs_cluster:cluster:\n"
+            )
+            builder = AppBuilder(tmp_dir, None)
+            builder.use_standin_program()
+
+            self.assertIn("dynamic", (tmp_dir / "index.ts").read_text())
+            self.assertTrue((tmp_dir / "package.json").exists())
+            self.assertEqual(
+                json.loads((tmp_dir / "standin.json").read_text()),
+                {
+                    "resources": {
+                        "aws:ecs_service:svc": {"DesiredCount": 1},
+                        "aws:ecs_cluster:cluster": None,
+                    },
+                    "edges": [["aws:ecs_service:svc", "aws:ecs_cluster:cluster"]],
+                },
+            )
+
+    @patch("src.deployer.pulumi.builder.auto.select_stack")
+    def test_select_stack(self, mock_select_stack):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.builder.PULUMI_HOME", tmp_dir / "pulumi_home"
+        ):
+            builder = AppBuilder(tmp_dir, "test_bucket")
+            stack = builder.select_stack("project", "app")
+
+        self.assertEqual(stack, mock_select_stack.return_value)
+        kwargs = mock_select_stack.call_args.kwargs
+        self.assertEqual(kwargs["stack_name"], "app")
+        self.assertEqual(kwargs["project_name"], "project")
+        self.assertEqual(
+            kwargs["opts"].project_settings.backend.url, "s3://test_bucket"
+        )
+        self.assertEqual(kwargs["opts"].pulumi_home, str(tmp_dir / "pulumi_home"))
@@ -1,14 +1,22 @@
-from asyncio import QueueEmpty
-from unittest.mock import MagicMock, call, patch
+import asyncio
+import os
+import time
+from unittest.mock import MagicMock, patch
 
 import aiounittest
 
 from src.deployer.pulumi.deploy_logs import (
     LOG_DIR,
+    ArchivedLogReader,
     DeployLog,
     DeployLogHandler,
     DeploymentDir,
+    LogChannel,
+    LogTailer,
+    evict_logs,
 )
+from src.project.storage.log_storage import LogChunk, LogIndex
+from src.util.tmp import TempDir
 
 
 class TestDeployLogs(aiounittest.AsyncTestCase):
@@ -38,99 +46,379 @@ class TestDeployLogs(aiounittest.AsyncTestCase):
         latest.unlink.assert_called_once()
         latest.symlink_to.assert_called_once_with("deploy_id")
 
-    @patch("builtins.open", create=True)
-    def test_on_output(self, mock_open):
-        dir = MagicMock()
-        path = MagicMock()
-        dir.log_path.return_value = path
-
-        file = mock_open.return_value.__enter__.return_value
-
-        log = DeployLog(dir, "stack_id")
-
-        dir.log_path.assert_called_once_with("stack_id")
-
-        with log.on_output() as on_output:
-            on_output("message")
+    def test_on_output(self):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ), patch("src.deployer.pulumi.deploy_logs.FLUSH_INTERVAL", 60):
+            log = DeploymentDir("user_id", "deploy_id").get_log("stack_id")
+
+            with log.on_output() as on_output:
+                on_output("message")
+                on_output("buffered")
+                # buffered until the flush interval or the end of the output
+                self.assertEqual(log.path.read_text(), "")
+
+                LogChannel.get(log.path).flush()
+                self.assertEqual(log.path.read_text(), "message\nbuffered\n")
+
+            self.assertEqual(log.path.read_text(), "message\nbuffered\nEND\n")
+            self.assertTrue((tmp_dir / "user_id" / "latest").is_symlink())
+            self.assertIsNone(LogChannel.get(log.path))
+
+    def test_on_output_flush_interval(self):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ), patch("src.deployer.pulumi.deploy_logs.FLUSH_INTERVAL", 0.01):
+            log = DeploymentDir("user_id", "deploy_id").get_log("stack_id")
+
+            with log.on_output() as on_output:
+                on_output("message")
+                for _ in range(100):
+                    if log.path.read_text():
+                        break
+                    time.sleep(0.01)
+                self.assertEqual(log.path.read_text(), "message\n")
+                self.assertIsNone(LogChannel.get(log.path)._flush_timer)
+
+    async def test_on_output_error(self):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ), patch("src.deployer.pulumi.deploy_logs.FLUSH_INTERVAL", 60):
+            log = DeploymentDir("user_id", "deploy_id").get_log("stack_id")
+
+            with self.assertRaises(ValueError):
+                with log.on_output(end=False) as on_output:
+                    on_output("line1")
+                    handler = log.tail()
+                    self.assertEqual("line1\n", await handler.__anext__())
+                    channel = handler.tailer.channel
+                    on_output("line2")
+                    raise ValueError()
+
+            # the channel is removed, and its reader goes back to the file
+            self.assertIsNone(LogChannel.get(log.path))
+            self.assertIsNone(channel._flush_timer)
+            self.assertEqual([], channel.subscribers)
+            self.assertEqual("line2\n", await handler.__anext__())
+            self.assertIsNone(handler.tailer.channel)
+            self.assertIsNotNone(handler.tailer.watch)
 
-        path.parent.mkdir.assert_called_once_with(parents=True, exist_ok=True)
-        mock_open.has_calls([path, "a"], [path, "a"])
-        dir.update_latest.assert_called_once()
+            log.write("line3\n")
+            handler.tailer.read()
+            self.assertEqual("line3\n", await handler.__anext__())
+            handler.close()
+
+    def test_write_outside_on_output(self):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ):
+            log = DeploymentDir("user_id", "deploy_id").get_log("stack_id")
+            log.write("message\n")
+            with log.on_output(end=False) as on_output:
+                on_output("output")
+            log.write("more\n")
+            log.end()
+
+            self.assertEqual(log.path.read_text(), "message\noutput\nmore\nEND\n")
+
+    async def test_tail_subscribes_to_channel(self):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ), patch("src.deployer.pulumi.deploy_logs.FLUSH_INTERVAL", 60):
+            log = DeploymentDir("user_id", "deploy_id").get_log("stack_id")
+            handler = log.tail()
+
+            with log.on_output() as on_output:
+                on_output("line1")
+                # flushed on subscribe, then read from the file
+                self.assertEqual("line1\n", await handler.__anext__())
+                self.assertIsNotNone(handler.tailer.channel)
+                self.assertIsNone(handler.tailer.watch)
+
+                on_output("line2")
+                self.assertEqual("line2\n", await handler.__anext__())
 
-        file.write.assert_has_calls(
-            [
-                call("message\n"),
-                call("END\n"),
-            ]
-        )
+            with self.assertRaises(StopAsyncIteration):
+                await handler.__anext__()
+            self.assertTrue(handler.complete)
+            self.assertFalse(handler.interrupted)
+            self.assertIsNone(handler.tailer)
+            self.assertEqual([], LogChannel.get(log.path) or [])
 
-    @patch("src.deployer.pulumi.deploy_logs.open")
     @patch("src.deployer.pulumi.deploy_logs.asyncio.sleep")
-    @patch("src.deployer.pulumi.deploy_logs.DeployLogHandler.OBSERVER")
-    @patch("src.deployer.pulumi.deploy_logs.asyncio.wait_for")
-    async def test_log_tail(self, mock_wait_for, observer, _mock_sleep, mock_open):
+    @patch("src.deployer.pulumi.deploy_logs.LogTailer.OBSERVER")
+    async def test_log_tail(self, observer, mock_sleep):
         observer.is_alive.return_value = False
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ):
+            log = DeploymentDir("user_id", "deploy_id").get_log("stack_id")
+            handler = log.tail()
+            self.assertEqual(handler, handler.__aiter__())
+
+            with self.subTest("File doesn't exist"):
+                with self.assertRaises(StopAsyncIteration):
+                    await handler.__anext__()
+                self.assertEqual(120, mock_sleep.call_count)
+                self.assertEqual({}, LogTailer._tailers)
+
+            handler = DeployLogHandler(log)
+            log.write("line1\nline2\n")
+
+            with self.subTest("File exists with 2 lines"):
+                self.assertEqual("line1\n", await handler.__anext__())
+                self.assertEqual("line2\n", await handler.__anext__())
+                self.assertFalse(handler.complete)
+                observer.schedule.assert_called_once_with(
+                    handler.tailer, str(log.path.parent), recursive=False
+                )
+                observer.start.assert_called_once()
+
+            with self.subTest("File modified"):
+                log.write("line3\n")
+                handler.tailer.on_modified(None)
+                self.assertEqual("line3\n", await handler.__anext__())
+
+            with self.subTest("File complete"):
+                log.end()
+                handler.tailer.on_modified(None)
+                with self.assertRaises(StopAsyncIteration):
+                    await handler.__anext__()
+                self.assertTrue(handler.complete)
+                self.assertFalse(handler.interrupted)
+                observer.unschedule.assert_called_once()
+                self.assertEqual({}, LogTailer._tailers)
+
+    async def test_tail_offsets(self):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ):
+            log = DeploymentDir("user_id", "deploy_id").get_log("stack_id")
+            log.write("line1\nlïne2\n")
+            log.end()
+
+            with self.subTest("From the start"):
+                handler = DeployLogHandler(log)
+                self.assertEqual("line1\n", await handler.__anext__())
+                self.assertEqual(6, handler.offset)
+                self.assertEqual("lïne2\n", await handler.__anext__())
+                self.assertEqual(13, handler.offset)
+                with self.assertRaises(StopAsyncIteration):
+                    await handler.__anext__()
+
+            with self.subTest("Resumed"):
+                handler = DeployLogHandler(log, offset=6)
+                self.assertEqual("lïne2\n", await handler.__anext__())
+                self.assertEqual(13, handler.offset)
+                with self.assertRaises(StopAsyncIteration):
+                    await handler.__anext__()
+
+    @patch("src.deployer.pulumi.deploy_logs.LogTailer.OBSERVER")
+    async def test_tail_partial_line(self, _observer):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ):
+            log = DeploymentDir("user_id", "deploy_id").get_log("stack_id")
+            log.write("line1\nli")
+            handler = DeployLogHandler(log)
+            self.assertEqual("line1\n", await handler.__anext__())
+            self.assertEqual(6, handler.tailer.offset)
 
-        def start():
-            observer.is_alive.return_value = True
-
-        observer.start.side_effect = start
-
-        log = MagicMock()
-        handler = DeployLogHandler(log)
-
-        # Replace the queue's get so that it doesn't wait indefinitely
-        async def get_message():
-            return handler.messages.get_nowait()
-
-        handler.messages.get = get_message
-
-        # Convert the QueueEmpty from get_nowait to a TimeoutError
-        async def wait_for(x, timeout):
-            try:
-                return await x
-            except QueueEmpty:
-                raise TimeoutError()
-
-        mock_wait_for.side_effect = wait_for
-
-        file = MagicMock()
-        mock_open.return_value = file
-
-        self.assertEqual(handler, handler.__aiter__())
-
-        log.path.exists.return_value = False
-
-        with self.subTest("File doesn't exist"):
+            log.write("ne2\n")
+            handler.tailer.read()
+            self.assertEqual("line2\n", await handler.__anext__())
+            self.assertEqual(12, handler.offset)
+            handler.close()
+
+    async def test_tailer_shared(self):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ):
+            deploy_dir = DeploymentDir("user_id", "deploy_id")
+            with deploy_dir.get_log("stack_id").on_output() as on_output:
+                on_output("line1")
+                handlers = [deploy_dir.get_log("stack_id").tail() for _ in range(3)]
+                for handler in handlers:
+                    self.assertEqual("line1\n", await handler.__anext__())
+                tailer = handlers[0].tailer
+                self.assertTrue(all(h.tailer is tailer for h in handlers))
+                self.assertEqual(1, len(LogChannel.get(tailer.path).subscribers))
+
+                handlers[0].close()
+                self.assertEqual(2, len(tailer.handlers))
+
+                on_output("line2")
+                for handler in handlers[1:]:
+                    self.assertEqual("line2\n", await handler.__anext__())
+
+                for handler in handlers[1:]:
+                    handler.close()
+                self.assertEqual({}, LogTailer._tailers)
+                self.assertEqual([], LogChannel.get(tailer.path).subscribers)
+
+    async def test_slow_handler_catches_up(self):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ), patch.object(DeployLogHandler, "QUEUE_SIZE", 2):
+            log = DeploymentDir("user_id", "deploy_id").get_log("stack_id")
+            with log.on_output() as on_output:
+                fast = log.tail()
+                slow = DeployLogHandler(log)
+                on_output("line0")
+                self.assertEqual("line0\n", await fast.__anext__())
+                self.assertEqual("line0\n", await slow.__anext__())
+
+                for i in range(1, 6):
+                    on_output(f"line{i}")
+                    # let the channel's callback run
+                    await asyncio.sleep(0)
+                    self.assertEqual(f"line{i}\n", await fast.__anext__())
+
+                self.assertTrue(slow.lagging)
+                self.assertEqual(2, slow.messages.qsize())
+
+            lines = [line async for line in slow]
+            self.assertEqual([f"line{i}\n" for i in range(1, 6)], lines)
+            self.assertEqual(fast.offset, slow.offset)
+            fast.close()
+
+    async def test_tail_channel_offset(self):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ):
+            log = DeploymentDir("user_id", "deploy_id").get_log("stack_id")
+            with log.on_output() as on_output:
+                on_output("line1")
+                on_output("line2")
+                handler = log.tail(offset=6)
+                self.assertEqual("line2\n", await handler.__anext__())
+                on_output("line3")
+                self.assertEqual("line3\n", await handler.__anext__())
+                self.assertEqual(18, handler.offset)
             with self.assertRaises(StopAsyncIteration):
                 await handler.__anext__()
 
-            mock_open.assert_not_called()
-
-        log.path.exists.return_value = True
-
-        with self.subTest("File exists with 2 lines"):
-            file.readlines.return_value = ["line1\n", "line2\n"]
-            handler._read_lines()
-            file.readlines.assert_called_once()
-            file.readlines.return_value = []
+    @patch("src.deployer.pulumi.deploy_logs.LogTailer.OBSERVER")
+    async def test_batches(self, _observer):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ):
+            log = DeploymentDir("user_id", "deploy_id").get_log("stack_id")
+            log.write("".join(f"line{i}\n" for i in range(5)))
+            log.end()
+
+            handler = DeployLogHandler(log)
+            batches = []
+            async for batch in handler.batches(0, 12):
+                batches.append((batch, handler.offset))
+
+            self.assertEqual(
+                [
+                    (["line0\n", "line1\n"], 12),
+                    (["line2\n", "line3\n"], 24),
+                    (["line4\n"], 30),
+                ],
+                batches,
+            )
 
-            self.assertEqual("line1\n", await handler.__anext__())
-            self.assertEqual("line2\n", await handler.__anext__())
-            self.assertEqual(False, handler.complete)
-            observer.schedule.assert_called_once()
-            observer.start.assert_called_once()
+    @patch("src.deployer.pulumi.deploy_logs.LogTailer.OBSERVER")
+    async def test_batches_invalid_utf8(self, _observer):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ):
+            log = DeploymentDir("user_id", "deploy_id").get_log("stack_id")
+            log.path.parent.mkdir(parents=True)
+            log.path.write_bytes(b"li\xffe0\nline1\nline2\n")
+            log.end()
+
+            handler = DeployLogHandler(log)
+            batches = []
+            async for batch in handler.batches(0, 13):
+                batches.append((batch, handler.offset))
+
+            # the first line is 6 bytes in the file, though it decodes to 7 characters
+            self.assertEqual(
+                [(["li\ufffde0\n", "line1\n", "line2\n"], 18)],
+                batches,
+            )
 
-            with self.assertRaises(TimeoutError):
-                await handler.__anext__()
-            handler.interrupted = (
-                False  # reset interrupted status which was flagged on the TimeoutError
+    async def test_archived_log_reader(self):
+        chunks = [b"line0\nline1\n", b"line2\nEND\n"]
+        index = LogIndex(
+            size=22,
+            lines=4,
+            chunks=[
+                LogChunk(offset=0, line=0, start=0, length=10),
+                LogChunk(offset=12, line=2, start=10, length=10),
+            ],
+        )
+        storage = MagicMock(
+            read_chunk=MagicMock(side_effect=lambda p, d, s, c: chunks[c.line // 2])
+        )
+        log = DeploymentDir("user_id", "deploy_id").get_log("stack_id")
+
+        with self.subTest("From the start"):
+            reader = ArchivedLogReader(storage, log, index)
+            lines = []
+            async for line in reader:
+                lines.append((line, reader.offset))
+            self.assertEqual([("line0\n", 6), ("line1\n", 12), ("line2\n", 18)], lines)
+
+        storage.read_chunk.reset_mock()
+
+        with self.subTest("Resumed in the last chunk"):
+            reader = ArchivedLogReader(storage, log, index, offset=12)
+            self.assertEqual(["line2\n"], [line async for line in reader])
+            storage.read_chunk.assert_called_once_with(
+                "user_id", "deploy_id", "stack_id", index.chunks[1]
             )
 
-        with self.subTest("Message queue appended after open"):
-            handler.messages.put_nowait("line3\n")
-            handler.complete = True
+        with self.subTest("Batches"):
+            reader = ArchivedLogReader(storage, log, index, offset=6)
+            self.assertEqual(
+                [["line1\n"], ["line2\n"]],
+                [batch async for batch in reader.batches(1, 1024)],
+            )
 
-            self.assertEqual("line3\n", await handler.__anext__())
-            with self.assertRaises(StopAsyncIteration):
-                await handler.__anext__()
+    def test_evict_logs(self):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ), patch("src.deployer.pulumi.deploy_logs.LOG_MAX_AGE_HOURS", 1), patch(
+            "src.deployer.pulumi.deploy_logs.LOG_MAX_BYTES", 10
+        ):
+            logs = {}
+            for i, (name, age) in enumerate(
+                [("old", 7200), ("large", 60), ("new", 0), ("unarchived", 7200)]
+            ):
+                log = DeploymentDir("user_id", name).get_log("stack_id")
+                log.write("x" * 8 + "\n")
+                if name != "unarchived":
+                    log.archived_marker().touch()
+                mtime = time.time() - age
+                os.utime(log.path, (mtime, mtime))
+                logs[name] = log
+
+            evict_logs()
+
+            # old is past the max age, large is evicted to bring the total under the max
+            self.assertFalse(logs["old"].path.exists())
+            self.assertFalse(logs["old"].dir.deploy_root.exists())
+            self.assertFalse(logs["large"].path.exists())
+            self.assertTrue(logs["new"].path.exists())
+            self.assertTrue(logs["unarchived"].path.exists())
+
+    def test_update_latest_unchanged(self):
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ):
+            deploy_dir = DeploymentDir("user_id", "deploy_id")
+            deploy_dir.update_latest()
+            latest = deploy_dir.user_root / "latest"
+            inode = latest.lstat().st_ino
+
+            deploy_dir.update_latest()
+            self.assertEqual(inode, latest.lstat().st_ino)
+
+            # a link to an evicted deployment is replaced
+            DeploymentDir("user_id", "other").update_latest()
+            self.assertEqual("other", str(latest.readlink()))
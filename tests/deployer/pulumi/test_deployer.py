@@ -3,7 +3,7 @@ from unittest.mock import MagicMock, patch
 import aiounittest
 
 from src.deployer.models.workflow_job import WorkflowJobStatus
-from src.deployer.pulumi.deployer import AppDeployer
+from src.deployer.pulumi.deployer import AppDeployer, DeployStrategy
 
 
 class TestAppDeployer(aiounittest.AsyncTestCase):
@@ -33,6 +33,119 @@ class TestAppDeployer(aiounittest.AsyncTestCase):
         # Assert return value
         self.assertEqual(result_status, WorkflowJobStatus.SUCCEEDED)
         self.assertEqual(reason, "Deployment succeeded.")
+        self.assertEqual(
+            set(deployer.phase_timings.keys()), {"refresh", "preview", "up"}
+        )
+
+    async def test_deploy_fast(self):
+        mock_stack = MagicMock()
+        mock_stack.name = "stack_name"
+        mock_deploy_dir = MagicMock()
+
+        deployer = AppDeployer(mock_stack, mock_deploy_dir)
+        result_status, reason = deployer.deploy(DeployStrategy.FAST)
+
+        mock_stack.refresh.assert_not_called()
+        mock_stack.preview.assert_not_called()
+        mock_stack.up.assert_called_once()
+        self.assertEqual(result_status, WorkflowJobStatus.SUCCEEDED)
+        self.assertEqual(set(deployer.phase_timings.keys()), {"up"})
+
+    async def test_deploy_parallel(self):
+        mock_stack = MagicMock()
+        mock_stack.name = "stack_name"
+        mock_deploy_dir = MagicMock()
+
+        deployer = AppDeployer(mock_stack, mock_deploy_dir, parallel=32)
+        deployer.deploy(DeployStrategy.SAFE, ["urn"])
+
+        self.assertEqual(mock_stack.refresh.call_args.kwargs["parallel"], 32)
+        self.assertEqual(mock_stack.preview.call_args.kwargs["parallel"], 32)
+        self.assertEqual(mock_stack.up.call_args.kwargs["parallel"], 32)
+        self.assertEqual(mock_stack.up.call_args.kwargs["target"], ["urn"])
+        self.assertTrue(mock_stack.up.call_args.kwargs["target_dependents"])
+
+    async def test_deploy_progress(self):
+        mock_stack = MagicMock()
+        mock_stack.name = "stack_name"
+        mock_progress = MagicMock()
+
+        deployer = AppDeployer(mock_stack, MagicMock(), progress=mock_progress)
+        deployer.deploy(DeployStrategy.SAFE)
+
+        for op in [mock_stack.refresh, mock_stack.preview, mock_stack.up]:
+            self.assertEqual(op.call_args.kwargs["on_event"], mock_progress.on_event)
+        self.assertEqual(
+            [c.args[0] for c in mock_progress.start.call_args_list],
+            ["refresh", "preview", "up"],
+        )
+        mock_progress.finish.assert_called_once()
+
+    async def test_deploy_preview_only(self):
+        mock_stack = MagicMock()
+        mock_stack.name = "stack_name"
+        mock_deploy_dir = MagicMock()
+
+        deployer = AppDeployer(mock_stack, mock_deploy_dir)
+        result_status, reason = deployer.deploy(DeployStrategy.PREVIEW_ONLY)
+
+        # a refresh would write a new checkpoint
+        mock_stack.refresh.assert_not_called()
+        mock_stack.preview.assert_called_once()
+        mock_stack.up.assert_not_called()
+        self.assertEqual(result_status, WorkflowJobStatus.SKIPPED)
+        self.assertEqual(reason, "Preview succeeded.")
+
+    async def test_deploy_up_error_refreshes(self):
+        mock_stack = MagicMock()
+        mock_stack.name = "stack_name"
+        mock_stack.up.side_effect = Exception("up error")
+        mock_deploy_dir = MagicMock()
+
+        deployer = AppDeployer(mock_stack, mock_deploy_dir)
+        result_status, reason = deployer.deploy(DeployStrategy.FAST)
+
+        mock_stack.refresh.assert_called_once()
+        self.assertEqual(result_status, WorkflowJobStatus.FAILED)
+        self.assertEqual(reason, "up error")
+        self.assertIn("failure_refresh", deployer.phase_timings)
+
+    async def test_refresh_unchanged(self):
+        mock_stack = MagicMock()
+        mock_stack.name = "stack_name"
+        mock_stack.refresh.return_value.summary.resource_changes = {"same": 3}
+        mock_deploy_dir = MagicMock()
+        mock_deploy_log = mock_deploy_dir.get_log.return_value
+
+        deployer = AppDeployer(mock_stack, mock_deploy_dir)
+
+        self.assertTrue(deployer.refresh_unchanged())
+        mock_stack.refresh.assert_called_once()
+        self.assertTrue(mock_stack.refresh.call_args.kwargs["expect_no_changes"])
+        mock_deploy_log.on_output.assert_called_once_with(end=False)
+        mock_deploy_log.end.assert_called_once()
+
+    async def test_refresh_unchanged_drift(self):
+        mock_stack = MagicMock()
+        mock_stack.name = "stack_name"
+        mock_stack.refresh.side_effect = Exception("drift")
+        mock_deploy_dir = MagicMock()
+        mock_deploy_log = mock_deploy_dir.get_log.return_value
+
+        deployer = AppDeployer(mock_stack, mock_deploy_dir)
+
+        self.assertFalse(deployer.refresh_unchanged())
+        mock_deploy_log.end.assert_not_called()
+
+    async def test_refresh_unchanged_empty_stack(self):
+        mock_stack = MagicMock()
+        mock_stack.name = "stack_name"
+        mock_stack.refresh.return_value.summary.resource_changes = {}
+        mock_deploy_dir = MagicMock()
+
+        deployer = AppDeployer(mock_stack, mock_deploy_dir)
+
+        self.assertFalse(deployer.refresh_unchanged())
 
     @patch("src.deployer.pulumi.deployer.auto.UpResult")
     async def test_deploy_error(self, mock_up_result):
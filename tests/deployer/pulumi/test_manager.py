@@ -33,3 +33,11 @@ class TestAppManager(aiounittest.AsyncTestCase):
         )
         mock_parse_yaml_raw_as.assert_called_once_with(LiveState, "mock_resources_yaml")
         self.assertEqual(result, "mock_live_state")
+
+    async def test_checkpoint_version(self):
+        mock_stack = MagicMock()
+        mock_stack.info.return_value.version = 7
+        self.assertEqual(AppManager(mock_stack).checkpoint_version(), 7)
+
+        mock_stack.info.return_value = None
+        self.assertIsNone(AppManager(mock_stack).checkpoint_version())
@@ -0,0 +1,100 @@
+import os
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import aiounittest
+
+from src.deployer.pulumi.npm_cache import MaterializeMode, NodeModulesCache
+from src.util.tmp import TempDir
+
+
+def fake_npm_install(prefix: Path):
+    (Path(prefix) / "node_modules" / "@pulumi" / "pulumi").mkdir(parents=True)
+    (Path(prefix) / "node_modules" / "@pulumi" / "pulumi" / "index.js").write_text(
+        "module.exports = {}"
+    )
+
+
+class TestNodeModulesCache(aiounittest.AsyncTestCase):
+    def test_cache_key(self):
+        with TempDir() as tmp_dir:
+            (tmp_dir / "package.json").write_text('{"name": "a"}')
+            key = NodeModulesCache.cache_key(tmp_dir)
+            self.assertEqual(key, NodeModulesCache.cache_key(tmp_dir))
+
+            (tmp_dir / "package-lock.json").write_text("{}")
+            self.assertNotEqual(key, NodeModulesCache.cache_key(tmp_dir))
+
+    def test_install(self):
+        for mode in [
+            MaterializeMode.SYMLINK,
+            MaterializeMode.HARDLINK,
+            MaterializeMode.COPY,
+        ]:
+            with self.subTest(mode=mode), TempDir() as tmp_dir:
+                cache = NodeModulesCache(root=tmp_dir / "cache", mode=mode)
+                npm_install = MagicMock(side_effect=fake_npm_install)
+                for work_dir in [tmp_dir / "a", tmp_dir / "b"]:
+                    work_dir.mkdir()
+                    (work_dir / "package.json").write_text('{"name": "a"}')
+
+                self.assertFalse(cache.install(tmp_dir / "a", npm_install))
+                self.assertTrue(cache.install(tmp_dir / "b", npm_install))
+
+                npm_install.assert_called_once()
+                for work_dir in [tmp_dir / "a", tmp_dir / "b"]:
+                    self.assertTrue(
+                        (
+                            work_dir
+                            / "node_modules"
+                            / "@pulumi"
+                            / "pulumi"
+                            / "index.js"
+                        ).exists()
+                    )
+                self.assertEqual(
+                    (tmp_dir / "a" / "node_modules").is_symlink(),
+                    mode == MaterializeMode.SYMLINK,
+                )
+
+    def test_install_failure_leaves_no_entry(self):
+        with TempDir() as tmp_dir:
+            cache = NodeModulesCache(root=tmp_dir / "cache")
+            (tmp_dir / "package.json").write_text("{}")
+
+            with self.assertRaises(RuntimeError):
+                cache.install(tmp_dir, MagicMock(side_effect=RuntimeError("npm")))
+            self.assertEqual(list((tmp_dir / "cache").iterdir()), [])
+
+    def test_evict_least_recently_used(self):
+        with TempDir() as tmp_dir:
+            # each entry's index.js is 19 bytes
+            cache = NodeModulesCache(root=tmp_dir / "cache", max_bytes=30)
+            for name in ["a", "b"]:
+                (tmp_dir / name).mkdir()
+                (tmp_dir / name / "package.json").write_text(f'{{"name": "{name}"}}')
+
+            cache.install(tmp_dir / "a", fake_npm_install)
+            entry_a = cache.root / NodeModulesCache.cache_key(tmp_dir / "a")
+            os.utime(entry_a / NodeModulesCache.SIZE_FILE, (0, 0))
+            cache.install(tmp_dir / "b", fake_npm_install)
+
+            self.assertFalse(entry_a.exists())
+            self.assertTrue(
+                (cache.root / NodeModulesCache.cache_key(tmp_dir / "b")).exists()
+            )
+            # the hardlinked files outlive the evicted entry
+            self.assertTrue(
+                (
+                    tmp_dir / "a" / "node_modules" / "@pulumi" / "pulumi" / "index.js"
+                ).exists()
+            )
+
+    def test_evict_keeps_current_entry(self):
+        with TempDir() as tmp_dir:
+            cache = NodeModulesCache(root=tmp_dir / "cache", max_bytes=0)
+            (tmp_dir / "package.json").write_text("{}")
+
+            cache.install(tmp_dir, fake_npm_install)
+
+            self.assertTrue((cache.root / NodeModulesCache.cache_key(tmp_dir)).exists())
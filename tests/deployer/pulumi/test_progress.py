@@ -0,0 +1,104 @@
+from unittest.mock import MagicMock
+
+import aiounittest
+from pulumi.automation import (
+    EngineEvent,
+    OpType,
+    ResOpFailedEvent,
+    ResourcePreEvent,
+    ResOutputsEvent,
+    StepEventMetadata,
+    SummaryEvent,
+)
+
+from src.deployer.pulumi.progress import DeployProgress, ProgressTracker
+
+
+def step(op: OpType, name: str) -> StepEventMetadata:
+    return StepEventMetadata(
+        op=op,
+        urn=f"urn:pulumi:stack::project::aws:s3/bucket:Bucket::{name}",
+        type="aws:s3/bucket:Bucket",
+        provider="",
+    )
+
+
+def pre(op: OpType, name: str) -> EngineEvent:
+    return EngineEvent(0, 0, resource_pre_event=ResourcePreEvent(step(op, name)))
+
+
+def outputs(op: OpType, name: str) -> EngineEvent:
+    return EngineEvent(0, 0, res_outputs_event=ResOutputsEvent(step(op, name)))
+
+
+class TestProgressTracker(aiounittest.AsyncTestCase):
+    def test_on_event(self):
+        tracker = ProgressTracker()
+
+        tracker.start("preview")
+        tracker.on_event(pre(OpType.CREATE, "a"))
+        tracker.on_event(pre(OpType.SAME, "b"))
+        tracker.on_event(pre(OpType.REPLACE, "c"))
+        tracker.on_event(pre(OpType.CREATE_REPLACEMENT, "c"))
+        tracker.on_event(
+            EngineEvent(
+                0,
+                0,
+                summary_event=SummaryEvent(
+                    False, 1, {"create": 1, "same": 1, "replace": 1, "update": 1}, {}
+                ),
+            )
+        )
+        self.assertEqual(3, tracker.progress.planned)
+
+        tracker.start("up")
+        tracker.on_event(pre(OpType.CREATE, "a"))
+        tracker.on_event(outputs(OpType.CREATE, "a"))
+        tracker.on_event(outputs(OpType.SAME, "b"))
+        tracker.on_event(pre(OpType.UPDATE, "d"))
+        tracker.on_event(
+            EngineEvent(
+                0,
+                0,
+                res_op_failed_event=ResOpFailedEvent(step(OpType.UPDATE, "d"), 1, 1),
+            )
+        )
+
+        self.assertEqual(
+            DeployProgress(
+                operation="up",
+                planned=3,
+                created=1,
+                failed=1,
+                current="update aws:s3/bucket:Bucket d",
+            ),
+            tracker.progress,
+        )
+
+        tracker.finish()
+        self.assertTrue(tracker.progress.done)
+        self.assertIsNone(tracker.progress.current)
+
+    def test_on_change_throttled(self):
+        on_change = MagicMock()
+        tracker = ProgressTracker(on_change, interval=60)
+
+        tracker.start("up")
+        for name in ["a", "b", "c"]:
+            tracker.on_event(pre(OpType.CREATE, name))
+            tracker.on_event(outputs(OpType.CREATE, name))
+        tracker.finish()
+
+        self.assertEqual(2, on_change.call_count)
+        last = on_change.call_args.args[0]
+        self.assertEqual(3, last.created)
+        self.assertTrue(last.done)
+        self.assertIsNotNone(last.updated_at)
+
+    def test_on_change_error(self):
+        tracker = ProgressTracker(MagicMock(side_effect=Exception("boom")))
+
+        tracker.start("up")
+        tracker.on_event(pre(OpType.CREATE, "a"))
+
+        self.assertEqual(1, tracker.progress.planned)
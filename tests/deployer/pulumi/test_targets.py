@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+from src.deployer.pulumi.targets import changed_resources, resource_urns
+
+OLD = """
+resources:
+  aws:ecs_service:svc:
+    DesiredCount: 1
+  aws:ecs_cluster:cluster:
+    Name: cluster
+edges:
+  aws:ecs_service:svc -> aws:ecs_cluster:cluster:
+"""
+
+
+class TestTargets(TestCase):
+    def test_changed_resources(self):
+        new = OLD.replace("DesiredCount: 1", "DesiredCount: 2")
+        self.assertEqual(changed_resources(OLD, new), ["aws:ecs_service:svc"])
+
+    def test_changed_resources_unchanged(self):
+        self.assertIsNone(changed_resources(OLD, OLD))
+
+    def test_changed_resources_added(self):
+        new = OLD.replace(
+            "edges:", "  aws:s3_bucket:bucket:\n    ForceDestroy: true\nedges:"
+        )
+        self.assertIsNone(changed_resources(OLD, new))
+
+    def test_changed_resources_edges(self):
+        new = OLD.replace(
+            "aws:ecs_service:svc -> aws:ecs_cluster:cluster:",
+            "aws:ecs_cluster:cluster -> aws:ecs_service:svc:",
+        )
+        self.assertIsNone(changed_resources(OLD, new))
+
+    def test_resource_urns(self):
+        resources = [
+            {"urn": "urn:pulumi:stack::project::pulumi:pulumi:Stack::project-stack"},
+            {"urn": "urn:pulumi:stack::project::aws:ecs/service:Service::svc"},
+            {"urn": "urn:pulumi:stack::project::aws:ecs/cluster:Cluster::cluster"},
+        ]
+        self.assertEqual(
+            resource_urns(resources, ["aws:ecs_service:svc"]),
+            ["urn:pulumi:stack::project::aws:ecs/service:Service::svc"],
+        )
+
+    def test_resource_urns_by_type(self):
+        resources = [
+            {"urn": "urn:pulumi:stack::project::aws:ecr/repository:Repository::svc"},
+            {"urn": "urn:pulumi:stack::project::aws:ecs/service:Service::svc"},
+            {"urn": "urn:pulumi:stack::project::aws:lb/loadBalancer:LoadBalancer::lb"},
+            {"urn": "urn:pulumi:stack::project::my:Parent$aws:s3/bucket:Bucket::b"},
+        ]
+        self.assertEqual(
+            resource_urns(
+                resources,
+                ["aws:ecs_service:svc", "aws:load_balancer:lb", "aws:s3_bucket:b"],
+            ),
+            [
+                "urn:pulumi:stack::project::aws:ecs/service:Service::svc",
+                "urn:pulumi:stack::project::aws:lb/loadBalancer:LoadBalancer::lb",
+                "urn:pulumi:stack::project::my:Parent$aws:s3/bucket:Bucket::b",
+            ],
+        )
+
+    def test_resource_urns_ambiguous(self):
+        resources = [
+            {"urn": "urn:pulumi:stack::project::aws:ecs/service:Service::svc"},
+            {"urn": "urn:pulumi:stack::project::aws:ecs/service:Service::svc"},
+            {"urn": "urn:pulumi:stack::project::aws:ecr/repository:Repository::repo"},
+        ]
+        self.assertIsNone(resource_urns(resources, ["aws:ecs_service:svc"]))
+        self.assertIsNone(resource_urns(resources, ["aws:ecs_service:missing"]))
+        # a name match of a different type isn't the resource
+        self.assertIsNone(resource_urns(resources, ["aws:s3_bucket:repo"]))
@@ -7,27 +7,39 @@ import aiounittest
 
 from src.deployer.deploy import (
     WorkflowResult,
+    archive_deploy_log,
     deploy,
     deploy_workflow,
+    get_config_digest,
+    get_deploy_fingerprint,
+    get_deploy_strategy,
+    get_progress_tracker,
     get_pulumi_config,
+    get_pulumi_parallel,
+    get_update_targets,
     run_pre_deploy_hooks,
+    snapshot_common_live_state,
 )
 from src.deployer.models.workflow_job import WorkflowJob, WorkflowJobStatus
 from src.deployer.models.workflow_run import WorkflowRun
 from src.deployer.pulumi.builder import AppBuilder
-from src.deployer.pulumi.deployer import AppDeployer
+from src.deployer.pulumi.deploy_logs import DeploymentDir
+from src.deployer.pulumi.deployer import AppDeployer, DeployStrategy
 from src.deployer.pulumi.manager import AppManager
 from src.engine_service.engine_commands.run import RunEngineResult
 from src.project import StackPack
 from src.project.common_stack import CommonStack
 from src.project.live_state import LiveState
 from src.project.models.app_deployment import AppDeployment
+from src.project.models.app_status import AppStatus
 from src.project.models.project import Project
+from src.project.storage.iac_storage import DeployedIac, IacManifest
+from src.util.tmp import TempDir
 from tests.test_utils.pynamo_test import PynamoTest
 
 
 class TestDeploy(PynamoTest, aiounittest.AsyncTestCase):
-    models = [WorkflowRun, WorkflowJob, Project, AppDeployment]
+    models = [WorkflowRun, WorkflowJob, Project, AppDeployment, AppStatus]
 
     def setUp(self):
         super().setUp()
@@ -87,6 +99,7 @@ class TestDeploy(PynamoTest, aiounittest.AsyncTestCase):
         self.job.save()
         return
 
+    @patch("src.deployer.deploy.archive_deploy_log")
     @patch("src.deployer.deploy.get_expected_outputs_for_job")
     @patch("src.deployer.deploy.deploy")
     @patch("src.deployer.deploy.run_pre_deploy_hooks")
@@ -101,7 +114,9 @@ class TestDeploy(PynamoTest, aiounittest.AsyncTestCase):
         mock_run_pre_deploy_hooks,
         mock_deploy,
         mock_get_expected_outputs_for_job,
+        mock_archive_deploy_log,
     ):
+        self.app.update(actions=[AppDeployment.live_state_checkpoint.set(5)])
         mock_live_state = MagicMock(spec=LiveState)
         mock_read_live_state.return_value = mock_live_state
         run_engine_result = RunEngineResult(
@@ -128,21 +143,127 @@ class TestDeploy(PynamoTest, aiounittest.AsyncTestCase):
             result,
             WorkflowResult(status=WorkflowJobStatus.SUCCEEDED, message="Deployed"),
         )
-        mock_build_app.assert_called_once_with(mock.ANY, mock.ANY, mock_live_state)
-        mock_generate_iac.assert_called_once_with(run_engine_result, mock.ANY, mock.ANY)
+        mock_build_app.assert_called_once_with(
+            mock.ANY, mock.ANY, mock_live_state, dry_run=False
+        )
+        mock_generate_iac.assert_called_once_with(
+            run_engine_result, mock.ANY, mock.ANY, dry_run=False
+        )
         mock_run_pre_deploy_hooks.assert_called_once_with(mock.ANY, mock_live_state)
         mock_deploy.assert_called_once()
         mock_get_expected_outputs_for_job.assert_called_once_with(mock.ANY)
         mock_manager.get_outputs.assert_called_once_with({"key": "value"})
+        mock_archive_deploy_log.assert_called_once_with(mock.ANY)
 
         updated_app = AppDeployment.get("project_id", "metabase#00000001")
         self.assertEqual(updated_app.outputs, {"key": "value"})
+        # the stack changed, so its snapshot can't be trusted without checking
+        self.assertIsNone(updated_app.live_state_checkpoint)
 
         update_job = WorkflowJob.get(self.job.partition_key, self.job.job_number)
         self.assertEqual(update_job.status, WorkflowJobStatus.SUCCEEDED.value)
         self.assertEqual(update_job.status_reason, "Deployed")
         self.assertIsNotNone(update_job.completed_at)
 
+    @patch("src.deployer.deploy.deploy")
+    @patch("src.deployer.deploy.run_pre_deploy_hooks")
+    @patch("src.deployer.deploy.build_app")
+    @patch("src.deployer.deploy.read_live_state")
+    async def test_deploy_workflow_preview_only_fresh_project(
+        self,
+        mock_read_live_state,
+        mock_build_app,
+        mock_run_pre_deploy_hooks,
+        mock_deploy,
+    ):
+        # the common stack has never been deployed, so there's nothing to preview against
+        self.job.update(
+            actions=[WorkflowJob.deploy_strategy.set(DeployStrategy.PREVIEW_ONLY.value)]
+        )
+
+        result = await deploy_workflow(self.job.partition_key, self.job.job_number)
+
+        self.assertEqual(result.status, WorkflowJobStatus.SKIPPED)
+        mock_read_live_state.assert_not_called()
+        mock_run_pre_deploy_hooks.assert_not_called()
+        mock_build_app.assert_not_called()
+        mock_deploy.assert_not_called()
+        update_job = WorkflowJob.get(self.job.partition_key, self.job.job_number)
+        self.assertEqual(update_job.status, WorkflowJobStatus.SKIPPED.value)
+        self.assertIsNotNone(update_job.completed_at)
+
+    @patch("src.deployer.deploy.archive_deploy_log")
+    @patch("src.deployer.deploy.get_expected_outputs_for_job")
+    @patch("src.deployer.deploy.deploy")
+    @patch("src.deployer.deploy.run_pre_deploy_hooks")
+    @patch("src.deployer.deploy.generate_iac")
+    @patch("src.deployer.deploy.build_app")
+    @patch("src.deployer.deploy.read_live_state")
+    @patch.object(AppDeployment, "get_latest_deployed_version")
+    async def test_deploy_workflow_preview_only(
+        self,
+        mock_get_latest_deployed_version,
+        mock_read_live_state,
+        mock_build_app,
+        mock_generate_iac,
+        mock_run_pre_deploy_hooks,
+        mock_deploy,
+        mock_get_expected_outputs_for_job,
+        mock_archive_deploy_log,
+    ):
+        mock_get_latest_deployed_version.return_value = self.common_app
+        self.job.update(
+            actions=[WorkflowJob.deploy_strategy.set(DeployStrategy.PREVIEW_ONLY.value)]
+        )
+        mock_live_state = MagicMock(spec=LiveState)
+        mock_read_live_state.return_value = mock_live_state
+        mock_manager = MagicMock(
+            spec=AppManager,
+            get_outputs=MagicMock(return_value={"key": "value"}),
+        )
+        mock_deploy.return_value = (
+            mock_manager,
+            WorkflowJobStatus.SKIPPED,
+            "Preview succeeded.",
+        )
+
+        result = await deploy_workflow(self.job.partition_key, self.job.job_number)
+
+        self.assertEqual(result.status, WorkflowJobStatus.SKIPPED)
+        mock_run_pre_deploy_hooks.assert_not_called()
+        mock_build_app.assert_called_once_with(
+            mock.ANY, mock.ANY, mock_live_state, dry_run=True
+        )
+        mock_generate_iac.assert_called_once_with(
+            mock.ANY, mock.ANY, mock.ANY, dry_run=True
+        )
+        updated_app = AppDeployment.get("project_id", "metabase#00000001")
+        self.assertIsNone(updated_app.outputs)
+
+    @patch("src.deployer.deploy.store_import_constraints")
+    @patch("src.deployer.deploy.snapshot_live_state")
+    async def test_snapshot_common_live_state(
+        self, mock_snapshot_live_state, mock_store_import_constraints
+    ):
+        manager = MagicMock(
+            spec=AppManager, checkpoint_version=MagicMock(return_value=7)
+        )
+
+        await snapshot_common_live_state(
+            manager, self.job, self.project, self.common_app
+        )
+
+        mock_snapshot_live_state.assert_called_once_with(
+            manager, "project_id", "common", mock.ANY, 7
+        )
+        mock_store_import_constraints.assert_called_once_with(
+            self.project,
+            mock_snapshot_live_state.return_value,
+            self.job.run_composite_key(),
+        )
+        updated_app = AppDeployment.get("project_id", "common#00000001")
+        self.assertEqual(updated_app.live_state_checkpoint, 7)
+
     @patch("src.deployer.deploy.run_actions")
     async def test_run_pre_deploy_hooks(
         self,
@@ -188,6 +309,35 @@ class TestDeploy(PynamoTest, aiounittest.AsyncTestCase):
             self.app.get_configurations()
         )
 
+    @patch("src.deployer.deploy.get_stack_pack_by_job")
+    async def test_get_deploy_strategy(self, mock_get_stack_pack_by_job):
+        mock_get_stack_pack_by_job.return_value = MagicMock(
+            spec=StackPack, deploy_strategy="preview-only"
+        )
+        self.assertEqual(get_deploy_strategy(self.job), DeployStrategy.PREVIEW_ONLY)
+
+        self.job.deploy_strategy = "fast"
+        self.assertEqual(get_deploy_strategy(self.job), DeployStrategy.FAST)
+
+    async def test_get_progress_tracker(self):
+        tracker = get_progress_tracker(self.job)
+        tracker.start("up")
+
+        job = WorkflowJob.get(self.job.partition_key, self.job.job_number)
+        self.assertEqual("up", job.progress["operation"])
+        self.assertEqual("FAILED", job.status)
+
+    @patch("src.deployer.deploy.get_stack_pack_by_job")
+    async def test_get_pulumi_parallel(self, mock_get_stack_pack_by_job):
+        mock_get_stack_pack_by_job.return_value = MagicMock(
+            spec=StackPack, pulumi_parallel=32
+        )
+        self.assertEqual(get_pulumi_parallel(self.job), 32)
+
+    @patch("src.deployer.deploy.get_iac_storage")
+    @patch("src.deployer.deploy.get_update_targets")
+    @patch("src.deployer.deploy.get_deploy_fingerprint")
+    @patch("src.deployer.deploy.get_deploy_strategy")
     @patch("src.deployer.deploy.AppManager")
     @patch("src.deployer.deploy.AppDeployer")
     @patch("src.deployer.deploy.AppBuilder")
@@ -198,6 +348,10 @@ class TestDeploy(PynamoTest, aiounittest.AsyncTestCase):
         mock_app_builder,
         mock_app_deployer,
         mock_app_manager,
+        mock_get_deploy_strategy,
+        mock_get_deploy_fingerprint,
+        mock_get_update_targets,
+        mock_get_iac_storage,
     ):
         mock_stack = MagicMock(
             set_config=MagicMock(),
@@ -210,14 +364,19 @@ class TestDeploy(PynamoTest, aiounittest.AsyncTestCase):
         app_deployer = MagicMock(
             spec=AppDeployer,
             deploy=MagicMock(return_value=(WorkflowJobStatus.SUCCEEDED, "Deployed")),
+            phase_timings={"up": 1.5},
         )
+        mock_get_deploy_strategy.return_value = DeployStrategy.FAST
+        mock_get_deploy_fingerprint.return_value = "fingerprint"
+        mock_get_update_targets.return_value = None
         mock_get_pulumi_config.return_value = {"key": "value"}
         mock_app_builder.return_value = app_builder
         mock_app_deployer.return_value = app_deployer
         app_manger = MagicMock(spec=AppManager)
         mock_app_manager.return_value = app_manger
 
-        result = deploy(self.job, Path("/tmp"))
+        with TempDir() as tmp_dir:
+            result = deploy(self.job, tmp_dir)
 
         self.assertEqual(result, (app_manger, WorkflowJobStatus.SUCCEEDED, "Deployed"))
         mock_get_pulumi_config.assert_called_once_with(self.job)
@@ -227,6 +386,284 @@ class TestDeploy(PynamoTest, aiounittest.AsyncTestCase):
             self.project.region,
             self.project.assumed_role_arn,
             self.project.assumed_role_external_id,
+            {"key": mock.ANY},
+        )
+        mock_stack.set_config.assert_not_called()
+        app_deployer.deploy.assert_called_once_with(DeployStrategy.FAST, None)
+        mock_get_iac_storage.return_value.write_deployed.assert_called_once()
+
+        updated_job = WorkflowJob.get(self.job.partition_key, self.job.job_number)
+        self.assertEqual(updated_job.deploy_strategy, "fast")
+        self.assertEqual(updated_job.phase_timings, {"up": 1.5})
+
+        updated_app = AppDeployment.get("project_id", "metabase#00000001")
+        self.assertEqual(updated_app.deployed_fingerprint, "fingerprint")
+
+    @patch("src.deployer.deploy.get_iac_storage")
+    @patch("src.deployer.deploy.get_update_targets")
+    @patch("src.deployer.deploy.get_deploy_fingerprint")
+    @patch("src.deployer.deploy.get_deploy_strategy")
+    @patch("src.deployer.deploy.AppManager")
+    @patch("src.deployer.deploy.AppDeployer")
+    @patch("src.deployer.deploy.AppBuilder")
+    @patch("src.deployer.deploy.get_pulumi_config")
+    async def test_deploy_targeted(
+        self,
+        mock_get_pulumi_config,
+        mock_app_builder,
+        mock_app_deployer,
+        mock_app_manager,
+        mock_get_deploy_strategy,
+        mock_get_deploy_fingerprint,
+        mock_get_update_targets,
+        mock_get_iac_storage,
+    ):
+        self.app.update(actions=[AppDeployment.deployed_fingerprint.set("old")])
+        app_deployer = MagicMock(
+            spec=AppDeployer,
+            deploy=MagicMock(return_value=(WorkflowJobStatus.SUCCEEDED, "Deployed")),
+            phase_timings={"up": 1.5},
+        )
+        mock_get_deploy_strategy.return_value = DeployStrategy.FAST
+        mock_get_deploy_fingerprint.return_value = "fingerprint"
+        mock_get_update_targets.return_value = ["urn"]
+        mock_get_pulumi_config.return_value = {"key": "value"}
+        mock_app_deployer.return_value = app_deployer
+
+        with TempDir() as tmp_dir:
+            result = deploy(self.job, tmp_dir)
+
+        self.assertEqual(result[1:], (WorkflowJobStatus.SUCCEEDED, "Deployed"))
+        app_deployer.deploy.assert_called_once_with(DeployStrategy.FAST, ["urn"])
+        # recorded so the next deploy can be targeted too
+        iac_storage = mock_get_iac_storage.return_value
+        iac_storage.write_deployed.assert_called_once()
+        iac_storage.delete_deployed.assert_not_called()
+        updated_app = AppDeployment.get("project_id", "metabase#00000001")
+        self.assertEqual(updated_app.deployed_fingerprint, "fingerprint")
+
+    @patch("src.deployer.deploy.get_deploy_fingerprint")
+    @patch("src.deployer.deploy.AppManager")
+    @patch("src.deployer.deploy.AppDeployer")
+    @patch("src.deployer.deploy.AppBuilder")
+    @patch("src.deployer.deploy.get_pulumi_config")
+    async def test_deploy_unchanged(
+        self,
+        mock_get_pulumi_config,
+        mock_app_builder,
+        mock_app_deployer,
+        mock_app_manager,
+        mock_get_deploy_fingerprint,
+    ):
+        self.app.update(actions=[AppDeployment.deployed_fingerprint.set("same")])
+        mock_get_deploy_fingerprint.return_value = "same"
+        mock_get_pulumi_config.return_value = {}
+        app_builder = MagicMock(spec=AppBuilder)
+        mock_app_builder.return_value = app_builder
+        app_deployer = MagicMock(
+            spec=AppDeployer,
+            refresh_unchanged=MagicMock(return_value=True),
+            phase_timings={"refresh": 0.5},
         )
-        mock_stack.set_config.assert_called_once_with("key", mock.ANY)
-        app_deployer.deploy.assert_called_once()
+        mock_app_deployer.return_value = app_deployer
+
+        with TempDir() as tmp_dir:
+            _, status, message = deploy(self.job, tmp_dir)
+
+        self.assertEqual(status, WorkflowJobStatus.SUCCEEDED)
+        self.assertEqual(message, "No changes to deploy.")
+        app_builder.create_pulumi_stack.assert_called_once_with(self.job)
+        app_builder.prepare_stack.assert_not_called()
+        app_builder.install_npm_deps.assert_not_called()
+        app_deployer.deploy.assert_not_called()
+
+    @patch("src.deployer.deploy.get_iac_storage")
+    @patch("src.deployer.deploy.get_update_targets")
+    @patch("src.deployer.deploy.get_deploy_strategy")
+    @patch("src.deployer.deploy.get_deploy_fingerprint")
+    @patch("src.deployer.deploy.AppManager")
+    @patch("src.deployer.deploy.AppDeployer")
+    @patch("src.deployer.deploy.AppBuilder")
+    @patch("src.deployer.deploy.get_pulumi_config")
+    async def test_deploy_unchanged_preview_only(
+        self,
+        mock_get_pulumi_config,
+        mock_app_builder,
+        mock_app_deployer,
+        mock_app_manager,
+        mock_get_deploy_fingerprint,
+        mock_get_deploy_strategy,
+        mock_get_update_targets,
+        mock_get_iac_storage,
+    ):
+        self.app.update(actions=[AppDeployment.deployed_fingerprint.set("same")])
+        mock_get_deploy_fingerprint.return_value = "same"
+        mock_get_deploy_strategy.return_value = DeployStrategy.PREVIEW_ONLY
+        mock_get_update_targets.return_value = None
+        mock_get_pulumi_config.return_value = {}
+        app_deployer = MagicMock(
+            spec=AppDeployer,
+            deploy=MagicMock(
+                return_value=(WorkflowJobStatus.SKIPPED, "Preview succeeded.")
+            ),
+            phase_timings={"preview": 0.5},
+        )
+        mock_app_deployer.return_value = app_deployer
+
+        with TempDir() as tmp_dir:
+            _, status, message = deploy(self.job, tmp_dir)
+
+        # the drift check's refresh would change the stack, so the preview runs instead
+        self.assertEqual(status, WorkflowJobStatus.SKIPPED)
+        self.assertEqual(message, "Preview succeeded.")
+        app_deployer.refresh_unchanged.assert_not_called()
+        app_deployer.deploy.assert_called_once_with(DeployStrategy.PREVIEW_ONLY, None)
+        mock_get_iac_storage.return_value.write_deployed.assert_not_called()
+
+    @patch("src.deployer.deploy.get_iac_storage")
+    @patch("src.deployer.deploy.get_update_targets")
+    @patch("src.deployer.deploy.get_deploy_strategy")
+    @patch("src.deployer.deploy.get_deploy_fingerprint")
+    @patch("src.deployer.deploy.AppManager")
+    @patch("src.deployer.deploy.AppDeployer")
+    @patch("src.deployer.deploy.AppBuilder")
+    @patch("src.deployer.deploy.get_pulumi_config")
+    async def test_deploy_unchanged_drifted(
+        self,
+        mock_get_pulumi_config,
+        mock_app_builder,
+        mock_app_deployer,
+        mock_app_manager,
+        mock_get_deploy_fingerprint,
+        mock_get_deploy_strategy,
+        mock_get_update_targets,
+        mock_get_iac_storage,
+    ):
+        self.app.update(actions=[AppDeployment.deployed_fingerprint.set("same")])
+        mock_get_deploy_fingerprint.return_value = "same"
+        mock_get_deploy_strategy.return_value = DeployStrategy.SAFE
+        mock_get_update_targets.return_value = None
+        mock_get_pulumi_config.return_value = {}
+        app_builder = MagicMock(spec=AppBuilder)
+        mock_app_builder.return_value = app_builder
+        app_deployer = MagicMock(
+            spec=AppDeployer,
+            refresh_unchanged=MagicMock(return_value=False),
+            deploy=MagicMock(return_value=(WorkflowJobStatus.FAILED, "error")),
+            phase_timings={},
+        )
+        mock_app_deployer.return_value = app_deployer
+
+        with TempDir() as tmp_dir:
+            _, status, _ = deploy(self.job, tmp_dir)
+
+        self.assertEqual(status, WorkflowJobStatus.FAILED)
+        app_builder.install_npm_deps.assert_called_once_with(self.job)
+        app_deployer.deploy.assert_called_once_with(DeployStrategy.SAFE, None)
+        mock_get_iac_storage.return_value.delete_deployed.assert_called_once_with(
+            "project_id", "metabase"
+        )
+        updated_app = AppDeployment.get("project_id", "metabase#00000001")
+        self.assertIsNone(updated_app.deployed_fingerprint)
+
+    async def test_get_deploy_fingerprint(self):
+        with TempDir() as tmp_dir:
+            (tmp_dir / "index.ts").write_text("program")
+            (tmp_dir / "node_modules").mkdir()
+            (tmp_dir / "node_modules" / "dep.js").write_text("dep")
+            config_digest = get_config_digest(self.project, {"k": "v"})
+            fingerprint = get_deploy_fingerprint(
+                IacManifest.from_directory(tmp_dir), config_digest
+            )
+
+            (tmp_dir / "node_modules" / "dep.js").write_text("other dep")
+            self.assertEqual(
+                fingerprint,
+                get_deploy_fingerprint(
+                    IacManifest.from_directory(tmp_dir), config_digest
+                ),
+            )
+            self.assertNotEqual(
+                fingerprint,
+                get_deploy_fingerprint(
+                    IacManifest.from_directory(tmp_dir),
+                    get_config_digest(self.project, {"k": "v2"}),
+                ),
+            )
+
+            (tmp_dir / "index.ts").write_text("changed program")
+            self.assertNotEqual(
+                fingerprint,
+                get_deploy_fingerprint(
+                    IacManifest.from_directory(tmp_dir), config_digest
+                ),
+            )
+
+    @patch("src.deployer.deploy.get_iac_storage")
+    async def test_get_update_targets(self, mock_get_iac_storage):
+        old_resources = "resources:\n  aws:ecs_service:svc:\n    DesiredCount: 1\n"
+        new_resources = "resources:\n  aws:ecs_service:svc:\n    DesiredCount: 2\n"
+        stack = MagicMock()
+        stack.export_stack.return_value.deployment = {
+            "resources": [{"urn": "urn:pulumi:s::p::aws:ecs/service:Service::svc"}]
+        }
+        with TempDir() as tmp_dir:
+            (tmp_dir / "index.ts").write_text("old program")
+            (tmp_dir / "resources.yaml").write_text(old_resources)
+            (tmp_dir / "Pulumi.yaml").write_text("name: p")
+            deployed = DeployedIac(
+                manifest=IacManifest.from_directory(tmp_dir), config_digest="config"
+            )
+            iac_storage = mock_get_iac_storage.return_value
+            iac_storage.get_deployed.return_value = deployed
+            iac_storage.get_blob.return_value = old_resources.encode()
+
+            (tmp_dir / "index.ts").write_text("new program")
+            (tmp_dir / "resources.yaml").write_text(new_resources)
+            manifest = IacManifest.from_directory(tmp_dir)
+
+            self.assertEqual(
+                get_update_targets(self.job, tmp_dir, manifest, "config", stack),
+                ["urn:pulumi:s::p::aws:ecs/service:Service::svc"],
+            )
+            # config changes can't be attributed to resources
+            self.assertIsNone(
+                get_update_targets(self.job, tmp_dir, manifest, "other", stack)
+            )
+
+            (tmp_dir / "Pulumi.yaml").write_text("name: changed")
+            manifest = IacManifest.from_directory(tmp_dir)
+            self.assertIsNone(
+                get_update_targets(self.job, tmp_dir, manifest, "config", stack)
+            )
+
+
+class TestArchiveDeployLog(aiounittest.AsyncTestCase):
+    @patch("src.deployer.deploy.evict_logs")
+    @patch("src.deployer.deploy.get_log_storage")
+    def test_archive_deploy_log(self, mock_get_log_storage, mock_evict_logs):
+        job = MagicMock(
+            spec=WorkflowJob,
+            partition_key="project#DEPLOY##00000001",
+            project_id=MagicMock(return_value="project"),
+            modified_app_id=MagicMock(return_value="app"),
+        )
+        with TempDir() as tmp_dir, patch(
+            "src.deployer.pulumi.deploy_logs.LOG_DIR", tmp_dir
+        ):
+            log = DeploymentDir("project", job.partition_key).get_log("app")
+
+            with self.subTest("Incomplete log"):
+                log.write("line\n")
+                archive_deploy_log(job)
+                mock_get_log_storage.return_value.write_log.assert_not_called()
+
+            with self.subTest("Complete log"):
+                log.end()
+                archive_deploy_log(job)
+                mock_get_log_storage.return_value.write_log.assert_called_once_with(
+                    "project", job.partition_key, "app", log.path
+                )
+                self.assertTrue(log.archived_marker().exists())
+
+        self.assertEqual(2, mock_evict_logs.call_count)
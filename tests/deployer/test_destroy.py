@@ -11,12 +11,13 @@ from src.deployer.models.workflow_run import WorkflowRun
 from src.deployer.pulumi.builder import AppBuilder
 from src.deployer.pulumi.deployer import AppDeployer
 from src.project.models.app_deployment import AppDeployment, AppLifecycleStatus
+from src.project.models.app_status import AppStatus
 from src.project.models.project import Project
 from tests.test_utils.pynamo_test import PynamoTest
 
 
 class TestDestroy(PynamoTest, aiounittest.AsyncTestCase):
-    models = [WorkflowRun, WorkflowJob, Project, AppDeployment]
+    models = [WorkflowRun, WorkflowJob, Project, AppDeployment, AppStatus]
 
     def setUp(self):
         super().setUp()
@@ -77,10 +78,12 @@ class TestDestroy(PynamoTest, aiounittest.AsyncTestCase):
         self.job.save()
         return
 
+    @patch("src.deployer.destroy.archive_deploy_log")
     @patch("src.deployer.destroy.destroy")
     async def test_destroy_workflow(
         self,
         mock_destroy,
+        mock_archive_deploy_log,
     ):
         mock_destroy.return_value = (WorkflowJobStatus.SUCCEEDED, "Destroyed")
 
@@ -92,6 +95,7 @@ class TestDestroy(PynamoTest, aiounittest.AsyncTestCase):
         )
 
         mock_destroy.assert_called_once()
+        mock_archive_deploy_log.assert_called_once()
         update_job = WorkflowJob.get(self.job.partition_key, self.job.job_number)
         self.assertEqual(update_job.status, WorkflowJobStatus.SUCCEEDED.value)
         self.assertEqual(update_job.status_reason, "Destroyed")
@@ -125,21 +129,22 @@ class TestDestroy(PynamoTest, aiounittest.AsyncTestCase):
             self.project.id, self.common_app.app_id()
         )
 
+    @patch("src.deployer.destroy.get_iac_storage")
     @patch("src.deployer.destroy.AppDeployer")
     @patch("src.deployer.destroy.AppBuilder")
-    @patch("src.deployer.destroy.get_iac_storage")
+    @patch("src.deployer.destroy.get_iac_cache")
     async def test_destroy(
         self,
-        mock_get_iac_storage,
+        mock_get_iac_cache,
         mock_app_builder,
         mock_app_deployer,
+        mock_get_iac_storage,
     ):
         mock_stack = MagicMock(
             set_config=MagicMock(),
         )
         app_builder = MagicMock(
             spec=AppBuilder,
-            write_iac_to_disk=MagicMock(),
             prepare_stack=MagicMock(return_value=mock_stack),
             configure_aws=MagicMock(),
         )
@@ -149,10 +154,10 @@ class TestDestroy(PynamoTest, aiounittest.AsyncTestCase):
                 return_value=(WorkflowJobStatus.SUCCEEDED, "Destroyed")
             ),
         )
-        iac_storage = MagicMock(get_iac=MagicMock(return_value=b"iac"))
+        iac_cache = MagicMock(extract_iac=MagicMock())
         mock_app_builder.return_value = app_builder
         mock_app_deployer.return_value = app_deployer
-        mock_get_iac_storage.return_value = iac_storage
+        mock_get_iac_cache.return_value = iac_cache
         result = destroy(self.job, Path("/tmp"))
 
         self.assertEqual(result, (WorkflowJobStatus.SUCCEEDED, "Destroyed"))
@@ -164,7 +169,9 @@ class TestDestroy(PynamoTest, aiounittest.AsyncTestCase):
             self.project.assumed_role_external_id,
         )
         app_deployer.destroy_and_remove_stack.assert_called_once()
-        iac_storage.get_iac.assert_called_once_with(
-            self.project.id, self.app.app_id(), self.app.version()
+        iac_cache.extract_iac.assert_called_once_with(
+            self.project.id, self.app.app_id(), self.app.version(), Path("/tmp")
+        )
+        mock_get_iac_storage.return_value.delete_deployed.assert_called_once_with(
+            self.project.id, self.app.app_id()
         )
-        app_builder.write_iac_to_disk.assert_called_once_with(b"iac")
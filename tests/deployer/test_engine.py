@@ -0,0 +1,202 @@
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import aiounittest
+
+from src.deployer.engine import (
+    get_constraints_from_common_live_state,
+    load_live_state,
+    read_live_state,
+    snapshot_live_state,
+    store_import_constraints,
+)
+from src.deployer.pulumi.manager import AppManager
+from src.project import Resources
+from src.project.live_state import LiveState
+from src.project.models.project import Project
+from src.project.storage.live_state_storage import (
+    ImportConstraints,
+    LiveStateSnapshot,
+)
+
+
+class TestLoadLiveState(aiounittest.AsyncTestCase):
+    def setUp(self):
+        self.snapshot_state = LiveState(resources=Resources({"aws:vpc:old": None}))
+        self.stack_state = LiveState(resources=Resources({"aws:vpc:new": None}))
+        self.manager = MagicMock(
+            spec=AppManager,
+            checkpoint_version=MagicMock(return_value=3),
+            read_deployed_state=AsyncMock(return_value=self.stack_state),
+        )
+
+    @patch("src.deployer.engine.get_live_state_storage")
+    async def test_snapshot_hit(self, mock_get_storage):
+        storage = mock_get_storage.return_value
+        storage.get_snapshot.return_value = LiveStateSnapshot(
+            checkpoint_version=3, live_state=self.snapshot_state
+        )
+
+        result = await load_live_state(self.manager, "project", "common", Path("/tmp"))
+
+        self.assertEqual(result, self.snapshot_state)
+        self.manager.read_deployed_state.assert_not_called()
+        storage.write_snapshot.assert_not_called()
+
+    @patch("src.deployer.engine.get_live_state_storage")
+    async def test_snapshot_stale(self, mock_get_storage):
+        storage = mock_get_storage.return_value
+        storage.get_snapshot.return_value = LiveStateSnapshot(
+            checkpoint_version=2, live_state=self.snapshot_state
+        )
+
+        result = await load_live_state(self.manager, "project", "common", Path("/tmp"))
+
+        self.assertEqual(result, self.stack_state)
+        storage.write_snapshot.assert_called_once_with(
+            "project",
+            "common",
+            LiveStateSnapshot(checkpoint_version=3, live_state=self.stack_state),
+        )
+
+    @patch("src.deployer.engine.get_live_state_storage")
+    async def test_snapshot_live_state(self, mock_get_storage):
+        storage = mock_get_storage.return_value
+
+        result = await snapshot_live_state(
+            self.manager, "project", "common", Path("/tmp"), 3
+        )
+
+        self.assertEqual(result, self.stack_state)
+        storage.get_snapshot.assert_not_called()
+        stored = storage.write_snapshot.call_args.args[2]
+        self.assertEqual(stored.checkpoint_version, 3)
+
+
+class TestReadLiveState(aiounittest.AsyncTestCase):
+    def setUp(self):
+        self.snapshot_state = LiveState(resources=Resources({"aws:vpc:old": None}))
+
+    @patch("src.deployer.engine.AppBuilder")
+    @patch("src.deployer.engine.get_iac_cache")
+    @patch("src.deployer.engine.get_live_state_storage")
+    @patch("src.deployer.engine.AppDeployment")
+    async def test_recorded_checkpoint(
+        self, mock_app, mock_get_storage, mock_get_iac_cache, mock_app_builder
+    ):
+        mock_app.get_latest_deployed_version.return_value = MagicMock(
+            live_state_checkpoint=3
+        )
+        mock_get_storage.return_value.get_snapshot.return_value = LiveStateSnapshot(
+            checkpoint_version=3, live_state=self.snapshot_state
+        )
+
+        result = await read_live_state("project", "common")
+
+        self.assertEqual(result, self.snapshot_state)
+        # neither the IaC nor the stack are needed
+        mock_get_iac_cache.assert_not_called()
+        mock_app_builder.assert_not_called()
+
+    @patch("src.deployer.engine.load_live_state")
+    @patch("src.deployer.engine.AppManager")
+    @patch("src.deployer.engine.AppBuilder")
+    @patch("src.deployer.engine.get_iac_cache")
+    @patch("src.deployer.engine.get_live_state_storage")
+    @patch("src.deployer.engine.AppDeployment")
+    async def test_no_recorded_checkpoint(
+        self,
+        mock_app,
+        mock_get_storage,
+        mock_get_iac_cache,
+        mock_app_builder,
+        mock_app_manager,
+        mock_load_live_state,
+    ):
+        for recorded in [None, 2]:
+            with self.subTest(recorded=recorded):
+                mock_load_live_state.reset_mock()
+                mock_app.get_latest_deployed_version.return_value = MagicMock(
+                    live_state_checkpoint=recorded
+                )
+                mock_get_storage.return_value.get_snapshot.return_value = (
+                    LiveStateSnapshot(
+                        checkpoint_version=3, live_state=self.snapshot_state
+                    )
+                )
+                mock_load_live_state.return_value = self.snapshot_state
+
+                result = await read_live_state("project", "common")
+
+                self.assertEqual(result, self.snapshot_state)
+                mock_load_live_state.assert_called_once()
+                mock_get_iac_cache.return_value.extract_iac.assert_called()
+
+
+class TestGetConstraintsFromCommonLiveState(aiounittest.AsyncTestCase):
+    def setUp(self):
+        self.project = MagicMock(spec=Project, id="project", apps={"common": 2})
+        self.live_state = MagicMock(
+            spec=LiveState,
+            to_constraints=MagicMock(return_value=[{"node": "new"}]),
+        )
+
+    @patch("src.deployer.engine.AppDeployment")
+    @patch("src.deployer.engine.CommonStack")
+    @patch("src.deployer.engine.get_stack_packs")
+    @patch("src.deployer.engine.get_live_state_storage")
+    def test_computes_for_other_run(
+        self, mock_get_storage, mock_get_stack_packs, mock_common_stack, mock_app
+    ):
+        mock_common_stack.COMMON_APP_NAME = "common"
+        storage = mock_get_storage.return_value
+        storage.get_import_constraints.return_value = ImportConstraints(
+            run_id="run1", constraints=[{"node": "old"}]
+        )
+
+        result = get_constraints_from_common_live_state(
+            self.project, self.live_state, "run2"
+        )
+
+        self.assertEqual(result, [{"node": "new"}])
+        self.live_state.to_constraints.assert_called_once_with(
+            mock_common_stack.return_value, mock_app.get.return_value.configuration
+        )
+        storage.write_import_constraints.assert_not_called()
+
+    @patch("src.deployer.engine.AppDeployment")
+    @patch("src.deployer.engine.get_stack_packs")
+    @patch("src.deployer.engine.get_live_state_storage")
+    def test_uses_stored(self, mock_get_storage, mock_get_stack_packs, mock_app):
+        storage = mock_get_storage.return_value
+        storage.get_import_constraints.return_value = ImportConstraints(
+            run_id="run1", constraints=[{"node": "stored"}]
+        )
+
+        result = get_constraints_from_common_live_state(
+            self.project, self.live_state, "run1"
+        )
+
+        self.assertEqual(result, [{"node": "stored"}])
+        # nothing else is read to get them
+        self.live_state.to_constraints.assert_not_called()
+        mock_get_stack_packs.assert_not_called()
+        mock_app.get.assert_not_called()
+
+    @patch("src.deployer.engine.AppDeployment")
+    @patch("src.deployer.engine.CommonStack")
+    @patch("src.deployer.engine.get_stack_packs")
+    @patch("src.deployer.engine.get_live_state_storage")
+    def test_store_import_constraints(
+        self, mock_get_storage, mock_get_stack_packs, mock_common_stack, mock_app
+    ):
+        mock_common_stack.COMMON_APP_NAME = "common"
+
+        store_import_constraints(self.project, self.live_state, "run1")
+
+        storage = mock_get_storage.return_value
+        storage.write_import_constraints.assert_called_once_with(
+            "project",
+            "common",
+            ImportConstraints(run_id="run1", constraints=[{"node": "new"}]),
+        )
@@ -2,15 +2,21 @@ from unittest.mock import MagicMock, call, patch
 
 import aiounittest
 
+from src.deployer.models.workflow_job import (
+    WorkflowJob,
+    WorkflowJobStatus,
+    WorkflowJobType,
+)
 from src.engine_service.binaries.fetcher import Binary, BinaryStorage
 from src.engine_service.engine_commands.run import RunEngineRequest
 from src.project import StackPack
 from src.project.models.app_deployment import AppDeployment, AppLifecycleStatus
-from tests.test_utils.pynamo_test import PynamoTest
+from src.project.models.app_status import AppStatus
+from tests.test_utils.pynamo_test import PynamoTest, count_requests
 
 
 class TestAppDeployment(PynamoTest, aiounittest.AsyncTestCase):
-    models = [AppDeployment]
+    models = [AppDeployment, AppStatus, WorkflowJob]
 
     @patch.object(AppDeployment, "get_status")
     def test_to_view_model(self, mock_get_status):
@@ -191,3 +197,214 @@ class TestAppDeployment(PynamoTest, aiounittest.AsyncTestCase):
 
         # Assert
         self.assertEqual(f"app_id#{1:08}", composite_key)
+
+    def deploy_version(
+        self, version: int, job_type: WorkflowJobType, status: WorkflowJobStatus
+    ):
+        job = WorkflowJob(
+            partition_key="project_id#DEPLOY##00000001",
+            job_number=version,
+            job_type=job_type.value,
+            modified_app=WorkflowJob.compose_modified_app("app", version),
+            status=status.value,
+            status_reason=status.value,
+            title="Deploy app",
+            initiated_by="user",
+        )
+        job.save()
+        AppDeployment(
+            project_id="project_id",
+            range_key=AppDeployment.compose_range_key("app", version),
+            created_by="created_by",
+            configuration={},
+            deployments=[job.composite_key()],
+        ).save()
+
+    def test_refresh_status(self):
+        self.deploy_version(1, WorkflowJobType.DEPLOY, WorkflowJobStatus.SUCCEEDED)
+
+        app, status, reason = AppDeployment.refresh_status("project_id", "app")
+
+        self.assertEqual(1, app.version())
+        self.assertEqual(AppLifecycleStatus.INSTALLED, status)
+        app_status = AppStatus.get("project_id", "app")
+        self.assertEqual(AppLifecycleStatus.INSTALLED.value, app_status.status)
+        self.assertEqual(1, app_status.version)
+
+        self.deploy_version(2, WorkflowJobType.DEPLOY, WorkflowJobStatus.FAILED)
+
+        app, status, reason = AppDeployment.refresh_status("project_id", "app")
+
+        self.assertEqual(1, app.version())
+        self.assertEqual(AppLifecycleStatus.UPDATE_FAILED, status)
+
+        self.deploy_version(3, WorkflowJobType.DESTROY, WorkflowJobStatus.SUCCEEDED)
+
+        app, status, reason = AppDeployment.refresh_status("project_id", "app")
+
+        self.assertIsNone(app)
+        self.assertEqual(AppLifecycleStatus.UNINSTALLED, status)
+        self.assertIsNone(AppStatus.get("project_id", "app").version)
+
+    def test_refresh_status_concurrent(self):
+        self.deploy_version(1, WorkflowJobType.DEPLOY, WorkflowJobStatus.IN_PROGRESS)
+        compute_status = AppDeployment.compute_status
+        computed = []
+
+        def stale_compute_status(project_id, app_id):
+            result = compute_status(project_id, app_id)
+            computed.append(result[1])
+            if len(computed) == 1:
+                # the job finishes and its refresh saves first
+                job = WorkflowJob.get("project_id#DEPLOY##00000001", 1)
+                job.update(
+                    actions=[WorkflowJob.status.set(WorkflowJobStatus.SUCCEEDED.value)]
+                )
+                AppDeployment.refresh_status(project_id, app_id)
+            return result
+
+        with patch.object(
+            AppDeployment, "compute_status", side_effect=stale_compute_status
+        ):
+            app, status, _ = AppDeployment.refresh_status("project_id", "app")
+
+        self.assertEqual(
+            [
+                AppLifecycleStatus.INSTALLING,
+                AppLifecycleStatus.INSTALLED,
+                AppLifecycleStatus.INSTALLED,
+            ],
+            computed,
+        )
+        self.assertEqual(AppLifecycleStatus.INSTALLED, status)
+        app_status = AppStatus.get("project_id", "app")
+        self.assertEqual(AppLifecycleStatus.INSTALLED.value, app_status.status)
+        self.assertEqual(2, app_status.revision)
+
+    def test_get_status(self):
+        AppStatus(
+            "project_id",
+            "app",
+            status=AppLifecycleStatus.INSTALLED.value,
+            status_reason="Deployed",
+            version=2,
+        ).save()
+
+        with count_requests(AppDeployment, AppStatus, WorkflowJob) as requests:
+            app, status, reason = AppDeployment.get_status("project_id", "app")
+
+        self.assertEqual({"GetItem": 1}, dict(requests))
+        self.assertEqual(AppDeployment.compose_range_key("app", 2), app.range_key)
+        self.assertEqual(AppLifecycleStatus.INSTALLED, status)
+        self.assertEqual("Deployed", reason)
+
+    def test_get_status_not_materialized(self):
+        self.deploy_version(1, WorkflowJobType.DEPLOY, WorkflowJobStatus.IN_PROGRESS)
+
+        app, status, reason = AppDeployment.get_status("project_id", "app")
+
+        self.assertEqual(1, app.version())
+        self.assertEqual(AppLifecycleStatus.INSTALLING, status)
+        self.assertEqual(
+            AppLifecycleStatus.INSTALLING.value,
+            AppStatus.get("project_id", "app").status,
+        )
+
+    def test_get_statuses(self):
+        self.deploy_version(1, WorkflowJobType.DEPLOY, WorkflowJobStatus.SUCCEEDED)
+        AppStatus(
+            "project_id", "other", status=AppLifecycleStatus.UNINSTALLED.value
+        ).save()
+
+        statuses = AppDeployment.get_statuses("project_id", ["app", "other", "new"])
+
+        self.assertEqual(
+            {
+                "app": AppLifecycleStatus.INSTALLED,
+                "other": AppLifecycleStatus.UNINSTALLED,
+                "new": AppLifecycleStatus.NEW,
+            },
+            {app_id: status for app_id, (_, status, _) in statuses.items()},
+        )
+        self.assertEqual(1, statuses["app"][0].version())
+        self.assertIsNone(statuses["new"][0])
+
+    def test_compute_status_batches_job_reads(self):
+        # 10 apps, each with 3 versions of 20 runs, where only the oldest run succeeded
+        with WorkflowJob.batch_write() as jobs, AppDeployment.batch_write() as apps:
+            for a in range(10):
+                for version in range(1, 4):
+                    deployments = []
+                    for run in range(20):
+                        job = WorkflowJob(
+                            partition_key=f"project_id#DEPLOY#app{a}#{version}{run:04}",
+                            job_number=1,
+                            job_type=WorkflowJobType.DEPLOY.value,
+                            modified_app=WorkflowJob.compose_modified_app(
+                                f"app{a}", version
+                            ),
+                            status=(
+                                WorkflowJobStatus.SUCCEEDED.value
+                                if version == 1 and run == 0
+                                else WorkflowJobStatus.CANCELED.value
+                            ),
+                            status_reason="",
+                            title="Deploy app",
+                            initiated_by="user",
+                        )
+                        jobs.save(job)
+                        deployments.append(job.composite_key())
+                    apps.save(
+                        AppDeployment(
+                            project_id="project_id",
+                            range_key=AppDeployment.compose_range_key(
+                                f"app{a}", version
+                            ),
+                            created_by="created_by",
+                            configuration={},
+                            deployments=deployments,
+                        )
+                    )
+        app_ids = [f"app{a}" for a in range(10)]
+
+        with count_requests(AppDeployment, AppStatus, WorkflowJob) as requests:
+            statuses = AppDeployment.get_statuses("project_id", app_ids)
+
+        for app_id in app_ids:
+            app, status, _ = statuses[app_id]
+            self.assertEqual(AppLifecycleStatus.INSTALLED, status)
+            self.assertEqual(1, app.version())
+        # per app, a query for its versions and a batch get of their 60 jobs, around a
+        # read and a conditional save of its status
+        self.assertEqual(
+            {"BatchGetItem": 1 + 10, "Query": 10, "GetItem": 10, "PutItem": 10},
+            dict(requests),
+        )
+
+        with count_requests(AppDeployment, AppStatus, WorkflowJob) as requests:
+            AppDeployment.get_statuses("project_id", app_ids)
+
+        self.assertEqual({"BatchGetItem": 1}, dict(requests))
+
+    @patch("src.project.models.app_deployment.BATCH_GET_LIMIT", 25)
+    def test_compute_status_reads_jobs_as_needed(self):
+        self.deploy_version(1, WorkflowJobType.DEPLOY, WorkflowJobStatus.CANCELED)
+        self.deploy_version(2, WorkflowJobType.DEPLOY, WorkflowJobStatus.CANCELED)
+        self.deploy_version(3, WorkflowJobType.DEPLOY, WorkflowJobStatus.SUCCEEDED)
+        canceled = "project_id#DEPLOY##00000001#2"
+        for version, deployments in [
+            (1, [canceled] * 40),
+            (2, [canceled] * 40),
+            # the succeeded job is the 30th newest, in the second batch of 25
+            (3, ["project_id#DEPLOY##00000001#3"] + [canceled] * 29),
+        ]:
+            AppDeployment(
+                "project_id", AppDeployment.compose_range_key("app", version)
+            ).update(actions=[AppDeployment.deployments.set(deployments)])
+
+        with count_requests(AppDeployment, WorkflowJob) as requests:
+            app, status, _ = AppDeployment.compute_status("project_id", "app")
+
+        self.assertEqual(AppLifecycleStatus.INSTALLED, status)
+        self.assertEqual(3, app.version())
+        self.assertEqual({"Query": 1, "BatchGetItem": 2}, dict(requests))
@@ -8,6 +8,7 @@ from src.engine_service.binaries.fetcher import BinaryStorage
 from src.project import ConfigValues, Resources, StackParts
 from src.project.common_stack import CommonStack, Feature
 from src.project.models.app_deployment import AppDeployment
+from src.project.models.app_status import AppStatus
 from src.project.models.project import Project
 from tests.test_utils.pynamo_test import PynamoTest
 
@@ -30,7 +31,7 @@ def MockStackPack(app_id: str):
 
 
 class TestProject(PynamoTest, aiounittest.AsyncTestCase):
-    models = [Project, AppDeployment]
+    models = [Project, AppDeployment, AppStatus]
 
     def setUp(self) -> None:
         super().setUp()
@@ -350,8 +351,8 @@ class TestProject(PynamoTest, aiounittest.AsyncTestCase):
                 mock_binary_storage,
             )
 
-    @patch.object(AppDeployment, "get_status")
-    def test_view_model(self, mock_get_latest_deployed_version):
+    @patch.object(AppDeployment, "get_statuses")
+    def test_view_model(self, mock_get_statuses):
         # Arrange
         project = Project(
             id="id",
@@ -388,7 +389,9 @@ class TestProject(PynamoTest, aiounittest.AsyncTestCase):
             deployments={"id#1"},
         )
         app2.save()
-        mock_get_latest_deployed_version.return_value = (app1, "INSTALLED", "INSTALLED")
+        mock_get_statuses.return_value = {
+            app_id: (app1, "INSTALLED", "INSTALLED") for app_id in project.apps
+        }
 
         # Act
         project_view = project.to_view_model()
@@ -401,3 +404,6 @@ class TestProject(PynamoTest, aiounittest.AsyncTestCase):
         self.assertEqual("created_by", project_view.created_by)
         self.assertEqual(3, len(project_view.stack_packs))
         self.assertIsNotNone(project_view.created_at)
+        mock_get_statuses.assert_called_once_with(
+            "id", ["app1", "app2", CommonStack.COMMON_APP_NAME]
+        )
@@ -0,0 +1,71 @@
+import os
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import aiounittest
+
+from src.project.storage.iac_cache import IacCache
+from src.project.storage.iac_storage import IacStorage
+from src.util.tmp import TempDir
+
+
+def fake_extract(pack_id: str, app_name: str, version: int, target_dir: Path):
+    target_dir = Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    (target_dir / "index.ts").write_text(f"{app_name} {version}")
+
+
+class TestIacCache(aiounittest.AsyncTestCase):
+    def setUp(self):
+        self.iac_storage = MagicMock(spec=IacStorage)
+        self.iac_storage.extract_iac.side_effect = fake_extract
+        self.iac_storage.get_iac_etag.return_value = '"etag1"'
+
+    def test_extract_iac_hit_and_miss(self):
+        with TempDir() as tmp_dir:
+            cache = IacCache(self.iac_storage, root=tmp_dir / "cache")
+
+            cache.extract_iac("project", "app", 1, tmp_dir / "a")
+            cache.extract_iac("project", "app", 1, tmp_dir / "b")
+
+            self.assertEqual(self.iac_storage.extract_iac.call_count, 1)
+            self.assertEqual((tmp_dir / "b" / "index.ts").read_text(), "app 1")
+
+            with self.subTest("stale etag is re-extracted"):
+                self.iac_storage.get_iac_etag.return_value = '"etag2"'
+                cache.extract_iac("project", "app", 1, tmp_dir / "c")
+                self.assertEqual(self.iac_storage.extract_iac.call_count, 2)
+                self.assertEqual((tmp_dir / "c" / "index.ts").read_text(), "app 1")
+
+    def test_evict_least_recently_used(self):
+        with TempDir() as tmp_dir:
+            cache = IacCache(self.iac_storage, root=tmp_dir / "cache", max_bytes=7)
+
+            cache.extract_iac("project", "app", 1, tmp_dir / "a")
+            os.utime(cache.entry_dir("project", "app", 1) / IacCache.SIZE_FILE, (0, 0))
+            cache.extract_iac("project", "app", 2, tmp_dir / "b")
+
+            self.assertFalse(cache.entry_dir("project", "app", 1).exists())
+            self.assertTrue(cache.entry_dir("project", "app", 2).exists())
+
+    def test_evict_entries_without_etag(self):
+        self.iac_storage.get_iac_etag.return_value = None
+        with TempDir() as tmp_dir:
+            cache = IacCache(self.iac_storage, root=tmp_dir / "cache", max_bytes=7)
+
+            cache.extract_iac("project", "app", 1, tmp_dir / "a")
+            os.utime(cache.entry_dir("project", "app", 1) / IacCache.SIZE_FILE, (0, 0))
+            cache.extract_iac("project", "app", 2, tmp_dir / "b")
+
+            self.assertFalse(cache.entry_dir("project", "app", 1).exists())
+            self.assertEqual((tmp_dir / "b" / "index.ts").read_text(), "app 2")
+
+    def test_entry_dir_sanitizes_names(self):
+        cache = IacCache(self.iac_storage, root=Path("/cache"))
+
+        self.assertEqual(
+            Path("/cache/my_project/_/1"), cache.entry_dir("my/project", "..", 1)
+        )
+        self.assertEqual(
+            Path("/cache/project/_etc_app/1"), cache.entry_dir("project", "/etc/app", 1)
+        )
@@ -1,12 +1,20 @@
+import zipfile
+from datetime import timedelta
+from io import BytesIO
+
 import aiounittest
+import boto3
 from unittest.mock import MagicMock, patch
 from botocore.exceptions import ClientError
-from src.project.models.project import Project
+from moto import mock_aws
+
 from src.project.storage.iac_storage import (
+    DeployedIac,
     IacStorage,
     WriteIacError,
     IaCDoesNotExistError,
 )
+from src.util.tmp import TempDir
 
 
 class TestIacStorage(aiounittest.AsyncTestCase):
@@ -48,6 +56,19 @@ class TestIacStorage(aiounittest.AsyncTestCase):
         self.assertEqual(result, "test_user/test_app/iac/1/iac.zip")
         self.bucket.Object.assert_called_once_with("test_user/test_app/iac/1/iac.zip")
 
+    @patch("src.project.storage.iac_storage.upload_fileobj")
+    def test_write_iac_fileobj(self, mock_upload_fileobj):
+        content = BytesIO(b"test_content")
+        content.seek(4)
+        result = self.iac_storage.write_iac(
+            self.test_id, self.test_app_name, self.test_version, content
+        )
+        self.assertEqual(result, "test_user/test_app/iac/1/iac.zip")
+        mock_upload_fileobj.assert_called_once_with(
+            self.bucket.Object.return_value, content
+        )
+        self.assertEqual(content.tell(), 0)
+
     @patch("src.project.storage.iac_storage.put_object")
     def test_write_iac_error(self, mock_put_object):
         mock_put_object.side_effect = Exception("test_error")
@@ -60,7 +81,11 @@ class TestIacStorage(aiounittest.AsyncTestCase):
     def test_delete_iac(self, mock_delete_objects):
         self.iac_storage.delete_iac(self.test_id, self.test_app_name, self.test_version)
         mock_delete_objects.assert_called_once_with(
-            self.bucket, ["test_user/test_app/iac/1/iac.zip"]
+            self.bucket,
+            [
+                "test_user/test_app/iac/1/iac.zip",
+                "test_user/test_app/iac/1/manifest.json",
+            ],
         )
 
     @patch("src.project.storage.iac_storage.delete_objects")
@@ -70,3 +95,103 @@ class TestIacStorage(aiounittest.AsyncTestCase):
             self.iac_storage.delete_iac(
                 self.test_id, self.test_app_name, self.test_version
             )
+
+
+class TestIacStorageBlobs(aiounittest.AsyncTestCase):
+    @mock_aws
+    def test_write_iac_dir_dedup_and_extract(self):
+        conn = boto3.resource("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket="iac-store")
+        bucket = conn.Bucket("iac-store")
+        iac_storage = IacStorage(bucket)
+
+        with TempDir() as tmp_dir:
+            src = tmp_dir / "src"
+            (src / "assets").mkdir(parents=True)
+            (src / "index.ts").write_text("v1")
+            (src / "package.json").write_text("{}")
+            (src / "assets" / "logo.png").write_bytes(b"\x00\xff")
+            iac_storage.write_iac_dir("project", "app", 1, src)
+
+            (src / "index.ts").write_text("v2")
+            with patch("src.project.storage.iac_storage.upload_fileobj") as upload:
+                upload.side_effect = lambda obj, f: obj.upload_fileobj(f)
+                manifest = iac_storage.write_iac_dir("project", "app", 2, src)
+            # only the changed index.ts is uploaded for version 2
+            self.assertEqual(upload.call_count, 1)
+            self.assertEqual(
+                [f.path for f in manifest.files],
+                ["assets/logo.png", "index.ts", "package.json"],
+            )
+
+            iac_storage.extract_iac("project", "app", 2, tmp_dir / "dst")
+            self.assertEqual((tmp_dir / "dst" / "index.ts").read_text(), "v2")
+            self.assertEqual(
+                (tmp_dir / "dst" / "assets" / "logo.png").read_bytes(), b"\x00\xff"
+            )
+
+        with iac_storage.iac_zip("project", "app", 1) as iac_zip, zipfile.ZipFile(
+            iac_zip
+        ) as z:
+            self.assertEqual(z.read("index.ts"), b"v1")
+            self.assertEqual(z.read("assets/logo.png"), b"\x00\xff")
+
+    @mock_aws
+    def test_deployed_round_trip(self):
+        conn = boto3.resource("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket="iac-store")
+        iac_storage = IacStorage(conn.Bucket("iac-store"))
+
+        self.assertIsNone(iac_storage.get_deployed("project", "app"))
+        with TempDir() as tmp_dir:
+            (tmp_dir / "resources.yaml").write_text("resources: {}")
+            manifest = iac_storage.write_iac_dir("project", "app", 1, tmp_dir)
+        deployed = DeployedIac(manifest=manifest, config_digest="config")
+        iac_storage.write_deployed("project", "app", deployed)
+
+        self.assertEqual(iac_storage.get_deployed("project", "app"), deployed)
+        self.assertEqual(
+            iac_storage.get_blob(manifest.files[0].digest), b"resources: {}"
+        )
+        iac_storage.delete_deployed("project", "app")
+        self.assertIsNone(iac_storage.get_deployed("project", "app"))
+
+    @mock_aws
+    def test_collect_garbage(self):
+        conn = boto3.resource("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket="iac-store")
+        iac_storage = IacStorage(conn.Bucket("iac-store"))
+
+        with TempDir() as tmp_dir:
+            (tmp_dir / "index.ts").write_text("v1")
+            (tmp_dir / "resources.yaml").write_text("resources: {}")
+            v1 = iac_storage.write_iac_dir("project", "app", 1, tmp_dir)
+            (tmp_dir / "index.ts").write_text("v2")
+            v2 = iac_storage.write_iac_dir("project", "app", 2, tmp_dir)
+            (tmp_dir / "index.ts").write_text("v3")
+            v3 = iac_storage.write_iac_dir("project", "app", 3, tmp_dir)
+        iac_storage.write_deployed(
+            "project", "app", DeployedIac(manifest=v2, config_digest="config")
+        )
+        iac_storage.delete_iac("project", "app", 1)
+        iac_storage.delete_iac("project", "app", 2)
+
+        # too recent to collect
+        self.assertEqual([], iac_storage.collect_garbage())
+
+        digests = {
+            version: {f.path: f.digest for f in m.files}
+            for version, m in [(1, v1), (2, v2), (3, v3)]
+        }
+        self.assertEqual(
+            [IacStorage.get_path_for_blob(digests[1]["index.ts"])],
+            iac_storage.collect_garbage(min_age=timedelta(0), dry_run=True),
+        )
+        iac_storage.collect_garbage(min_age=timedelta(0))
+
+        self.assertEqual([], iac_storage.collect_garbage(min_age=timedelta(0)))
+        # the deployed record still references version 2's blobs
+        self.assertEqual(iac_storage.get_blob(digests[2]["index.ts"]), b"v2")
+        with TempDir() as tmp_dir:
+            iac_storage.extract_iac("project", "app", 3, tmp_dir)
+            self.assertEqual((tmp_dir / "index.ts").read_text(), "v3")
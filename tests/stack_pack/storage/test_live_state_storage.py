@@ -0,0 +1,55 @@
+import aiounittest
+import boto3
+from moto import mock_aws
+
+from src.project import Properties, Resources
+from src.project.live_state import LiveState
+from src.project.storage.live_state_storage import (
+    ImportConstraints,
+    LiveStateSnapshot,
+    LiveStateStorage,
+)
+
+
+class TestLiveStateStorage(aiounittest.AsyncTestCase):
+    @mock_aws
+    def test_snapshot_round_trip(self):
+        conn = boto3.resource("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket="iac-store")
+        storage = LiveStateStorage(conn.Bucket("iac-store"))
+
+        self.assertIsNone(storage.get_snapshot("project", "common"))
+
+        snapshot = LiveStateSnapshot(
+            checkpoint_version=4,
+            live_state=LiveState(
+                resources=Resources(
+                    {"aws:vpc:vpc": Properties({"CidrBlock": "10.0.0.0/16"})}
+                )
+            ),
+        )
+        storage.write_snapshot("project", "common", snapshot)
+
+        result = storage.get_snapshot("project", "common")
+        self.assertEqual(result, snapshot)
+        self.assertIsInstance(result.live_state.resources, Resources)
+
+    @mock_aws
+    def test_import_constraints_round_trip(self):
+        conn = boto3.resource("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket="iac-store")
+        storage = LiveStateStorage(conn.Bucket("iac-store"))
+
+        self.assertIsNone(storage.get_import_constraints("project", "common"))
+
+        import_constraints = ImportConstraints(
+            run_id="run",
+            constraints=[
+                {"scope": "application", "operator": "import", "node": "aws:vpc:vpc"}
+            ],
+        )
+        storage.write_import_constraints("project", "common", import_constraints)
+
+        self.assertEqual(
+            storage.get_import_constraints("project", "common"), import_constraints
+        )
@@ -0,0 +1,43 @@
+import gzip
+from unittest.mock import patch
+
+import aiounittest
+import boto3
+from moto import mock_aws
+
+from src.project.storage.log_storage import LogStorage
+from src.util.tmp import TempDir
+
+
+class TestLogStorage(aiounittest.AsyncTestCase):
+    @mock_aws
+    @patch("src.project.storage.log_storage.LOG_ARCHIVE_CHUNK_SIZE", 16)
+    def test_log_round_trip(self):
+        conn = boto3.resource("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket="iac-store")
+        storage = LogStorage(conn.Bucket("iac-store"))
+        log = b"".join(f"line {i}\n".encode() for i in range(10)) + b"END\n"
+
+        self.assertIsNone(storage.get_index("project", "deploy", "app"))
+
+        with TempDir() as tmp_dir:
+            (tmp_dir / "app.log").write_bytes(log)
+            storage.write_log("project", "deploy", "app", tmp_dir / "app.log")
+
+        index = storage.get_index("project", "deploy", "app")
+        self.assertEqual(len(log), index.size)
+        self.assertEqual(11, index.lines)
+        # chunks end on line boundaries after at least 16 bytes
+        self.assertEqual([0, 21, 42, 63], [c.offset for c in index.chunks])
+        self.assertEqual([0, 3, 6, 9], [c.line for c in index.chunks])
+        self.assertEqual(2, index.chunk_for(50))
+
+        self.assertEqual(
+            b"line 6\nline 7\nline 8\n",
+            storage.read_chunk("project", "deploy", "app", index.chunks[2]),
+        )
+        # the chunks together are one valid gzip file
+        archive = conn.Object(
+            "iac-store", LogStorage.get_path_for_log("project", "deploy", "app")
+        )
+        self.assertEqual(log, gzip.decompress(archive.get()["Body"].read()))
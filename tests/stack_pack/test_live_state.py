@@ -146,3 +146,42 @@ class TestLiveState(aiounittest.AsyncTestCase):
         # Assert
         expected_result = []
         self.assertEqual(result, expected_result)
+
+    def test_to_constraints_does_not_modify_state(self):
+        live_state = LiveState(
+            resources=Resources(
+                {"aws:lambda_function:default": Properties({"Timeout": 3})}
+            ),
+            edges=Edges(),
+        )
+        stack_pack = Mock(
+            spec=CommonStack,
+            base=Mock(
+                resources=Resources(
+                    {
+                        "aws:lambda_function:default": Properties({"Timeout": 30}),
+                        "aws:region:region": Properties({"Property1": "Value1"}),
+                    }
+                ),
+                edges=Edges(),
+            ),
+            always_inject={"aws:region:region"},
+            never_inject={},
+        )
+        original = live_state.model_copy(deep=True)
+
+        first = live_state.to_constraints(stack_pack, ConfigValues())
+        second = live_state.to_constraints(stack_pack, ConfigValues())
+
+        self.assertEqual(live_state, original)
+        self.assertEqual(first, second)
+        self.assertIn(
+            {
+                "scope": "resource",
+                "operator": "equals",
+                "property": "Timeout",
+                "value": 30,
+                "target": "aws:lambda_function:default",
+            },
+            first,
+        )
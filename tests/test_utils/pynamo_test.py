@@ -1,9 +1,12 @@
 import os
-from typing import Type, List
+from collections import Counter
+from contextlib import contextmanager
+from typing import Type, List, Union
 from unittest import TestCase
 
 from moto import mock_aws
 from moto.core.models import MockAWS
+from pynamodb.connection import Connection
 from pynamodb.models import Model
 
 
@@ -49,3 +52,26 @@ class PynamoTest(object):
         if not self.tearDownCalled:
             self.tearDownCalled = True
             self._delete_tables()
+
+
+@contextmanager
+def count_requests(*sources: Union[Type[Model], Connection]):
+    """count_requests counts the DynamoDB requests made through the models' connections
+    (or the connections themselves), by operation name (eg, {"Query": 1, "TransactWriteItems": 1}).
+    """
+    counts = Counter()
+
+    def count(model, **kwargs):
+        counts[model.name] += 1
+
+    clients = {
+        (s if isinstance(s, Connection) else s._get_connection().connection).client
+        for s in sources
+    }
+    for client in clients:
+        client.meta.events.register("before-call.dynamodb.*", count)
+    try:
+        yield counts
+    finally:
+        for client in clients:
+            client.meta.events.unregister("before-call.dynamodb.*", count)
@@ -1,8 +1,14 @@
+from io import BytesIO
+
+from unittest.mock import MagicMock
+
 import aiounittest
 import boto3
 from moto import mock_aws
 from src.util.aws.s3 import (
     put_object,
+    concurrent_map,
+    upload_fileobj,
     get_object,
     delete_object,
     delete_objects,
@@ -21,6 +27,33 @@ class TestS3Methods(aiounittest.AsyncTestCase):
         body = obj.get()["Body"].read().decode("utf-8")
         self.assertEqual(body, "Hello World!")
 
+    def test_put_object_does_not_poll(self):
+        obj = MagicMock()
+        put_object(obj, b"data")
+        obj.put.assert_called_once_with(Body=b"data")
+        obj.wait_until_exists.assert_not_called()
+
+    def test_concurrent_map(self):
+        self.assertEqual(
+            concurrent_map(lambda x: x * 2, range(50)), list(range(0, 100, 2))
+        )
+
+        def fail(x):
+            raise ValueError(x)
+
+        with self.assertRaises(ValueError):
+            concurrent_map(fail, [1])
+
+    @mock_aws
+    def test_upload_fileobj(self):
+        conn = boto3.resource("s3", region_name="us-east-1")
+        conn.create_bucket(Bucket="mybucket")
+        bucket = conn.Bucket("mybucket")
+        obj = bucket.Object("mykey")
+        upload_fileobj(obj, BytesIO(b"\x00\xffHello"))
+        body = obj.get()["Body"].read()
+        self.assertEqual(body, b"\x00\xffHello")
+
     @mock_aws
     def test_get_object(self):
         conn = boto3.resource("s3", region_name="us-east-1")
@@ -0,0 +1,45 @@
+import os
+import zipfile
+from io import BytesIO
+
+import aiounittest
+
+from src.util.compress import spooled_zip, write_zip_to_directory, zip_directory_recurse
+from src.util.tmp import TempDir
+
+
+class TestCompress(aiounittest.AsyncTestCase):
+    def test_zip_directory_recurse_binary(self):
+        binary = os.urandom(1024) + b"\xff\xfe\x00"
+        with TempDir() as tmp_dir:
+            (tmp_dir / "index.ts").write_text("export const x = 1")
+            (tmp_dir / "assets").mkdir()
+            (tmp_dir / "assets" / "logo.png").write_bytes(binary)
+            (tmp_dir / "node_modules" / "pkg").mkdir(parents=True)
+            (tmp_dir / "node_modules" / "pkg" / "index.js").write_text("skip")
+
+            zip_bytes = zip_directory_recurse(BytesIO(), tmp_dir)
+
+        with zipfile.ZipFile(BytesIO(zip_bytes)) as zip_file:
+            self.assertEqual(
+                sorted(zip_file.namelist()), ["assets/logo.png", "index.ts"]
+            )
+            self.assertEqual(zip_file.read("assets/logo.png"), binary)
+
+    def test_spooled_zip_round_trip(self):
+        binary = os.urandom(4096)
+        with TempDir() as tmp_dir:
+            src = tmp_dir / "src"
+            src.mkdir()
+            (src / "index.ts").write_text("export const x = 1")
+            (src / "asset.bin").write_bytes(binary)
+
+            # max_size=1 forces the spool to roll over to disk
+            with spooled_zip(src, compresslevel=1, max_size=1) as iac_zip:
+                self.assertEqual(iac_zip.tell(), 0)
+                write_zip_to_directory(iac_zip, tmp_dir / "dst")
+
+            self.assertEqual((tmp_dir / "dst" / "asset.bin").read_bytes(), binary)
+            self.assertEqual(
+                (tmp_dir / "dst" / "index.ts").read_text(), "export const x = 1"
+            )